@@ -0,0 +1,172 @@
+'''
+CS 121: Batch Treemaps
+
+Lays out and draws the treemaps of many trees of a tree file in one
+run: the file is read once, the trees whose names match any of the
+given patterns (shell-style, as in fnmatch) are selected while it is
+read, and the treemaps are drawn in a pool of worker processes, each of
+which sets up matplotlib once for all the trees it draws.
+
+Usage: python3 batch.py data/birds.json 'Jan' 'Feb' -o 'maps/{key}.png'
+       python3 batch.py data/birds.json -o 'maps/{key}.png' -j 8
+'''
+
+import fnmatch
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+
+import columnar
+import layout
+import treefile
+import treemap
+
+
+class KeyPatterns:
+    '''
+    A collection of the tree names that match any of a list of
+    shell-style patterns, which can be passed as the names argument of
+    load_trees.
+    '''
+
+    def __init__(self, patterns):
+        '''
+        Inputs:
+            patterns: (list of strings) shell-style patterns
+        '''
+
+        self.patterns = list(patterns)
+
+
+    def __contains__(self, name):
+        return any(fnmatch.fnmatchcase(name, pattern)
+                   for pattern in self.patterns)
+
+
+def load_matching_trees(filename, patterns=("*",)):
+    '''
+    Loads the trees whose names match any of the patterns from a json or
+    binary tree file, without building the others.
+
+    Inputs:
+        filename: (string) name of the file
+        patterns: (list of strings) shell-style patterns
+
+    Returns: dictionary mapping tree names to trees (Tree objects for a
+        json file, ColumnarTrees for a binary tree file)
+    '''
+
+    if treefile.is_tree_file(filename):
+        return treefile.load_trees(filename, KeyPatterns(patterns))
+    return treemap.load_trees(filename, KeyPatterns(patterns))
+
+
+def render_trees(trees, output_template, workers=None, renderer="matplotlib"):
+    '''
+    Lays out and draws the treemaps of several trees.
+
+    Inputs:
+        trees: dictionary mapping tree names to trees (Tree objects or
+            ColumnarTrees)
+        output_template: (string) name of the file for each treemap,
+            where {key} is replaced by the name of the tree. Files whose
+            name ends in .txt get the rectangles, one per line, instead
+            of an image.
+        workers: (int) the number of processes to use. None or 1 draws
+            the treemaps in this process.
+        renderer: (string) one of treemap.RENDERERS
+
+    Returns: list of the names of the files written, in the same order
+        as trees.
+    '''
+
+    filenames = [output_template.format(key=name) for name in trees]
+    for directory in {os.path.dirname(filename) for filename in filenames}:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    if workers is None or workers <= 1:
+        for t, filename in zip(trees.values(), filenames):
+            if isinstance(t, columnar.ColumnarTree):
+                t = t.root
+            render_tree(t, filename, renderer)
+        return filenames
+
+    if renderer == "matplotlib" and \
+            not all(filename.endswith(".txt") for filename in filenames):
+        # Set up matplotlib before the workers start, so that workers
+        # that are forked from this process do not have to
+        import drawing # pylint: disable=unused-import
+
+    # Worker processes get compact ColumnarTrees rather than graphs of
+    # Tree objects
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for t, filename in zip(trees.values(), filenames):
+            if not isinstance(t, columnar.ColumnarTree):
+                t = columnar.ColumnarTree.from_tree(t)
+            futures.append(executor.submit(render_columnar_tree, t,
+                                           filename, renderer))
+        for future in futures:
+            future.result()
+    return filenames
+
+
+def render_tree(t, filename, renderer="matplotlib"):
+    '''
+    Lays out and draws the treemap of one tree.
+
+    Inputs:
+        t: (Tree) a tree
+        filename: (string) name of the file for the treemap (see
+            render_trees)
+        renderer: (string) one of treemap.RENDERERS
+    '''
+
+    if filename.endswith(".txt"):
+        with open(filename, "w") as f:
+            treemap.write_rectangles(layout.iter_rectangles(t), f)
+    elif renderer == "matplotlib":
+        import drawing
+        drawing.draw_layout(layout.compute_layout(t), filename)
+    else:
+        treemap.draw_rectangles(layout.compute_rectangles(t), filename,
+                                renderer)
+
+
+def render_columnar_tree(ct, filename, renderer):
+    '''
+    Lays out and draws the treemap of one tree in a worker process.
+
+    Inputs:
+        ct: (ColumnarTree) a tree
+        filename: (string) name of the file for the treemap (see
+            render_trees)
+        renderer: (string) one of treemap.RENDERERS
+    '''
+
+    render_tree(ct.to_tree(), filename, renderer)
+
+
+@click.command(name="batch")
+@click.argument('tree_file', type=click.Path(exists=True))
+@click.argument('patterns', nargs=-1)
+@click.option('--output', '-o', type=str, default="{key}.png",
+              help="Name of the output files, where {key} is replaced by "
+                   "the name of each tree.")
+@click.option('--workers', '-j', type=int, default=None,
+              help="Draw the treemaps with this many processes.")
+@click.option('--renderer', type=click.Choice(treemap.RENDERERS),
+              default=treemap.RENDERERS[0], help="How to draw the treemaps.")
+def cmd(tree_file, patterns, output, workers, renderer):
+    trees = load_matching_trees(tree_file, patterns or ("*",))
+    if len(trees) > 1 and "{key}" not in output:
+        raise click.BadParameter("must contain {key} to write more than "
+                                 "one treemap", param_hint="--output")
+
+    for filename in render_trees(trees, output, workers, renderer):
+        print("wrote", filename)
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
@@ -0,0 +1,6 @@
+'''
+CS 121: Treemap benchmarks
+
+Run the benchmarks from the top-level directory, for example:
+    python3 -m benchmarks.bench_fanout
+'''
@@ -0,0 +1,68 @@
+'''
+CS 121: Row-splitting benchmark
+
+Times the squarified layout of a single node with a very wide fan-out
+(like the roots of the trees in sparrows.json), for 10^4 to 10^6
+children. With find_row, the time per child should stay roughly
+constant as the number of children grows.
+
+Usage: python3 -m benchmarks.bench_fanout [--max-children N]
+'''
+
+import random
+import time
+
+import click
+import numpy as np
+
+import layout
+
+
+def skewed_values(n, seed=0):
+    '''
+    Generates n positive integer values with a long tail, sorted in
+    descending order.
+
+    Inputs:
+        n: (int) number of values
+        seed: (int) seed for the random number generator
+
+    Returns: numpy array of float
+    '''
+
+    rng = random.Random(seed)
+    values = [int(rng.paretovariate(1.2)) for _ in range(n)]
+    return np.array(sorted(values, reverse=True), dtype=float)
+
+
+def count_rows(boxes):
+    '''
+    Returns: (int) the number of rows in a layout of one node: each row
+        starts where the previous one's rectangles change width or height.
+    '''
+
+    x, y = boxes[:, 0], boxes[:, 1]
+    return int(1 + np.count_nonzero((x[1:] != x[:-1]) & (y[1:] != y[:-1])))
+
+
+@click.command(name="bench_fanout")
+@click.option('--max-children', type=int, default=10**6)
+@click.option('--repeat', type=int, default=3)
+def cmd(max_children, repeat):
+    print("{:>10} {:>8} {:>10} {:>14}".format(
+        "children", "rows", "seconds", "us per child"))
+    n = 10**4
+    while n <= max_children:
+        values = skewed_values(n)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            boxes = layout.squarify(values, 0.0, 0.0, 1.0, 1.0)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print("{:>10} {:>8} {:>10.4f} {:>14.3f}".format(
+            n, count_rows(boxes), best, 1e6 * best / n))
+        n *= 10
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
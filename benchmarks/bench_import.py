@@ -0,0 +1,121 @@
+'''
+CS 121: Start-up benchmark
+
+Times how long fresh Python processes take to import the treemap modules
+and to run a text-only treemap (treemap.py --output -) on a tiny tree,
+which is almost all start-up time. The plotting libraries should not be
+imported by any of them; the text-only run should take well under
+TARGET_SECONDS more than starting Python does.
+
+Usage: python3 -m benchmarks.bench_import [--repeat N] [--importtime]
+'''
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+
+TARGET_SECONDS = 0.1
+
+# Modules that only drawing and plotting need
+PLOTTING_MODULES = ("matplotlib", "networkx", "pygraphviz")
+
+
+def run(args, repeat):
+    '''
+    Runs a Python process several times.
+
+    Inputs:
+        args: (list of strings) the arguments to the interpreter
+        repeat: (int) number of runs
+
+    Returns: (float) the shortest time a run took, in seconds
+    '''
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, check=True,
+                       stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def imported_plotting_modules(statement):
+    '''
+    Returns: (list of strings) the plotting modules that a statement
+        imports, when run in a fresh process
+    '''
+
+    check = "import sys; {}; print(' '.join(m for m in {!r} " \
+        "if m in sys.modules))".format(statement, PLOTTING_MODULES)
+    out = subprocess.run([sys.executable, "-c", check], check=True,
+                         capture_output=True, text=True).stdout
+    return out.split()
+
+
+def slowest_imports(args, count=10):
+    '''
+    Returns: (list of strings) the -X importtime lines of the count
+        modules that took the longest to import, slowest first
+    '''
+
+    err = subprocess.run([sys.executable, "-X", "importtime"] + args,
+                         check=True, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.PIPE, text=True).stderr
+    lines = [line for line in err.splitlines()
+             if line.startswith("import time:") and "|" in line
+             and "cumulative" not in line]
+    lines.sort(key=lambda line: int(line.split("|")[1]), reverse=True)
+    return lines[:count]
+
+
+@click.command(name="bench_import")
+@click.option('--repeat', type=int, default=5)
+@click.option('--importtime', is_flag=True,
+              help="Show the slowest imports of the text-only run.")
+def cmd(repeat, importtime):
+    with tempfile.TemporaryDirectory() as tmp:
+        tree_file = os.path.join(tmp, "tiny.json")
+        with open(tree_file, "w") as f:
+            json.dump({"tiny": [{"key": "root"},
+                                [{"key": "a", "value": 3}],
+                                [{"key": "b", "value": 1}]]}, f)
+
+        cli = ["treemap.py", tree_file, "tiny", "--output", "-"]
+        runs = [("python", ["-c", "pass"]),
+                ("import tree", ["-c", "import tree"]),
+                ("import treemap", ["-c", "import treemap"]),
+                ("treemap.py --output -", cli)]
+
+        baseline = None
+        print("{:<24} {:>10} {:>12}".format("run", "seconds", "over python"))
+        for name, args in runs:
+            seconds = run(args, repeat)
+            baseline = seconds if baseline is None else baseline
+            print("{:<24} {:>10.4f} {:>12.4f}".format(name, seconds,
+                                                      seconds - baseline))
+
+        print()
+        print("text-only run: {:.0f} ms over python (target: under {:.0f} "
+              "ms)".format(1000 * (seconds - baseline), 1000 * TARGET_SECONDS))
+        for statement in ("import tree", "import treemap"):
+            modules = imported_plotting_modules(statement)
+            print("{}: imports {}".format(statement,
+                                          ", ".join(modules) or "no plotting "
+                                          "modules"))
+
+        if importtime:
+            print()
+            print("slowest imports (microseconds, self | cumulative):")
+            for line in slowest_imports(cli):
+                print("  " + line[len("import time:"):].strip())
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
@@ -0,0 +1,340 @@
+'''
+CS 121: Stage benchmarks
+
+Times every stage of drawing a treemap, from loading the json file to
+drawing the rectangles, on trees of three shapes, from 10^3 to 10^6
+nodes, generated with synth.py:
+
+    balanced:   every internal node has FANOUT children (the last ones
+                in pre-order have fewer, to get exactly the number of
+                nodes asked for)
+    deep:       a chain of nodes, each with the next node of the chain
+                and a leaf as its children
+    wide:       one root whose children are all leaves (like the trees
+                in sparrows.json)
+
+For every stage, it reports the shortest time of --repeat runs and the
+peak memory (measured with tracemalloc, in a separate run, since tracing
+slows the stage down) allocated on top of the memory already in use.
+A stage that takes more than --max-seconds is not run on larger trees
+of the same shape.
+
+The results can be saved as json, and compared with the results of an
+earlier run: stages that got slower or use more memory by more than
+--tolerance are reported as regressions, and make the command exit with
+status 1.
+
+Usage: python3 -m benchmarks.bench_stages [--output results.json]
+           [--baseline baseline.json]
+'''
+
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import click
+import numpy as np
+
+import layout
+import synth
+import traversal
+import treemap
+
+
+SHAPES = ("balanced", "deep", "wide")
+
+STAGES = ("load_trees", "list_to_tree", "compute_internal_values",
+          "compute_paths", "compute_row", "compute_rectangles",
+          "layout.compute_rectangles", "draw_rectangles")
+
+FANOUT = 10
+
+# Number of children of the root (or of the first node with at least
+# this many children) that compute_row lays out in one row
+ROW_LENGTH = 1000
+
+# Differences smaller than these are noise, not regressions
+MIN_SECONDS_DIFFERENCE = 0.01
+MIN_BYTES_DIFFERENCE = 1 << 20
+
+
+def generator(shape, n, seed=0):
+    '''
+    Makes the generator of the trees of a shape.
+
+    Inputs:
+        shape: (string) one of SHAPES
+        n: (int) number of nodes, at least 2
+        seed: (int) seed of the generator
+
+    Returns: a synth.TaxonomyGenerator whose trees have n nodes
+    '''
+
+    if shape == "balanced":
+        # The smallest depth at which a full tree has n nodes
+        depth, full = 0, 1
+        while full < n:
+            depth += 1
+            full += FANOUT ** depth
+        return synth.TaxonomyGenerator(seed, depth,
+                                       ("fixed:{}".format(FANOUT),),
+                                       max_nodes=n)
+    if shape == "deep":
+        # The first child of every node is given children first, until
+        # there are n nodes, so the others are leaves
+        return synth.TaxonomyGenerator(seed, n, ("fixed:2",), max_nodes=n)
+    return synth.TaxonomyGenerator(seed, 1, ("fixed:{}".format(n - 1),))
+
+
+def measure(func, repeat, memory):
+    '''
+    Runs a function several times.
+
+    Inputs:
+        func: a function with no arguments
+        repeat: (int) number of timed runs
+        memory: (bool) whether to also measure the peak memory, in one
+            more run
+
+    Returns: a triple (seconds, peak_bytes, result): the shortest time of
+        a run, the most memory allocated during the run on top of the
+        memory allocated before it (None if memory is False), and what
+        the function returned
+    '''
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def row_node(t):
+    '''
+    Returns: the node whose children compute_row lays out: the first node,
+        in pre-order, with at least ROW_LENGTH children, or the node with
+        the most children
+    '''
+
+    widest = t
+    for node in traversal.preorder(t):
+        if node.num_children() >= ROW_LENGTH:
+            return node
+        if node.num_children() > widest.num_children():
+            widest = node
+    return widest
+
+
+def draw(rectangles, directory):
+    '''
+    Draws rectangles to a png file with drawing.draw_rectangles, without
+    printing the rectangles that are not labeled.
+    '''
+
+    import drawing
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        drawing.draw_rectangles(rectangles,
+                                os.path.join(directory, "treemap.png"))
+
+
+def run_stages(shape, n, directory, repeat=1, memory=True, skip=()):
+    '''
+    Runs all the stages on a generated tree.
+
+    Inputs:
+        shape: (string) one of SHAPES
+        n: (int) number of nodes
+        directory: (string) directory for the files the stages write
+        repeat: (int) number of timed runs of each stage
+        memory: (bool) whether to measure the peak memory of each stage
+        skip: collection of the stages not to run
+
+    Returns: list of dictionaries, one per stage that was run, with the
+        shape, nodes, stage, seconds and peak_bytes of the run
+    '''
+
+    trees = generator(shape, n)
+    lst = trees.tree_list()
+    filename = os.path.join(directory, "tree.json")
+    synth.write_trees(filename, trees)
+
+    state = {}
+    stages = {
+        "load_trees": lambda: treemap.load_trees(filename),
+        "list_to_tree": lambda: treemap.list_to_tree(lst),
+        "compute_internal_values":
+            lambda: treemap.compute_internal_values(state["tree"]),
+        "compute_paths": lambda: treemap.compute_paths(state["tree"]),
+        "compute_row": lambda: treemap.compute_row(
+            treemap.Rectangle((0.0, 0.0), (1.0, 1.0)), state["row"],
+            sum(st.value for st in state["row"])),
+        "compute_rectangles":
+            lambda: treemap.compute_rectangles(state["tree"]),
+        "layout.compute_rectangles":
+            lambda: layout.compute_rectangles(state["tree"]),
+        "draw_rectangles": lambda: draw(state["rectangles"], directory),
+    }
+
+    results = []
+    for stage in STAGES:
+        if stage in skip:
+            continue
+        if stage == "draw_rectangles" and "rectangles" not in state:
+            continue
+        seconds, peak, result = measure(stages[stage], repeat, memory)
+        results.append({"shape": shape, "nodes": n, "stage": stage,
+                        "seconds": seconds, "peak_bytes": peak})
+
+        if stage == "list_to_tree":
+            state["tree"] = result
+        elif stage == "compute_internal_values":
+            state["row"] = treemap.sorted_trees(
+                row_node(state["tree"]).children)[:ROW_LENGTH]
+        elif stage == "layout.compute_rectangles":
+            state["rectangles"] = result
+    return results
+
+
+def compare(results, baseline, tolerance):
+    '''
+    Compares results with the results of an earlier run.
+
+    Inputs:
+        results, baseline: lists of dictionaries, as run_stages returns
+        tolerance: (float) how much slower, or how much more memory, a
+            stage can be before it is a regression, as a fraction of the
+            baseline
+
+    Returns: list of triples (result, base, measures): each result that
+        is in the baseline, the matching result of the baseline, and the
+        list of measures ("seconds", "peak_bytes") that regressed
+    '''
+
+    base_results = {(r["shape"], r["nodes"], r["stage"]): r for r in baseline}
+    slack = {"seconds": MIN_SECONDS_DIFFERENCE,
+             "peak_bytes": MIN_BYTES_DIFFERENCE}
+
+    comparisons = []
+    for result in results:
+        base = base_results.get((result["shape"], result["nodes"],
+                                 result["stage"]))
+        if base is None:
+            continue
+        regressed = [measure_name for measure_name in ("seconds", "peak_bytes")
+                     if result[measure_name] is not None
+                     and base[measure_name] is not None
+                     and result[measure_name] > base[measure_name] *
+                     (1 + tolerance) + slack[measure_name]]
+        comparisons.append((result, base, regressed))
+    return comparisons
+
+
+def format_bytes(size):
+    '''
+    Returns: (string) a number of bytes, in MiB, or "-" for None
+    '''
+
+    return "-" if size is None else "{:.1f}".format(size / (1 << 20))
+
+
+def environment():
+    '''
+    Returns: dictionary describing where the benchmarks were run
+    '''
+
+    return {"python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+@click.command(name="bench_stages")
+@click.option('--shape', 'shapes', type=click.Choice(SHAPES), multiple=True,
+              help="Shapes of trees to run (default: all of them).")
+@click.option('--min-nodes', type=int, default=10**3)
+@click.option('--max-nodes', type=int, default=10**6)
+@click.option('--repeat', type=int, default=1)
+@click.option('--max-seconds', type=float, default=30.0,
+              help="Do not run slower stages on larger trees.")
+@click.option('--no-memory', is_flag=True,
+              help="Do not measure the peak memory of the stages.")
+@click.option('--output', type=click.Path(), default=None,
+              help="Save the results to this json file.")
+@click.option('--baseline', type=click.Path(exists=True), default=None,
+              help="Compare the results with this json file.")
+@click.option('--tolerance', type=float, default=0.25)
+def cmd(shapes, min_nodes, max_nodes, repeat, max_seconds, no_memory, output,
+        baseline, tolerance):
+    skip = set()
+    try:
+        import drawing # pylint: disable=unused-import,import-outside-toplevel
+    except ImportError:
+        print("matplotlib is not installed: not running draw_rectangles")
+        skip.add("draw_rectangles")
+
+    results = []
+    print("{:<9} {:>8} {:<26} {:>10} {:>10}".format(
+        "shape", "nodes", "stage", "seconds", "peak MiB"))
+    for shape in shapes or SHAPES:
+        too_slow = set()
+        n = min_nodes
+        while n <= max_nodes:
+            with tempfile.TemporaryDirectory() as directory:
+                shape_results = run_stages(shape, n, directory, repeat,
+                                           not no_memory, skip | too_slow)
+            for r in shape_results:
+                print("{:<9} {:>8} {:<26} {:>10.4f} {:>10}".format(
+                    shape, n, r["stage"], r["seconds"],
+                    format_bytes(r["peak_bytes"])))
+                if r["seconds"] > max_seconds:
+                    too_slow.add(r["stage"])
+            results.extend(shape_results)
+            n *= 10
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f,
+                      indent=1)
+
+    if baseline is not None:
+        with open(baseline) as f:
+            base = json.load(f)
+        regressions = 0
+        print()
+        print("{:<9} {:>8} {:<26} {:>10} {:>10}".format(
+            "shape", "nodes", "stage", "time x", "memory x"))
+        for r, b, regressed in compare(results, base["results"], tolerance):
+            ratios = [r[m] / b[m] if r[m] is not None and b[m] else None
+                      for m in ("seconds", "peak_bytes")]
+            print("{:<9} {:>8} {:<26} {:>10} {:>10} {}".format(
+                r["shape"], r["nodes"], r["stage"],
+                *["-" if x is None else "{:.2f}".format(x) for x in ratios],
+                "REGRESSION" if regressed else "").rstrip())
+            regressions += len(regressed) > 0
+        print()
+        print("{} regressions (tolerance: {:.0%})".format(regressions,
+                                                          tolerance))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
@@ -0,0 +1,390 @@
+'''
+CS 121: Columnar Trees
+
+A compact, array-backed representation of a tree. Instead of one Tree
+object (with its own __dict__ and children list) per node, a
+ColumnarTree keeps one entry per node in a handful of flat arrays:
+
+    parent:       index of the node's parent (NO_NODE for the root)
+    first_child:  index of the node's first child (NO_NODE for a leaf)
+    next_sibling: index of the node's next sibling (NO_NODE for the last)
+    key_ids:      index of the node's key in the key table
+    values:       the node's value (NaN when the node has no value)
+
+Nodes are numbered in pre-order, so the root is always node 0.
+
+ColumnarNode is a light-weight, Tree-compatible view of one node, so the
+functions in treemap.py (compute_internal_values, compute_paths,
+compute_rectangles) can run directly on a ColumnarTree.
+'''
+
+import math
+import sys
+from array import array
+
+import tree
+
+
+NO_NODE = -1
+
+INDEX_TYPECODE = "i"
+VALUE_TYPECODE = "d"
+
+
+class ColumnarTree:
+    '''
+    A tree stored as a structure of arrays.
+
+    Attributes:
+        parent, first_child, next_sibling: (array of int) links between
+            nodes, NO_NODE when there is no such node
+        key_ids: (array of int) index into keys for every node
+        values: (array of float) value of every node, NaN for no value
+        keys: (list) table of distinct keys
+    '''
+
+    def __init__(self, parent, first_child, next_sibling, key_ids, values,
+                 keys):
+        '''
+        Constructs a ColumnarTree from already-built arrays. The arrays
+        can be array.array instances or any other buffer that supports
+        indexing, such as a memoryview.
+
+        Inputs:
+            parent, first_child, next_sibling, key_ids: (arrays of int)
+            values: (array of float)
+            keys: (list) key table
+        '''
+
+        assert len(parent) == len(first_child) == len(next_sibling) \
+            == len(key_ids) == len(values), \
+            "ColumnarTree arrays must all have the same length"
+        assert len(parent) > 0, "ColumnarTree must have at least one node"
+
+        self.parent = parent
+        self.first_child = first_child
+        self.next_sibling = next_sibling
+        self.key_ids = key_ids
+        self.values = values
+        self.keys = keys
+        self.root_path = ()
+
+
+    @classmethod
+    def from_tree(cls, t):
+        '''
+        Builds a ColumnarTree with the same structure, keys and values as
+        a Tree. Any other attributes of the nodes are not kept.
+
+        Inputs:
+            t: (Tree) a tree
+
+        Returns: a ColumnarTree
+        '''
+
+        builder = _Builder()
+        stack = [(t, NO_NODE)]
+        while stack:
+            node, parent = stack.pop()
+            index = builder.add(parent, node.key, node.value)
+            for st in reversed(node.children):
+                stack.append((st, index))
+        return builder.build()
+
+
+    @classmethod
+    def from_list(cls, lst):
+        '''
+        Builds a ColumnarTree directly from the list representation used
+        in the json files (see treemap.list_to_tree), without creating
+        Tree objects along the way.
+
+        Inputs:
+            lst: list representing a tree.
+
+        Returns: a ColumnarTree
+        '''
+
+        builder = _Builder()
+        stack = [(lst, NO_NODE)]
+        while stack:
+            node_lst, parent = stack.pop()
+            attrs = node_lst[0]
+            index = builder.add(parent, attrs.get("key"), attrs.get("value"))
+            for child_lst in reversed(node_lst[1:]):
+                stack.append((child_lst, index))
+        return builder.build()
+
+
+    def __len__(self):
+        return len(self.parent)
+
+
+    def __reduce__(self):
+        '''
+        Pickles the tree as the raw bytes of its arrays and its list of
+        keys, whatever buffers the arrays are stored in (for example a
+        memory-mapped tree file, which cannot be pickled itself).
+        '''
+
+        columns = tuple(bytes(memoryview(a)) for a in (self.parent,
+            self.first_child, self.next_sibling, self.key_ids, self.values))
+        return (_from_bytes, (columns, list(self.keys), self.root_path))
+
+
+    @property
+    def root(self):
+        '''The root of the tree, as a ColumnarNode'''
+        return ColumnarNode(self, 0)
+
+
+    def node(self, index):
+        '''
+        Get a view of a node.
+
+        Inputs:
+            index: (int) index of the node
+
+        Returns: a ColumnarNode
+        '''
+
+        return ColumnarNode(self, index)
+
+
+    def child_indices(self, index):
+        '''
+        Get the indices of the children of a node, in order.
+
+        Inputs:
+            index: (int) index of the node
+
+        Returns: list of ints
+        '''
+
+        children = []
+        child = self.first_child[index]
+        while child != NO_NODE:
+            children.append(child)
+            child = self.next_sibling[child]
+        return children
+
+
+    def key(self, index):
+        '''Returns the key of the node with the given index'''
+        return self.keys[self.key_ids[index]]
+
+
+    def value(self, index):
+        '''Returns the value of the node with the given index'''
+        v = self.values[index]
+        if math.isnan(v):
+            return None
+        return v
+
+
+    def set_value(self, index, v):
+        '''Sets the value of the node with the given index'''
+        self.values[index] = math.nan if v is None else float(v)
+
+
+    def path(self, index):
+        '''
+        Get the path of a node: the keys from the root down to, but not
+        including, the node, preceded by the root path.
+
+        Inputs:
+            index: (int) index of the node
+
+        Returns: tuple of keys
+        '''
+
+        keys = []
+        index = self.parent[index]
+        while index != NO_NODE:
+            keys.append(self.key(index))
+            index = self.parent[index]
+        keys.reverse()
+        return self.root_path + tuple(keys)
+
+
+    def to_tree(self):
+        '''
+        Converts the tree to a Tree made of tree.Tree objects.
+
+        Returns: a Tree
+        '''
+
+        nodes = [None] * len(self)
+        for index in range(len(self)):
+            nodes[index] = tree.Tree(self.key(index), self.value(index))
+            parent = self.parent[index]
+            if parent != NO_NODE:
+                nodes[parent].add_child(nodes[index])
+        return nodes[0]
+
+
+    def nbytes(self):
+        '''
+        Returns: (int) the number of bytes used by the node arrays (the
+            key table, which is shared by all nodes, is not included)
+        '''
+
+        return sum(len(a) * a.itemsize for a in (self.parent,
+            self.first_child, self.next_sibling, self.key_ids, self.values))
+
+
+class ColumnarNode:
+    '''
+    A Tree-compatible view of one node of a ColumnarTree. Views are
+    created on demand and hold no data of their own; two views of the
+    same node compare equal.
+
+    The path of a node is implied by the parent links, so it is computed
+    on access. Assigning the path of the root sets the prefix for all the
+    other paths in the tree; assigning the path of any other node has no
+    effect.
+    '''
+
+    __slots__ = ("_tree", "_index")
+
+    def __init__(self, columnar_tree, index):
+        self._tree = columnar_tree
+        self._index = index
+
+
+    @property
+    def index(self):
+        '''The index of the node in its ColumnarTree'''
+        return self._index
+
+
+    @property
+    def key(self):
+        return self._tree.key(self._index)
+
+
+    @property
+    def value(self):
+        return self._tree.value(self._index)
+
+
+    @value.setter
+    def value(self, v):
+        self._tree.set_value(self._index, v)
+
+
+    @property
+    def path(self):
+        return self._tree.path(self._index)
+
+
+    @path.setter
+    def path(self, p):
+        if self._index == 0:
+            self._tree.root_path = tuple(p)
+
+
+    @property
+    def children(self):
+        return [ColumnarNode(self._tree, i)
+                for i in self._tree.child_indices(self._index)]
+
+
+    def num_children(self):
+        """Returns the number of children"""
+        return len(self._tree.child_indices(self._index))
+
+
+    def __eq__(self, other):
+        return isinstance(other, ColumnarNode) \
+            and self._tree is other._tree and self._index == other._index
+
+
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+
+
+    def __repr__(self):
+        return "ColumnarNode({!r}, {!r})".format(self.key, self.value)
+
+
+def _from_bytes(columns, keys, root_path):
+    '''
+    Rebuilds a pickled ColumnarTree (see ColumnarTree.__reduce__).
+    '''
+
+    arrays = []
+    for typecode, data in zip((INDEX_TYPECODE,) * 4 + (VALUE_TYPECODE,),
+                              columns):
+        a = array(typecode)
+        a.frombytes(data)
+        arrays.append(a)
+    ct = ColumnarTree(*arrays, keys)
+    ct.root_path = root_path
+    return ct
+
+
+class _Builder:
+    '''
+    Accumulates nodes, given in pre-order, into the arrays of a
+    ColumnarTree.
+    '''
+
+    def __init__(self):
+        self.parent = array(INDEX_TYPECODE)
+        self.first_child = array(INDEX_TYPECODE)
+        self.next_sibling = array(INDEX_TYPECODE)
+        self.key_ids = array(INDEX_TYPECODE)
+        self.values = array(VALUE_TYPECODE)
+        self.keys = []
+        self.key_index = {}
+        self.last_child = {}
+
+
+    def add(self, parent, key, value):
+        '''
+        Adds a node as the last child of parent.
+
+        Inputs:
+            parent: (int) index of the parent, NO_NODE for the root
+            key, value: key and value of the node
+
+        Returns: (int) the index of the new node
+        '''
+
+        index = len(self.parent)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.key_ids.append(self.intern(key))
+        self.values.append(math.nan if value is None else value)
+
+        if parent != NO_NODE:
+            previous = self.last_child.get(parent, NO_NODE)
+            if previous == NO_NODE:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[previous] = index
+            self.last_child[parent] = index
+        return index
+
+
+    def intern(self, key):
+        '''
+        Returns: (int) the id of key in the key table, adding it if needed
+        '''
+
+        key_id = self.key_index.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            if isinstance(key, str):
+                key = sys.intern(key)
+            self.keys.append(key)
+            self.key_index[key] = key_id
+        return key_id
+
+
+    def build(self):
+        '''Returns: the ColumnarTree made of the nodes added so far'''
+        return ColumnarTree(self.parent, self.first_child, self.next_sibling,
+                            self.key_ids, self.values, self.keys)
@@ -7,15 +7,15 @@ The ChiCanvas and ColorKey classes used for actually drawing the treemap
 # DO NOT MODIFY THE CODE IN THIS FILE
 #####################################
 
-import tempfile
-import textwrap
 import matplotlib as mpl
-import matplotlib.pylab as plt
 import matplotlib.patches as mpatches
+from matplotlib.collections import PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.transforms import Bbox, TransformedBbox
 import numpy as np
-
-mpl.rcParams['toolbar'] = 'None'
+import labels
+import palette
 
 # DO NOT REMOVE THESE LINES OF CODE
 # pylint: disable-msg= invalid-name, missing-class-docstring
@@ -27,21 +27,19 @@ class ChiCanvas:
     def __init__(self, xscale=10, yscale=10, title="Treemap"):
         '''
         initialize a ChiCanvas
-        '''
-        plt.close('all')
 
-        # Get the renderer through a hack
-        fig = plt.figure()
-        fig.add_subplot(111)
-        with tempfile.NamedTemporaryFile(suffix='png', delete=True) as tmp_file:
-            fig.savefig(tmp_file)
-            self._renderer = plt.gca().get_renderer_cache()
-        plt.close('all')
+        The canvas draws on its own figure, with its own Agg renderer, and
+        does not use pyplot (except in show), so canvases can be used from
+        several threads at once.
+        '''
+        self._title = title
+        self._figure = Figure(figsize=(xscale, yscale))
+        self._canvas = FigureCanvasAgg(self._figure)
+        self._renderer = self._canvas.get_renderer()
 
-        self._figure, self._ax = plt.subplots(figsize=(xscale, yscale))
-        self._figure.canvas.set_window_title(title)
+        self._ax = self._figure.add_subplot(111)
         self._figure.patch.set_facecolor('white')
-        plt.subplots_adjust(left=0.0, right=1.0, top=1.0, bottom=0.0)
+        self._figure.subplots_adjust(left=0.0, right=1.0, top=1.0, bottom=0.0)
         self._ax.set_axis_off()
 
 
@@ -60,6 +58,26 @@ class ChiCanvas:
         self._ax.add_patch(rect)
 
 
+    def draw_rectangle_collection(self, x0s, y0s, x1s, y1s, fills,
+                                  outline='black'):
+        '''
+        draw many rectangles at once, as a single collection
+        (x0s[i], y0s[i]): coordinates of top left corner of rectangle i
+        (x1s[i], y1s[i]): coordinates of bottom right corner of rectangle i
+        fills: colors with which to fill the rectangles (one rgb row each)
+        outline: color for border of the rectangles
+        '''
+        x0s, y0s = np.asarray(x0s, dtype=float), np.asarray(y0s, dtype=float)
+        x1s, y1s = np.asarray(x1s, dtype=float), np.asarray(y1s, dtype=float)
+        corners = np.stack([np.stack([x0s, y0s], axis=1),
+                            np.stack([x1s, y0s], axis=1),
+                            np.stack([x1s, y1s], axis=1),
+                            np.stack([x0s, y1s], axis=1)], axis=1)
+        self._ax.add_collection(PolyCollection(
+            corners, facecolors=fills, edgecolors=outline, linewidths=1,
+            linestyles='solid'))
+
+
     def draw_text(self, x0, y0, w, h, txt, fg="black", debug=False):
         '''
         draw text txt horizontally at specified (x0, y0) coordinates
@@ -75,10 +93,10 @@ class ChiCanvas:
                                 fill='none', outline='red')
         clip_rect = mpatches.Rectangle(xy=[x0-w/2.0, y0-h/2.0], width=w,
                                        height=h, transform=self._ax.transData)
-        textobj = plt.text(x0 + offset_x, y0 + offset_y, txt, color=fg,
-                           ha='left', va='center', clip_path=clip_rect,
-                           clip_on=True, rotation=rotation,
-                           wrap=True)
+        textobj = self._ax.text(x0 + offset_x, y0 + offset_y, txt, color=fg,
+                                ha='left', va='center', clip_path=clip_rect,
+                                clip_on=True, rotation=rotation,
+                                wrap=True)
         # Let's store the clipping box in the object, so that we can use it
         # when clipping text
         textobj._clip = TransformedBbox(bbox=Bbox(((x0-w/2.0, y0-h/2.0),
@@ -87,15 +105,57 @@ class ChiCanvas:
         textobj.set_rotation_mode('anchor')
 
 
+    def draw_labels(self, x0s, y0s, ws, hs, txts, fg="black"):
+        '''
+        draw text txts[i] horizontally in the box with top left corner
+        (x0s[i], y0s[i]), width ws[i] and height hs[i], color fg
+
+        Unlike draw_text, the labels are fitted to their boxes right away,
+        all at once (see labels.py), rather than every time the canvas is
+        drawn.
+        '''
+        x0s = np.asarray(x0s, dtype=float)
+        y0s = np.asarray(y0s, dtype=float)
+        ws = np.asarray(ws, dtype=float)
+        hs = np.asarray(hs, dtype=float)
+
+        self._set_limits()
+        (px0, py0), (px1, py1) = self._ax.transData.transform([(0, 0),
+                                                               (1, 1)])
+        x_scale, y_scale = abs(px1 - px0), abs(py1 - py0)
+        font_px = self._renderer.points_to_pixels(mpl.rcParams['font.size'])
+        fitted = labels.fit(txts, (ws - 2*0.01) * x_scale, hs * y_scale,
+                            font_px)
+
+        for x0, y0, w, h, lines in zip(x0s.tolist(), y0s.tolist(),
+                                       ws.tolist(), hs.tolist(), fitted):
+            if not lines:
+                continue
+            clip_rect = mpatches.Rectangle(xy=[x0, y0], width=w, height=h,
+                                           transform=self._ax.transData)
+            self._ax.text(x0 + 0.01, y0 + h/2.0, '\n'.join(lines), color=fg,
+                          ha='left', va='center', clip_path=clip_rect,
+                          clip_on=True, wrap=True)
+
+
     def show(self):
         '''
         display the canvas on screen
         '''
-        # Draw only the unit box and flip the y axis
-        plt.xlim((0, 1))
-        plt.ylim((1, 0))
+        import matplotlib.pyplot as plt
 
-        self._figure.canvas.mpl_connect('draw_event', ChiCanvas._on_draw)
+        # Only windows have a toolbar, so it is turned off here rather
+        # than when this module is imported
+        mpl.rcParams['toolbar'] = 'None'
+        self._set_limits()
+
+        # Hand the figure over to pyplot, which manages the windows
+        manager = plt.figure(figsize=self._figure.get_size_inches()) \
+            .canvas.manager
+        manager.canvas.figure = self._figure
+        self._figure.set_canvas(manager.canvas)
+        manager.set_window_title(self._title)
+        manager.canvas.mpl_connect('draw_event', ChiCanvas._on_draw)
 
         plt.show()
 
@@ -104,9 +164,7 @@ class ChiCanvas:
         '''
         save the canvas as an image file at filename)
         '''
-        # Draw only the unit box and flip the y axis
-        plt.xlim((0, 1))
-        plt.ylim((1, 0))
+        self._set_limits()
 
         ChiCanvas._on_draw(fig=self._figure, renderer=self._renderer)
 
@@ -117,7 +175,15 @@ class ChiCanvas:
         '''
         clean up a canvas
         '''
-        plt.close()
+        self._figure.clear()
+
+
+    def _set_limits(self):
+        '''
+        Draw only the unit box and flip the y axis
+        '''
+        self._ax.set_xlim((0, 1))
+        self._ax.set_ylim((1, 0))
 
 
     # Auxiliary functions
@@ -127,11 +193,14 @@ class ChiCanvas:
     def _auto_ellipsis_text(cls, textobj, renderer):
         '''
         abbreviate text with ellipsis if necessary
+
+        Returns True if the text was drawn with draw_text, and so had to
+        be fitted to its box.
         '''
         try:
             clip = textobj._clip
         except AttributeError:
-            return
+            return False
 
         x0, _ = textobj.get_transform().transform(textobj.get_position())
         textobj.set_rotation_mode('anchor')
@@ -141,26 +210,16 @@ class ChiCanvas:
         new_width = abs(clip.x0 - clip.x1) - 2*buf
         new_height = abs(clip.y1 - clip.y0)
         fontsize = textobj.get_size()
-        pixels_per_char = 0.5 * renderer.points_to_pixels(fontsize)
-        v_pixels_per_char = renderer.points_to_pixels(fontsize)
         try:
             txt = textobj._old_text
         except:
             txt = textobj.get_text()
             textobj._old_text = txt
-        wrap_width = new_width // pixels_per_char
-        wrap_height = new_height // v_pixels_per_char
-        clip_char = max(0, int(wrap_width*0.9))
-        max_lines = max(0, int(wrap_height*0.8))
-        if clip_char * max_lines < 4:
-            wrapped_text = ""
-        else:
-            original_lines = txt.split('\n')
-            lines = []
-            for original in original_lines:
-                lines.extend(textwrap.wrap(original, width=clip_char))
-            wrapped_text = '\n'.join(lines[:max_lines])
-        textobj.set_text(wrapped_text)
+        clip_char, max_lines = labels.budgets(
+            new_width, new_height, renderer.points_to_pixels(fontsize))
+        textobj.set_text('\n'.join(labels.wrap(txt, int(clip_char),
+                                                int(max_lines))))
+        return True
 
 
     @classmethod
@@ -172,12 +231,14 @@ class ChiCanvas:
             fig = event.canvas.figure
             renderer = event.renderer
 
+        fitted = False
         for ax in fig.axes:
             for artist in ax.get_children():
                 if isinstance(artist, mpl.text.Text):
-                    cls._auto_ellipsis_text(artist, renderer)
+                    fitted |= cls._auto_ellipsis_text(artist, renderer)
 
-        if event is not None:
+        # Labels drawn with draw_labels were fitted before the first draw
+        if event is not None and fitted:
             func_handles = fig.canvas.callbacks.callbacks[event.name]
             fig.canvas.callbacks.callbacks[event.name] = {}
             fig.canvas.draw()
@@ -201,10 +262,12 @@ class ColorKey:
             codes: (set of strings) set of keys to use for color map
         '''
         self.color_map = {}
+        self.color_index = {}
         incr = self.NCOLORS // len(codes)
         index = 0
         for code in sorted(codes):
             self.color_map[code] = ColorKey.COLORS[index]
+            self.color_index[code] = index
             index = (index + incr) % self.NCOLORS
 
 
@@ -215,6 +278,23 @@ class ColorKey:
         return self.color_map.get(code, "gray")
 
 
+    def get_colors(self, codes, ids):
+        '''
+        get colors for many rectangles at once
+
+        Inputs:
+            codes: (list) distinct codes
+            ids: (array of ints) index into codes of the code of each
+                rectangle (see palette.intern_codes)
+
+        Returns: array with one rgb row per rectangle
+        '''
+        colors = np.vstack([ColorKey.COLORS, mpl.colors.to_rgb("gray")])
+        indices = np.array([self.color_index.get(code, -1) for code in codes],
+                           dtype=np.int64).reshape(-1)
+        return colors[indices[np.asarray(ids, dtype=np.int64)]]
+
+
     def get_color_by_index(self, i):
         '''
         get color i spaces into list
@@ -240,16 +320,21 @@ class ColorKey:
             code_to_label = {}
 
 
-        hincr = h/(len(self.color_map)*1.0)
-        x1 = x0+w
-        y = y0
-        for (code, color) in sorted(self.color_map.items()):
-            canvas.draw_rectangle(x0, y, x1, y+hincr, fill=color)
-            canvas.draw_text(x0+w/2, y+hincr/2, w*.95, h*.95, code_to_label.get(code, code))
-            y = y + hincr
+        codes = sorted(self.color_map)
+        hincr = h/(len(codes)*1.0)
+        ys = y0 + hincr*np.arange(len(codes))
+        canvas.draw_rectangle_collection(
+            np.full(len(codes), x0), ys, np.full(len(codes), x0+w),
+            ys + hincr, [self.color_map[code] for code in codes])
+        canvas.draw_labels(np.full(len(codes), x0+w/2 - w*.95/2),
+                           ys + hincr/2 - h*.95/2,
+                           np.full(len(codes), w*.95),
+                           np.full(len(codes), h*.95),
+                           [str(code_to_label.get(code, code))
+                            for code in codes])
 
 
-MIN_RECT_SIDE_FOR_TEXT = 0.03
+MIN_RECT_SIDE_FOR_TEXT = labels.MIN_RECT_SIDE_FOR_TEXT
 X_SCALE_FACTOR = 8
 Y_SCALE_FACTOR = 8
 
@@ -266,25 +351,63 @@ def draw_rectangles(rectangles, output_filename=None):
         provided, saves the image instead.
     '''
 
-    c = ChiCanvas(X_SCALE_FACTOR, Y_SCALE_FACTOR)
+    # replace the color codes by integers, so that all the colors are
+    # looked up at once
+    codes = []
+    ids = palette.intern_codes((rect.color_code for rect in rectangles),
+                               codes, {})
+    coords = np.array([(rect.x, rect.y, rect.width, rect.height)
+                       for rect in rectangles]).reshape(-1, 4)
+    draw_boxes(coords.T, codes, ids, [rect.label for rect in rectangles],
+               output_filename)
+
+
+def draw_layout(l, output_filename=None):
+    '''
+    Draw a layout on a canvas, the same way as draw_rectangles draws the
+    rectangles of the layout, reusing the color codes it already interned.
+
+    Inputs:
+        l: (layout.Layout) the layout to draw
+        output_filename: name of file in which to save the image.
+            If None, displays the image instead.
+    '''
+
+    draw_boxes((l.x, l.y, l.width, l.height), l.color_codes, l.color_ids,
+               [t.key for t in l.nodes], output_filename)
+
 
-    # create the color key
-    keys = set(rect.color_code for rect in rectangles)
-    ck = ColorKey(keys)
+def draw_boxes(coords, codes, ids, rect_labels, output_filename=None):
+    '''
+    Draw rectangles, given as arrays, on a canvas.
+
+    Inputs:
+        coords: the arrays x, y, width and height of the rectangles
+        codes: (list) the distinct color codes
+        ids: (array-like of int) index into codes of the color code of
+            each rectangle (see palette.intern_codes)
+        rect_labels: (list of strings) the label of each rectangle
+        output_filename: name of file in which to save the image.
+            If None, displays the image instead.
+    '''
+
+    c = ChiCanvas(X_SCALE_FACTOR, Y_SCALE_FACTOR)
+    ck = ColorKey(codes)
+    x, y, w, h = (np.asarray(a, dtype=float) for a in coords)
 
     # draw the rectangles
-    for rect in rectangles:
-        color = ck.get_color(rect.color_code)
-        c.draw_rectangle(rect.x, rect.y,
-                         rect.x + rect.width, rect.y + rect.height,
-                         fill=color, outline="black")
-
-        if ((rect.width > MIN_RECT_SIDE_FOR_TEXT) and
-                (rect.height > MIN_RECT_SIDE_FOR_TEXT)):
-            c.draw_text(rect.x + rect.width / 2.0, rect.y + rect.height / 2.0,
-                        rect.width, rect.height, rect.label)
-        else:
-            print("not labeling: " + rect.label)
+    c.draw_rectangle_collection(x, y, x + w, y + h, ck.get_colors(codes, ids),
+                                outline="black")
+
+    labeled = (w > MIN_RECT_SIDE_FOR_TEXT) & (h > MIN_RECT_SIDE_FOR_TEXT)
+    for label, is_labeled in zip(rect_labels, labeled.tolist()):
+        if not is_labeled:
+            print("not labeling: " + label)
+
+    # label them all at once
+    c.draw_labels(x[labeled], y[labeled], w[labeled], h[labeled],
+                  [label for label, is_labeled in
+                   zip(rect_labels, labeled.tolist()) if is_labeled])
 
     # save or show the result.
     if output_filename:
@@ -0,0 +1,194 @@
+'''
+CS 121: Incremental Treemaps
+
+Keeps the treemap of a tree up to date as the values of its leaves
+change. An update only adds the change in value to the ancestors of the
+leaves that changed, and only lays out again the nodes whose children
+changed value or that were given a different rectangle: a subtree that
+gets the same rectangle as before and whose values did not change keeps
+its rectangles without being visited.
+'''
+
+import layout
+import traversal
+import treemap
+
+
+class TreemapDiff:
+    '''
+    The rectangles that changed in an update.
+
+    Attributes:
+        added: (list of Rectangle) rectangles of leaves that were not
+            visible before the update
+        removed: (list of Rectangle) rectangles, from before the update,
+            of leaves that are no longer visible
+        changed: (list of Rectangle) new rectangles of leaves that were
+            visible before and after the update but moved or changed size
+    '''
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+    def __repr__(self):
+        return "TreemapDiff(added={}, removed={}, changed={})".format(
+            len(self.added), len(self.removed), len(self.changed))
+
+
+class IncrementalTreemap:
+    '''
+    The treemap of a tree, which can be updated when the values of the
+    leaves change.
+
+    Leaves are identified by their full path: the keys of the nodes from
+    the root down to, and including, the leaf.
+    '''
+
+    def __init__(self, t, bounding_rec_width=1.0, bounding_rec_height=1.0):
+        '''
+        Computes the values, paths and layout of a tree.
+
+        Inputs:
+            t: (Tree) a tree. The tree is modified as it is updated.
+            bounding_rec_width, bounding_rec_height: (float) the width and
+                height of the bounding rectangle.
+        '''
+
+        treemap.compute_internal_values(t)
+        treemap.compute_paths(t)
+
+        self.tree = t
+        self.parents = {}
+        self.leaves = {}
+        for node in traversal.preorder(t):
+            for st in node.children:
+                self.parents[st] = node
+            if node.num_children() == 0:
+                full_path = tuple(node.path) + (node.key,)
+                # Leaves that share a full path cannot be updated
+                self.leaves[full_path] = \
+                    None if full_path in self.leaves else node
+
+        # Box each visible node was laid out in, visible children of each
+        # visible internal node in layout order, and rectangle of each
+        # visible leaf
+        self.boxes = {}
+        self.order = {}
+        self.recs = {}
+        self.__layout((0.0, 0.0, float(bounding_rec_width),
+                       float(bounding_rec_height)), set(), TreemapDiff())
+
+
+    def rectangles(self):
+        '''
+        Returns: list of the Rectangles of the visible leaves, in the same
+            order as compute_rectangles.
+        '''
+
+        return [self.recs[node] for node in traversal.preorder(
+            self.tree, lambda node: self.order.get(node, []))
+                if node in self.recs]
+
+
+    def update(self, updates):
+        '''
+        Changes the values of some leaves and updates the treemap.
+
+        Inputs:
+            updates: iterable of (path, value) pairs, where path is the
+                full path (tuple of keys) of a leaf and value is its new
+                value
+
+        Returns: a TreemapDiff with the rectangles that changed. Raises
+            KeyError if a path is not the path of a leaf, and ValueError
+            if it is the path of more than one leaf, without changing
+            any value.
+        '''
+
+        # All the paths are checked before any value is changed, so that
+        # a bad path leaves the treemap as it was
+        changes = []
+        for path, value in updates:
+            leaf = self.leaves.get(tuple(path))
+            if leaf is None:
+                if tuple(path) in self.leaves:
+                    raise ValueError(
+                        "More than one leaf has path {}".format(path))
+                raise KeyError(path)
+            changes.append((leaf, value))
+
+        dirty = set()
+        for leaf, value in changes:
+            delta = value - leaf.value
+            leaf.value = value
+            node = self.parents.get(leaf)
+            while node is not None:
+                node.value += delta
+                dirty.add(node)
+                node = self.parents.get(node)
+
+        diff = TreemapDiff()
+        if dirty:
+            self.__layout(self.boxes[self.tree], dirty, diff)
+        return diff
+
+
+    def __layout(self, box, dirty, diff):
+        '''
+        Lays out the tree again, starting at the root, skipping the
+        subtrees that would get the same rectangles as before.
+
+        Inputs:
+            box: (tuple) the box (x, y, width, height) of the root
+            dirty: (set) the nodes whose children changed value
+            diff: (TreemapDiff) where to record the changes
+        '''
+
+        stack = [(self.tree, box)]
+        while stack:
+            node, box = stack.pop()
+            if box == self.boxes.get(node) and node not in dirty:
+                continue
+            self.boxes[node] = box
+
+            if node.num_children() == 0:
+                rec = treemap.Rectangle.from_trusted(*box, node.key,
+                                                     tuple(node.path))
+                if node in self.recs:
+                    diff.changed.append(rec)
+                else:
+                    diff.added.append(rec)
+                self.recs[node] = rec
+                continue
+
+            children, boxes = layout.child_boxes(node, *box)
+            visible = set(children)
+            for st in self.order.get(node, []):
+                if st not in visible:
+                    self.__remove(st, diff)
+            self.order[node] = children
+            for st, child_box in zip(children, boxes.tolist()):
+                stack.append((st, tuple(child_box)))
+
+
+    def __remove(self, t, diff):
+        '''
+        Forgets the layout of a subtree that is no longer visible.
+
+        Inputs:
+            t: (Tree) the root of the subtree
+            diff: (TreemapDiff) where to record the removed rectangles
+        '''
+
+        for node in traversal.preorder(t, lambda n: self.order.pop(n, [])):
+            self.boxes.pop(node, None)
+            rec = self.recs.pop(node, None)
+            if rec is not None:
+                diff.removed.append(rec)
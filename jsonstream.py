@@ -0,0 +1,276 @@
+'''
+CS 121: Streaming JSON
+
+A small incremental JSON reader. It reads a file in fixed-size chunks
+and lets the caller walk through the document one token at a time,
+decoding only the values it asks for and skipping the others without
+building them. Memory use is bounded by the chunk size plus whatever
+the caller decides to keep.
+'''
+
+import itertools
+import json
+import re
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Everything up to and including the next bracket that is not inside a
+# string, or up to the quote of a string cut off by the end of the buffer
+SKIP_TO_BRACKET = re.compile(
+    r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}"])')
+
+STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+# Whole strings and the characters between them, up to the quote of a
+# string that is cut off
+COMPLETE_STRINGS = re.compile(r'(?:[^"]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+# Deletes everything but the brackets from text outside strings
+BRACKETS_ONLY = {i: None for i in range(128) if chr(i) not in "[]{}"}
+DEPTH_CHANGE = {"[": 1, "{": 1, "]": -1, "}": -1}
+
+CHUNK_SIZE = 1 << 16
+
+# Number of characters skip_value counts the brackets of at once: it
+# starts small, so that small values are cheap to skip, and doubles
+MIN_SCAN_SIZE = 1 << 8
+MAX_SCAN_SIZE = 1 << 14
+
+# A decoding error this close to the end of the buffer may only mean
+# that the value is cut off by it
+MAX_CUT_TOKEN = 32
+
+
+class JSONStream:
+    '''
+    Reads a JSON document from a file, token by token.
+
+    Attributes:
+        f: the file being read
+        buf: (str) the part of the file that has been read but not used
+        pos: (int) position of the next character in buf
+        offset: (int) position in the file of the start of buf
+        eof: (bool) whether the whole file has been read into buf
+    '''
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        '''
+        Constructs a new JSONStream.
+
+        Inputs:
+            f: a file opened in text mode
+            chunk_size: (int) number of characters to read at a time
+        '''
+
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+
+    def refill(self):
+        '''
+        Reads the next chunk of the file, dropping the part of the buffer
+        that has already been used.
+
+        Returns: (bool) False if there was nothing left to read.
+        '''
+
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+
+    def peek(self):
+        '''
+        Skips whitespace and returns the next character without
+        consuming it.
+
+        Returns: (str) the next character, or "" at the end of the file.
+        '''
+
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.refill():
+                return ""
+
+
+    def expect(self, ch):
+        '''
+        Consumes the next character, which must be ch.
+        '''
+
+        got = self.peek()
+        if got != ch:
+            raise self.error("Expected {!r} but found {!r}".format(
+                ch, got or "end of file"))
+        self.pos += 1
+
+
+    def accept(self, ch):
+        '''
+        Consumes the next character if it is ch.
+
+        Returns: (bool) whether the character was consumed.
+        '''
+
+        if self.peek() == ch:
+            self.pos += 1
+            return True
+        return False
+
+
+    def read_value(self):
+        '''
+        Reads and decodes the next value. Raises ValueError, with the
+        position of the problem in the file, if it is not valid JSON.
+
+        Returns: the decoded value.
+        '''
+
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # The value may just be cut off at the end of the buffer,
+                # but the rest of the file is not read to find out
+                cut = e.msg.startswith("Unterminated string") \
+                    or e.pos + MAX_CUT_TOKEN >= len(self.buf)
+                if cut and self.refill():
+                    continue
+                raise self.error(e.msg, e.pos) from None
+            if end < len(self.buf) or not self.refill():
+                self.pos = end
+                return value
+
+
+    def skip_value(self):
+        '''
+        Consumes the next value without decoding it. Arrays and objects
+        are skipped a block of characters at a time: the block is split
+        on quotes, the brackets are kept from the parts outside strings,
+        and the running depth is summed over them, all without a Python
+        loop per character or token. Only the block where the value ends
+        is gone through one bracket at a time.
+        '''
+
+        ch = self.peek()
+        if ch not in "[{":
+            if ch in "]}":
+                raise self.error("Expected a value")
+            self.read_value()
+            return
+
+        self.pos += 1
+        depth = 1
+        scan_size = MIN_SCAN_SIZE
+        while True:
+            end, brackets = self.__scan(scan_size)
+            if end == self.pos:
+                # The block starts with a string that it cuts off
+                m = STRING.match(self.buf, self.pos)
+                if m:
+                    self.pos = m.end()
+                elif not self.refill():
+                    raise self.error("Unexpected end of file")
+                continue
+
+            depths = list(itertools.accumulate(
+                map(DEPTH_CHANGE.get, brackets, itertools.repeat(0)),
+                initial=depth))
+            if min(depths) > 0:
+                depth = depths[-1]
+                self.pos = end
+                if self.pos == len(self.buf) and not self.refill():
+                    raise self.error("Unexpected end of file")
+                scan_size = min(2 * scan_size, MAX_SCAN_SIZE)
+                continue
+
+            for m in SKIP_TO_BRACKET.finditer(self.buf, self.pos, end):
+                depth += DEPTH_CHANGE[m.group(1)]
+                if depth == 0:
+                    self.pos = m.end()
+                    return
+
+
+    def __scan(self, scan_size):
+        '''
+        Looks at up to scan_size characters from pos, stopping before a
+        string that they would cut off.
+
+        Returns: (int, str) the end of the characters looked at and the
+            brackets outside strings among them
+        '''
+
+        block = self.buf[self.pos:self.pos + scan_size]
+        if '\\"' in block:
+            # An escaped quote, which splitting on quotes would take for
+            # the end of a string
+            end = self.__complete_strings_end(self.pos + scan_size)
+            parts = STRING.split(self.buf[self.pos:end])
+        else:
+            parts = block.split('"')
+            end = self.pos + len(block)
+            if len(parts) % 2 == 0:
+                end -= len(parts.pop()) + 1
+            parts = parts[::2]
+        return end, "".join(parts).translate(BRACKETS_ONLY)
+
+
+    def __complete_strings_end(self, endpos):
+        '''
+        Returns: (int) the end of the part of the buffer, from pos and
+            before endpos, that does not cut a string off
+        '''
+
+        return COMPLETE_STRINGS.match(self.buf, self.pos, endpos).end()
+
+
+    def iter_object(self):
+        '''
+        Walks through an object. After each key is yielded, the caller
+        must consume its value (with read_value, skip_value or any other
+        method) before asking for the next key.
+
+        Returns: a generator that yields the keys of the object.
+        '''
+
+        self.expect("{")
+        if self.accept("}"):
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise self.error("Expected an object key")
+            self.expect(":")
+            yield key
+            if self.accept("}"):
+                return
+            self.expect(",")
+
+
+    def error(self, msg, pos=None):
+        '''
+        Returns: a ValueError describing a problem at a position in the
+            buffer (by default, the current position), which gives its
+            position in the file.
+        '''
+
+        if pos is None:
+            pos = self.pos
+        return ValueError("{} at character {} (near {!r})".format(
+            msg, self.offset + pos, self.buf[pos:pos + 20]))
@@ -0,0 +1,100 @@
+'''
+CS 121: Treemap Labels
+
+Fits labels into their rectangles the way drawing.ChiCanvas always has
+(a character is taken to be half as wide as the font size, and the text
+only fills 90% of the width and 80% of the height of its box), but for
+all the rectangles at once: the number of characters per line and the
+number of lines of every box are computed from the arrays of their
+sizes, and the wrapped text is cached by label and box size in
+characters and lines, which only takes a handful of distinct values.
+'''
+
+import functools
+import textwrap
+
+import numpy as np
+
+
+# Width of a character, relative to the font size
+CHAR_WIDTH = 0.5
+
+# Fraction of the width and of the height of a box that text may fill
+WIDTH_FILL = 0.9
+HEIGHT_FILL = 0.8
+
+# Boxes that hold fewer characters than this are left empty
+MIN_CHARS = 4
+
+CACHE_SIZE = 1 << 16
+
+# Shared by all the renderers: rectangles with a side shorter than this
+# (in the coordinates of the layout) are not labeled, and labels are in
+# a FONT_SIZE point font, at DPI pixels per inch (matplotlib's defaults)
+MIN_RECT_SIDE_FOR_TEXT = 0.03
+FONT_SIZE = 10
+DPI = 100
+
+
+def budgets(widths, heights, font_px):
+    '''
+    Computes how much text fits in boxes.
+
+    Inputs:
+        widths, heights: (arrays of float) the sizes of the boxes, in
+            pixels
+        font_px: (float) the font size, in pixels
+
+    Returns: a pair of arrays of int, the number of characters per line
+        and the number of lines that fit in each box
+    '''
+
+    widths = np.asarray(widths, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    clip_chars = np.maximum(0, (widths // (CHAR_WIDTH * font_px)
+                                * WIDTH_FILL).astype(np.int64))
+    max_lines = np.maximum(0, (heights // font_px
+                               * HEIGHT_FILL).astype(np.int64))
+    return clip_chars, max_lines
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def wrap(label, clip_chars, max_lines):
+    '''
+    Wraps a label to clip_chars characters per line and keeps the first
+    max_lines lines.
+
+    Inputs:
+        label: (string) the label
+        clip_chars: (int) number of characters per line
+        max_lines: (int) number of lines
+
+    Returns: (tuple of strings) the lines, none if the box holds fewer
+        than MIN_CHARS characters
+    '''
+
+    if clip_chars * max_lines < MIN_CHARS:
+        return ()
+
+    lines = []
+    for original in label.split("\n"):
+        lines.extend(textwrap.wrap(original, width=clip_chars))
+    return tuple(lines[:max_lines])
+
+
+def fit(labels, widths, heights, font_px):
+    '''
+    Fits labels into boxes.
+
+    Inputs:
+        labels: (list of strings) the labels
+        widths, heights: (arrays of float) the sizes of the boxes, in
+            pixels
+        font_px: (float) the font size, in pixels
+
+    Returns: list with the lines (tuple of strings) of each label
+    '''
+
+    clip_chars, max_lines = budgets(widths, heights, font_px)
+    return [wrap(label, c, l) for label, c, l in
+            zip(labels, clip_chars.tolist(), max_lines.tolist())]
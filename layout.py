@@ -0,0 +1,815 @@
+'''
+CS 121: Vectorized Treemap Layout
+
+A NumPy-backed version of compute_rectangles. It follows exactly the
+same rules as treemap.compute_rectangles (the rows built on compute_row
+and grown while their worst aspect ratio does not get worse), and
+produces exactly the same coordinates, but it works on the sorted child
+values of each node as an array:
+
+  - the sums of all the candidate rows starting at a given child are
+    one cumulative sum, so their widths are one array operation;
+  - the children of a row are sorted by value, so the worst aspect
+    ratio of a candidate row is always that of its first or its last
+    rectangle, which gives the worst aspect ratio of every candidate
+    row at once;
+  - the worst aspect ratio first goes down and then up as a row grows,
+    so the end of a row is found by looking at windows of candidate rows
+    of doubling size, which costs time proportional to the length of the
+    row and not to the number of children left (see find_row);
+  - the rectangles of a row are placed with one more cumulative sum.
+
+Nodes with fewer children are laid out by squarify_scalar, which uses
+the same arithmetic one child at a time, since NumPy's per-call overhead
+outweighs its benefits on small inputs.
+
+The coordinates of the leaves are written into float arrays, and only
+turned into Rectangle objects if they are asked for.
+'''
+
+import itertools
+import operator
+
+import numpy as np
+
+import palette
+import paths
+import traversal
+import tree
+import treemap
+
+
+# Nodes with fewer children than this are laid out one child at a time
+# by squarify_scalar, which is faster for small inputs.
+VECTORIZE_MIN_CHILDREN = 256
+
+# Number of candidate rows find_row looks at first for the first row of
+# a node; the next rows start with twice the length of the previous one.
+MIN_WINDOW = 8
+
+INITIAL_CAPACITY = 1024
+
+
+class Layout:
+    '''
+    The rectangles of a treemap, stored as arrays.
+
+    Attributes:
+        x, y, width, height: (numpy arrays of float) coordinates of the
+            rectangles
+        nodes: (list) the leaf that each rectangle was laid out for
+        color_ids: (numpy array of int) index into color_codes of the
+            color code (the path) of each rectangle
+        color_codes: (list) the distinct color codes, in the order they
+            were first laid out
+    '''
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        '''
+        Constructs an empty Layout.
+
+        Inputs:
+            capacity: (int) number of rectangles to preallocate room for
+        '''
+
+        self.nodes = []
+        self.__coords = np.empty((4, max(capacity, 1)))
+        self.__color_ids = np.empty(max(capacity, 1), dtype=np.int32)
+        self.color_codes = []
+        self.__code_ids = {}
+
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+    def append(self, node, x, y, width, height, code=None):
+        '''
+        Adds a rectangle to the layout, with the color code code, or the
+        path of the node if code is None.
+        '''
+
+        n = len(self.nodes)
+        self.__reserve(n + 1)
+        self.__coords[:, n] = (x, y, width, height)
+        self.__color_ids[n], = palette.intern_codes(
+            [node.path if code is None else code], self.color_codes,
+            self.__code_ids)
+        self.nodes.append(node)
+
+
+    def extend(self, nodes, boxes, codes=None):
+        '''
+        Adds several rectangles to the layout at once.
+
+        Inputs:
+            nodes: (list) the leaves the rectangles were laid out for
+            boxes: (array-like) one row (x, y, width, height) per leaf
+            codes: (list) the color code of each rectangle, or None to
+                use the paths of the leaves
+        '''
+
+        if len(nodes) == 0:
+            return
+        if codes is None:
+            codes = [node.path for node in nodes]
+        n = len(self.nodes)
+        self.__reserve(n + len(nodes))
+        self.__coords[:, n:n + len(nodes)] = np.asarray(boxes).T
+        self.__color_ids[n:n + len(nodes)] = palette.intern_codes(
+            codes, self.color_codes, self.__code_ids)
+        self.nodes.extend(nodes)
+
+
+    def __reserve(self, size):
+        '''
+        Grows the arrays, doubling their size, until they can hold size
+        rectangles.
+        '''
+
+        capacity = self.__coords.shape[1]
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            coords = np.empty((4, capacity))
+            coords[:, :len(self.nodes)] = self.__coords[:, :len(self.nodes)]
+            self.__coords = coords
+            color_ids = np.empty(capacity, dtype=np.int32)
+            color_ids[:len(self.nodes)] = self.__color_ids[:len(self.nodes)]
+            self.__color_ids = color_ids
+
+
+    @property
+    def x(self):
+        return self.__coords[0, :len(self.nodes)]
+
+
+    @property
+    def y(self):
+        return self.__coords[1, :len(self.nodes)]
+
+
+    @property
+    def width(self):
+        return self.__coords[2, :len(self.nodes)]
+
+
+    @property
+    def height(self):
+        return self.__coords[3, :len(self.nodes)]
+
+
+    @property
+    def color_ids(self):
+        return self.__color_ids[:len(self.nodes)]
+
+
+    def rectangles(self):
+        '''
+        Returns: list of Rectangle objects, labeled with the key of the
+            leaf and colored by its path, as compute_rectangles does.
+        '''
+
+        coords = self.__coords[:, :len(self.nodes)].T.tolist()
+        codes = [self.color_codes[i] for i in self.color_ids.tolist()]
+        return [treemap.Rectangle.from_trusted(x, y, width, height, t.key,
+                                               code)
+                for (x, y, width, height), t, code in
+                zip(coords, self.nodes, codes)]
+
+
+def compute_layout(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                   workers=None):
+    '''
+    Computes the layout of a treemap of the provided tree.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        workers: (int) the number of processes to lay out the tree with
+            (see parallel.py). None or 1 lays it out in this process.
+
+    Returns: a Layout with one rectangle per visible leaf, in the same
+        order as compute_rectangles.
+    '''
+
+    if workers is not None and workers > 1:
+        import parallel
+        return parallel.compute_layout(t, bounding_rec_width,
+                                       bounding_rec_height, workers)
+
+    layout = Layout()
+    for nodes, boxes in iter_layout(t, bounding_rec_width,
+                                    bounding_rec_height):
+        layout.extend(nodes, boxes)
+    return layout
+
+
+def iter_layout(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                batch_size=INITIAL_CAPACITY):
+    '''
+    Generator version of compute_layout: yields the rectangles of the
+    leaves in batches, as they are laid out.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        batch_size: (int) number of leaves laid out one at a time that
+            are collected before they are yielded
+
+    Returns: a generator of pairs (nodes, boxes), where nodes is a list of
+        leaves and boxes is an array with one row (x, y, width, height)
+        per leaf, in the same order as compute_rectangles.
+    '''
+
+    index = index_tree(t)
+
+    return layout_tree(t, 0.0, 0.0, float(bounding_rec_width),
+                       float(bounding_rec_height), batch_size, index)
+
+
+class TreeIndex:
+    '''
+    What index_tree finds out about the nodes of a tree, kept on the side
+    so that the tree itself is not changed.
+
+    Attributes:
+        children: (dict) maps each internal node to its children with
+            positive values, sorted with treemap.sorted_trees (the order
+            they are laid out in)
+        sizes: (dict) maps each internal node to the number of nodes in
+            its subtree
+        root_depth: (int) length of the path of the root
+    '''
+
+    def __init__(self, root_depth=0):
+        self.children = {}
+        self.sizes = {}
+        self.root_depth = root_depth
+
+
+    def depth(self, node):
+        '''
+        Returns: (int) the depth of a node, 0 for the root. Its path
+            already has one key per level, so it is not stored.
+        '''
+        return len(node.path) - self.root_depth
+
+
+    def size(self, node):
+        '''
+        Returns: (int) the number of nodes in the subtree of a node
+        '''
+        return self.sizes.get(node, 1)
+
+
+def index_tree(t, prefix=()):
+    '''
+    Does everything a tree needs before it is laid out in a single walk
+    of the tree: computes the values of the internal nodes (as
+    treemap.compute_internal_values does) and the paths of all the nodes
+    (as treemap.compute_paths does), and records the sizes and the sorted
+    children of the internal nodes in a TreeIndex.
+
+    The paths are assigned on the way down. Everything else needs the
+    children of a node first, so it is computed going through the
+    internal nodes in the reverse of the order they were visited in.
+
+    Inputs:
+        t: (Tree) a tree
+        prefix: (tuple of strings) prefix to add to the paths
+
+    Returns: a TreeIndex
+    '''
+
+    root_path = paths.Path.of(prefix)
+    index = TreeIndex(len(root_path))
+    t.path = root_path
+
+    # Only internal nodes are pushed: the leaves are done as soon as
+    # their parent is visited
+    internal = []
+    stack = [(t, root_path)] if t.children else []
+    while stack:
+        node, path = stack.pop()
+        internal.append(node)
+        child_path = paths.Path(path, node.key)
+        for st in node.children:
+            st.path = child_path
+            if st.children:
+                stack.append((st, child_path))
+
+    get_value = operator.attrgetter("value")
+    ones = itertools.repeat(1)
+    sizes, sorted_children = index.sizes, index.children
+    for node in reversed(internal):
+        children = node.children
+        node.value = sum(map(get_value, children))
+        sizes[node] = 1 + sum(map(sizes.get, children, ones))
+        children = treemap.sorted_trees(children)
+        if children[-1].value <= 0:
+            children = [st for st in children if st.value > 0]
+        sorted_children[node] = children
+    return index
+
+
+def layout_tree(t, x, y, width, height, batch_size=INITIAL_CAPACITY,
+                index=None):
+    '''
+    Lays out a tree whose values and paths have already been computed.
+
+    Inputs:
+        t: (Tree) a tree
+        x, y, width, height: (float) the box the tree should fill
+        batch_size: (int) see iter_layout
+        index: (TreeIndex) the index of the tree, to take the sorted
+            children of each node from, or None to sort them here
+
+    Returns: a generator of pairs (nodes, boxes), as iter_layout.
+    '''
+
+    ready = []
+
+    def children_frames(frame):
+        if index is None:
+            children, boxes = child_boxes(*frame)
+        elif frame[0] in index.children:
+            children, boxes = sorted_boxes(index.children[frame[0]],
+                                           *frame[1:])
+        else:
+            return []
+        if all(st.num_children() == 0 for st in children):
+            # The children would be visited right away anyway, so lay
+            # them out all at once
+            ready.append((children, boxes))
+            return []
+        return [(st,) + tuple(box)
+                for st, box in zip(children, boxes.tolist())]
+
+    nodes = []
+    boxes = []
+    for frame in traversal.preorder((t, x, y, width, height),
+                                    children_frames):
+        # Children laid out all at once come before the current node
+        if ready:
+            if nodes:
+                yield nodes, np.array(boxes)
+                nodes, boxes = [], []
+            yield from ready
+            ready.clear()
+        if frame[0].num_children() == 0:
+            nodes.append(frame[0])
+            boxes.append(frame[1:])
+            if len(nodes) == batch_size:
+                yield nodes, np.array(boxes)
+                nodes, boxes = [], []
+    if nodes:
+        yield nodes, np.array(boxes)
+    yield from ready
+
+
+def compute_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                       workers=None):
+    '''
+    Same as treemap.compute_rectangles, using the vectorized layout.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        workers: (int) the number of processes to lay out the tree with
+            (see compute_layout)
+
+    Returns: a list of Rectangle objects.
+    '''
+
+    if workers is not None and workers > 1:
+        return compute_layout(t, bounding_rec_width, bounding_rec_height,
+                              workers).rectangles()
+    return list(iter_rectangles(t, bounding_rec_width, bounding_rec_height))
+
+
+def iter_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0):
+    '''
+    Same as treemap.iter_rectangles, using the vectorized layout.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+
+    Returns: a generator of Rectangle objects.
+    '''
+
+    for nodes, boxes in iter_layout(t, bounding_rec_width,
+                                    bounding_rec_height):
+        for (x, y, width, height), node in zip(boxes.tolist(), nodes):
+            yield treemap.Rectangle.from_trusted(x, y, width, height,
+                                                 node.key, node.path)
+
+
+class Aggregate:
+    '''
+    Stands for the children of a node that are too small to be seen,
+    folded into a single rectangle by compute_visible_layout.
+
+    Attributes:
+        key: (string) label of the rectangle
+        value: (number) sum of the values of the folded children
+        path: (Path) path of the folded children
+        count: (int) number of folded children
+    '''
+
+    def __init__(self, key, value, path, count):
+        self.key = key
+        self.value = value
+        self.path = path
+        self.count = count
+        self.children = []
+
+
+    def num_children(self):
+        """Returns the number of children"""
+        return 0
+
+
+OTHER_KEY = "other"
+
+
+def compute_visible_layout(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                           max_depth=None, min_side=0.0, min_area=0.0,
+                           viewport=None, compute_values=True):
+    '''
+    Computes the layout of the part of a treemap that can be seen. The
+    layout is the same as compute_layout's, except that a node is drawn
+    as a single rectangle, without laying out its subtree, when:
+      - it is max_depth levels below the root, or
+      - its rectangle is narrower than min_side or smaller than min_area.
+    The children of a node that would be smaller than min_area are folded
+    into a single Aggregate node, laid out with the others. Subtrees that
+    are outside the viewport are skipped altogether, and the rectangles
+    that are partly outside it are clipped to it. Once the values of the
+    internal nodes are computed, the time it takes depends on the number
+    of rectangles it returns, not on the size of the tree; computing
+    them (compute_values) takes a walk of the whole tree.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        max_depth: (int) depth of the deepest nodes to lay out, or None
+        min_side, min_area: (float) smallest side and area of a rectangle
+            that is subdivided, measured after zooming into the viewport
+        viewport: (tuple) the part (x, y, width, height) of the bounding
+            rectangle to zoom into, or None for the whole rectangle
+        compute_values: (bool) whether to compute the values of the
+            internal nodes first. Pass False if they are already computed.
+
+    Returns: a Layout, in the coordinates of the viewport scaled to the
+        bounding rectangle, where every rectangle is colored by the path
+        of its node. The nodes themselves are not changed. Raises
+        ValueError if the viewport has no area.
+    '''
+
+    width, height = float(bounding_rec_width), float(bounding_rec_height)
+    if viewport is None:
+        viewport = (0.0, 0.0, width, height)
+    vx, vy, vw, vh = viewport
+    if not (vw > 0 and vh > 0):
+        raise ValueError("The viewport {} has no area".format(viewport))
+
+    if compute_values:
+        treemap.compute_internal_values(t)
+    sx, sy = width / vw, height / vh
+
+    def visible(frame):
+        _, x, y, w, h, _, _ = frame
+        return x < vx + vw and x + w > vx and y < vy + vh and y + h > vy
+
+    def subdivided(frame):
+        node, _, _, w, h, _, depth = frame
+        return node.num_children() > 0 and visible(frame) \
+            and (max_depth is None or depth < max_depth) \
+            and min(w * sx, h * sy) >= min_side \
+            and w * sx * h * sy >= min_area
+
+    def children_frames(frame):
+        if not subdivided(frame):
+            return []
+        node, x, y, w, h, path, depth = frame
+        child_path = path.child(node.key)
+
+        children = [st for st in treemap.sorted_trees(node.children)
+                    if st.value > 0]
+        if not children:
+            return []
+        area_per_value = w * sx * h * sy / node.value
+        small = len(children)
+        while small > 0 and children[small - 1].value * area_per_value \
+                < min_area:
+            small -= 1
+        if len(children) - small > 1:
+            other = Aggregate(OTHER_KEY,
+                              sum(st.value for st in children[small:]),
+                              child_path, len(children) - small)
+            children = treemap.sorted_trees(children[:small] + [other])
+
+        children, boxes = sorted_boxes(children, x, y, w, h)
+        return [(st,) + tuple(box) + (child_path, depth + 1)
+                for st, box in zip(children, boxes.tolist())]
+
+    layout = Layout()
+    root = (t, 0.0, 0.0, width, height, paths.EMPTY, 0)
+    for frame in traversal.preorder(root, children_frames):
+        if visible(frame) and not subdivided(frame):
+            node, x, y, w, h, path, _ = frame
+            x, w = clip(x, w, vx, vw)
+            y, h = clip(y, h, vy, vh)
+            layout.append(node, (x - vx) * sx, (y - vy) * sy, w * sx, h * sy,
+                          path)
+    return layout
+
+
+def clip(start, length, view_start, view_length):
+    '''
+    Clips a segment to a view that it overlaps. Segments that are inside
+    the view are returned as they are.
+
+    Inputs:
+        start, length: (float) the segment
+        view_start, view_length: (float) the view
+
+    Returns: the pair (start, length) of the clipped segment
+    '''
+
+    if start < view_start:
+        length -= view_start - start
+        start = view_start
+    if start + length > view_start + view_length:
+        length = view_start + view_length - start
+    return start, length
+
+
+def layout_children(t, x, y, width, height):
+    '''
+    Lay out the children of a node.
+
+    Inputs:
+        t: (Tree) a node with its values computed
+        x, y, width, height: (float) the rectangle the children should fill
+
+    Returns: list of (child, x, y, width, height) tuples in layout order.
+    '''
+
+    children, boxes = child_boxes(t, x, y, width, height)
+    return [(st,) + tuple(box) for st, box in zip(children, boxes.tolist())]
+
+
+def child_boxes(t, x, y, width, height):
+    '''
+    Lay out the children of a node.
+
+    Inputs:
+        t: (Tree) a node with its values computed
+        x, y, width, height: (float) the rectangle the children should fill
+
+    Returns: a tuple (children, boxes), where children is the list of the
+        children that are visible, in layout order, and boxes is a numpy
+        array with one row (x, y, width, height) per child.
+    '''
+
+    if t.num_children() == 0:
+        return [], np.empty((0, 4))
+
+    children = [st for st in treemap.sorted_trees(t.children) if st.value > 0]
+    return sorted_boxes(children, x, y, width, height)
+
+
+def sorted_boxes(children, x, y, width, height, rows=None):
+    '''
+    Lay out a list of nodes that is already sorted with sorted_trees and
+    only has nodes with positive values.
+
+    Inputs:
+        children: (list of Tree) the nodes to lay out
+        x, y, width, height: (float) the rectangle the nodes should fill
+        rows: (list) if not None, the rows of the layout are added to it
+            (see squarify), unless some rectangle has a zero width or
+            height and treemap.layout_children has to lay out the nodes
+
+    Returns: a tuple (children, boxes), as child_boxes.
+    '''
+
+    node_rows = None if rows is None else []
+    if len(children) >= VECTORIZE_MIN_CHILDREN:
+        values = np.fromiter((st.value for st in children), float,
+                             len(children))
+        boxes = squarify(values, x, y, width, height, node_rows)
+    else:
+        boxes = squarify_scalar([st.value for st in children],
+                                x, y, width, height, node_rows)
+
+    if boxes is not None and rows is not None:
+        rows.extend(node_rows)
+    if boxes is None:
+        parent = tree.Tree()
+        parent.children = children
+        bounding_rec = treemap.Rectangle((x, y), (width, height))
+        row_layout = treemap.layout_children(parent, bounding_rec)
+        boxes = np.array([(rec.x, rec.y, rec.width, rec.height)
+                          for rec, _ in row_layout]).reshape(-1, 4)
+        return [st for _, st in row_layout], boxes
+
+    return children, np.asarray(boxes).reshape(-1, 4)
+
+
+def squarify(values, x, y, width, height, rows=None):
+    '''
+    Lay out values as rows of rectangles, following the same rules as
+    treemap.layout_children.
+
+    Inputs:
+        values: (numpy array of float) positive values, sorted in
+            descending order
+        x, y, width, height: (float) the rectangle to fill
+        rows: (list) if not None, a tuple (start, end, wide, x, y, width,
+            height, total, row_sum, prev_sum, next_sum) is added to it
+            for every row: the values in the row, whether it was laid out
+            along the width of the rectangle left to fill, that
+            rectangle, the sum of the values left, and the sums of the
+            row and of the rows with one value fewer and one value more
+            that were compared to it (NaN if there are none)
+
+    Returns: (numpy array) an array with one row (x, y, width, height)
+        per value, or None if some rectangle would have a zero width or
+        height (compute_row drops those, which this function does not
+        handle).
+    '''
+
+    n = len(values)
+    boxes = np.empty((n, 4))
+    remaining = np.cumsum(values[::-1])[::-1]
+
+    start = 0
+    window = MIN_WINDOW
+    while start < n:
+        wide = width >= height
+        long_side, short_side = (width, height) if wide else (height, width)
+
+        length, sums, row_widths = find_row(values, start, window,
+            remaining[start], long_side, short_side)
+        if length is None:
+            return None
+        end = start + length
+        if rows is not None:
+            rows.append((start, end, wide, x, y, width, height,
+                         float(remaining[start]), float(sums[length - 1]),
+                         float(sums[length - 2]) if length > 1 else np.nan,
+                         float(sums[length]) if length < len(sums)
+                         else np.nan))
+
+        row_width = float(row_widths[length - 1])
+        heights = short_side * values[start:end] / sums[length - 1]
+        offsets = np.cumsum(np.concatenate(([y if wide else x], heights)))
+
+        row = boxes[start:end]
+        if wide:
+            row[:, 0] = x
+            row[:, 1] = offsets[:-1]
+            row[:, 2] = row_width
+            row[:, 3] = heights
+            x, width = x + row_width, width - row_width
+        else:
+            row[:, 0] = offsets[:-1]
+            row[:, 1] = y
+            row[:, 2] = heights
+            row[:, 3] = row_width
+            y, height = y + row_width, height - row_width
+        start = end
+        window = 2 * length
+
+    return boxes
+
+
+def find_row(values, start, window, total, long_side, short_side):
+    '''
+    Find how many values go in the row that starts at values[start]: the
+    row keeps growing as long as adding the next value does not make its
+    worst aspect ratio worse.
+
+    Since the values are sorted, the worst aspect ratio of a candidate
+    row is that of its first or its last rectangle, and it first goes
+    down and then up as the row grows. This function only looks at the
+    candidate rows that fit in a window, and doubles the window until
+    it contains the end of the row, so finding a row of length k costs
+    O(k) array operations no matter how many values are left.
+
+    Inputs:
+        values: (numpy array of float) positive values, sorted in
+            descending order
+        start: (int) index of the first value in the row
+        window: (int) number of candidate rows to look at first
+        total: (float) sum of values[start:]
+        long_side, short_side: (float) sides of the rectangle to fill
+
+    Returns: a tuple (length, sums, row_widths), where length is the
+        number of values in the row and sums and row_widths are the
+        sums and widths of the candidate rows, or (None, None, None) if
+        some rectangle would have a zero width or height.
+    '''
+
+    n = len(values) - start
+    while True:
+        window = max(min(window, n), 1)
+
+        # Sums, widths and worst aspect ratios of the rows made of the
+        # values start, ..., start + k for every k < window
+        sums = np.cumsum(values[start:start + window])
+        row_widths = long_side * sums / total
+        first_heights = short_side * values[start] / sums
+        last_heights = short_side * values[start:start + window] / sums
+        if not (row_widths.all() and last_heights.all()):
+            return None, None, None
+        worst = np.maximum(
+            np.maximum(row_widths / first_heights, first_heights / row_widths),
+            np.maximum(row_widths / last_heights, last_heights / row_widths))
+
+        worse = np.flatnonzero(worst[1:] > worst[:-1])
+        if len(worse) > 0:
+            return worse[0] + 1, sums, row_widths
+        if window == n:
+            return n, sums, row_widths
+        window *= 2
+
+
+def squarify_scalar(values, x, y, width, height, rows=None):
+    '''
+    Same as squarify, for a list of values, without NumPy. Each candidate
+    row is checked in constant time, from the sum of the previous one.
+
+    Inputs:
+        values: (list of float) positive values, sorted in descending order
+        x, y, width, height: (float) the rectangle to fill
+        rows: (list) see squarify
+
+    Returns: a list with one list [x, y, width, height] per value, or
+        None if some rectangle would have a zero width or height.
+    '''
+
+    n = len(values)
+    boxes = []
+    remaining = treemap.suffix_sums(values)
+
+    start = 0
+    while start < n:
+        total = remaining[start]
+        wide = width >= height
+        long_side, short_side = (width, height) if wide else (height, width)
+
+        first = values[start]
+        row_sum = first
+        row_width = long_side * row_sum / total
+        height_first = short_side * first / row_sum
+        if row_width == 0 or height_first == 0:
+            return None
+        worst = max(row_width / height_first, height_first / row_width)
+
+        prev_sum = np.nan
+        end = start + 1
+        while end < n:
+            next_sum = row_sum + values[end]
+            next_width = long_side * next_sum / total
+            next_first = short_side * first / next_sum
+            next_last = short_side * values[end] / next_sum
+            if next_width == 0 or next_last == 0:
+                return None
+            next_worst = max(max(next_width / next_first,
+                                 next_first / next_width),
+                             max(next_width / next_last,
+                                 next_last / next_width))
+            if next_worst > worst:
+                break
+            prev_sum = row_sum
+            row_sum, row_width, worst = next_sum, next_width, next_worst
+            end += 1
+
+        if rows is not None:
+            rows.append((start, end, wide, x, y, width, height, total,
+                         row_sum, prev_sum, next_sum if end < n else np.nan))
+        offset = y if wide else x
+        for v in values[start:end]:
+            h = short_side * v / row_sum
+            if wide:
+                boxes.append([x, offset, row_width, h])
+            else:
+                boxes.append([offset, y, h, row_width])
+            offset += h
+        if wide:
+            x, width = x + row_width, width - row_width
+        else:
+            y, height = y + row_width, height - row_width
+        start = end
+
+    return boxes
@@ -0,0 +1,507 @@
+'''
+CS 121: Layout Cache
+
+Keeps the layouts of trees that were already laid out, so that laying
+out the same tree again (for example, a tree that has not changed since
+it was last requested) only takes hashing it and computing its paths.
+
+Every node gets a Merkle-style digest: a hash of its key and either its
+value (for a leaf) or the digests of its children, in order. Two
+subtrees with the same digest have the same keys, leaf values and
+shape, so they have the same layout in the same box. The cache maps a
+digest and a box to the layout of the subtree in that box, as the
+pre-order index in the subtree of each visible leaf and its rectangle.
+The layout of a whole tree also has the label and the color code of
+every rectangle, so when it is found, the rectangles are built without
+going through the tree again.
+
+The root and the subtrees with at least MIN_CACHED_NODES nodes are
+cached, so when only part of a tree changes, the subtrees that did not
+change (and are laid out in the same box as before) are not laid out
+again. Layouts are kept in memory, in a LRU cache, and optionally in a
+directory, one .npz file per layout, which other processes can share.
+
+Usage: python3 treemap.py data/birds.json Year --cache-dir cache
+'''
+
+import collections
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+import layout
+import palette
+import traversal
+import treemap
+
+
+# Changing how layouts are computed or stored must change this, so that
+# older cached layouts are not used
+FORMAT_VERSION = 2
+
+DIGEST_SIZE = 16
+
+# Only subtrees with at least this many nodes are looked up and stored
+MIN_CACHED_NODES = 256
+
+MEMORY_CAPACITY = 1024
+DISK_CAPACITY = 16384
+
+
+class CachedLayout:
+    '''
+    The layout of a subtree in a box, as it is kept in a cache.
+
+    Attributes:
+        indices: (numpy array of int) pre-order index of each visible
+            leaf in the subtree
+        boxes: (numpy array) one row (x, y, width, height) per leaf
+        labels: (list) the key of each leaf, or None
+        color_codes: (list of tuples) the distinct color codes (the paths
+            of the leaves, from the root of the subtree), or None
+        color_ids: (numpy array of int) index into color_codes of the
+            color code of each leaf, or None
+
+    The labels and color codes are only kept for whole trees.
+    '''
+
+    def __init__(self, indices, boxes, labels=None, color_codes=None,
+                 color_ids=None):
+        self.indices = indices
+        self.boxes = boxes
+        self.labels = labels
+        self.color_codes = color_codes
+        self.color_ids = color_ids
+
+
+    def rectangles(self):
+        '''
+        Returns: list of Rectangle objects, the same as the Layout of the
+            tree would return (see layout.Layout.rectangles)
+        '''
+
+        codes = [self.color_codes[i] for i in self.color_ids.tolist()]
+        return [treemap.Rectangle.from_trusted(x, y, width, height, label,
+                                               code)
+                for (x, y, width, height), label, code in
+                zip(self.boxes.tolist(), self.labels, codes)]
+
+
+class LayoutCache:
+    '''
+    An LRU cache of layouts, in memory and optionally on disk.
+
+    Attributes:
+        hits, misses: (int) number of lookups that found a layout, and
+            that did not
+    '''
+
+    def __init__(self, directory=None, capacity=MEMORY_CAPACITY,
+                 disk_capacity=DISK_CAPACITY):
+        '''
+        Constructs a cache.
+
+        Inputs:
+            directory: (string) the directory to keep layouts in, or None
+                to only keep them in memory. It is created if needed.
+            capacity: (int) number of layouts to keep in memory
+            disk_capacity: (int) number of layouts to keep in directory
+        '''
+
+        self.directory = directory
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self.hits = 0
+        self.misses = 0
+        self.__memory = collections.OrderedDict()
+        self.__disk_count = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.__disk_count = len(self.__disk_files())
+
+
+    def get(self, key):
+        '''
+        Looks up a layout.
+
+        Inputs:
+            key: (string) the key of the layout (see layout_key)
+
+        Returns: a CachedLayout, or None
+        '''
+
+        value = self.__memory.pop(key, None)
+        if value is None and self.directory is not None:
+            value = self.__load(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__remember(key, value)
+        return value
+
+
+    def put(self, key, value):
+        '''
+        Stores a layout.
+
+        Inputs:
+            key: (string) the key of the layout (see layout_key)
+            value: (CachedLayout) the layout
+        '''
+
+        self.__remember(key, value)
+        if self.directory is not None:
+            self.__store(key, value)
+
+
+    def __remember(self, key, value):
+        '''
+        Puts a layout at the most recently used end of the memory cache.
+        '''
+
+        self.__memory[key] = value
+        if len(self.__memory) > self.capacity:
+            self.__memory.popitem(last=False)
+
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+
+    def __disk_files(self):
+        return [entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(".npz")]
+
+
+    def __load(self, key):
+        '''
+        Reads a layout from the cache directory. Reading a file marks it
+        as recently used.
+        '''
+
+        filename = self.__path(key)
+        try:
+            with np.load(filename) as data:
+                value = CachedLayout(data["indices"], data["boxes"])
+                if "labels" in data.files:
+                    labels = json.loads(data["labels"].item())
+                    value.labels = labels["labels"]
+                    value.color_codes = [tuple(code) for code in
+                                         labels["color_codes"]]
+                    value.color_ids = data["color_ids"]
+            os.utime(filename)
+        except (OSError, ValueError, KeyError):
+            return None
+        return value
+
+
+    def __store(self, key, value):
+        '''
+        Writes a layout to the cache directory, and removes the least
+        recently used layouts if there are too many. The labels and color
+        codes are written as json, and left out if they cannot be.
+        '''
+
+        arrays = {"indices": value.indices, "boxes": value.boxes}
+        if value.labels is not None:
+            try:
+                arrays["labels"] = np.array(json.dumps(
+                    {"labels": value.labels,
+                     "color_codes": [list(code) for code in
+                                     value.color_codes]}))
+                arrays["color_ids"] = value.color_ids
+            except (TypeError, ValueError):
+                pass
+
+        filename = self.__path(key)
+        is_new = not os.path.exists(filename)
+        # Written under another name first, so that other processes never
+        # see half-written files
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, filename)
+
+        if is_new:
+            self.__disk_count += 1
+        if self.__disk_count > self.disk_capacity:
+            files = sorted(self.__disk_files(),
+                           key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:len(files) - self.disk_capacity]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self.__disk_count = min(len(files), self.disk_capacity)
+
+
+def subtree_digests(t):
+    '''
+    Computes the digests of the subtrees of a tree: the hash of the key of
+    the root of a subtree and of what its children are. A child that is
+    a leaf is described by its key and its value, and any other child by
+    its digest.
+
+    Inputs:
+        t: (Tree) a tree
+
+    Returns: dictionary mapping the root and every internal node to its
+        digest (bytes)
+    '''
+
+    # Only internal nodes are visited: the leaves are part of the digest
+    # of their parent
+    internal = []
+    stack = [t]
+    while stack:
+        node = stack.pop()
+        internal.append(node)
+        stack.extend([st for st in node.children if st.children])
+
+    digests = {}
+    for node in reversed(internal):
+        children = node.children
+        parts = [__describe(b"N", node.key, len(children))]
+        for st in children:
+            digest = digests.get(st)
+            if digest is None:
+                parts.append(__describe(b"L", st.key, st.value))
+            else:
+                parts.append(digest)
+        digests[node] = hashlib.blake2b(b"".join(parts),
+                                        digest_size=DIGEST_SIZE).digest()
+    return digests
+
+
+def __describe(kind, key, number):
+    '''
+    Encodes a node: its kind (N for a node whose digest follows, L for a
+    leaf), its key and a number (its number of children, or its value).
+    The key and the number are encoded with their type, so that keys 1
+    and "1" are different, and a value can be None.
+    '''
+
+    return kind + __encode(key) + __encode(number)
+
+
+def __encode(obj):
+    '''
+    Encodes a key or a value as its type and its repr, prefixed with
+    their length.
+    '''
+
+    text = "{}:{!r}".format(type(obj).__name__, obj).encode("utf-8",
+                                                           "surrogatepass")
+    return struct.pack("<Q", len(text)) + text
+
+
+def layout_key(digest, x, y, width, height):
+    '''
+    Computes the key of the layout of a subtree in a box.
+
+    Inputs:
+        digest: (bytes) the digest of the subtree (see subtree_digests)
+        x, y, width, height: (float) the box
+
+    Returns: (string) the key, which is also a valid file name
+    '''
+
+    h = hashlib.blake2b(digest, digest_size=DIGEST_SIZE)
+    h.update(struct.pack("<Idddd", FORMAT_VERSION, x, y, width, height))
+    return h.hexdigest()
+
+
+def compute_layout(t, cache, bounding_rec_width=1.0, bounding_rec_height=1.0):
+    '''
+    Same as layout.compute_layout, reusing the layouts of subtrees that
+    are in a cache, and adding the ones that are not.
+
+    Inputs:
+        t: (Tree) a tree
+        cache: (LayoutCache) the cache
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+
+    Returns: a Layout, the same as the one layout.compute_layout returns.
+        When the layout of the whole tree is found in the cache, the
+        values and paths of the nodes are not computed.
+    '''
+
+    value = lookup(t, cache, bounding_rec_width, bounding_rec_height)
+    nodes = list(traversal.preorder(t))
+    result = layout.Layout(len(value.indices))
+    result.extend([nodes[i] for i in value.indices.tolist()], value.boxes,
+                  [value.color_codes[i] for i in value.color_ids.tolist()])
+    return result
+
+
+def lookup(t, cache, bounding_rec_width=1.0, bounding_rec_height=1.0):
+    '''
+    Finds the layout of a tree in a cache, with the labels and the color
+    codes of its rectangles, and lays out what is not in the cache.
+
+    Inputs:
+        t: (Tree) a tree
+        cache: (LayoutCache) the cache
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+
+    Returns: a CachedLayout with labels and color codes
+    '''
+
+    digests = subtree_digests(t)
+    root = (t, 0.0, 0.0, float(bounding_rec_width),
+            float(bounding_rec_height))
+    root_key = layout_key(digests[t], *root[1:])
+
+    value = cache.get(root_key) if t.num_children() > 0 else None
+    if value is not None and value.labels is not None:
+        # Nothing has to be laid out, and the tree does not have to be
+        # walked again
+        return value
+    if value is None:
+        indices, boxes = compute_missing(root, cache, digests)
+    else:
+        # Laid out before as a subtree of another tree, which does not
+        # keep the labels: only the paths are needed to add them
+        treemap.compute_paths(t)
+        indices, boxes = value.indices, value.boxes
+
+    nodes = list(traversal.preorder(t))
+    leaves = [nodes[i] for i in indices.tolist()]
+    color_codes = []
+    color_ids = palette.intern_codes([node.path for node in leaves],
+                                     color_codes, {})
+    value = CachedLayout(indices, boxes, [node.key for node in leaves],
+                         [tuple(code) for code in color_codes],
+                         np.array(color_ids, dtype=np.int32))
+    if t.num_children() > 0:
+        cache.put(root_key, value)
+    return value
+
+
+def compute_missing(root, cache, digests):
+    '''
+    Lays out a tree whose layout is not in a cache, reusing the layouts of
+    its subtrees that are, and adds the layouts of its subtrees that were
+    not to the cache (lookup adds the layout of the tree).
+
+    Inputs:
+        root: (tuple) the frame (node, x, y, width, height) of the root
+        cache: (LayoutCache) the cache
+        digests: (dict) the digests of the subtrees (see subtree_digests)
+
+    Returns: a pair (indices, boxes) of arrays, as layout_subtree.
+    '''
+
+    t = root[0]
+    index = layout.index_tree(t)
+
+    # Layout of each subtree that has been visited, with the indices of
+    # the leaves relative to the root of the subtree
+    results = {}
+    # Children that were laid out, in layout order, of each cached node
+    laid_out = {}
+
+    def cached(node):
+        return node is t or index.size(node) >= MIN_CACHED_NODES
+
+    def children_frames(frame):
+        node = frame[0]
+        if node.num_children() == 0:
+            return []
+        if node is not t and cached(node):
+            value = cache.get(layout_key(digests[node], *frame[1:]))
+            if value is not None:
+                results[node] = (value.indices, value.boxes)
+                return []
+        if not cached(node):
+            return []
+        # The layout can leave out children (when the box has no area),
+        # so merge_children goes through the children laid out
+        children, boxes = layout.sorted_boxes(index.children[node],
+                                              *frame[1:])
+        laid_out[node] = children
+        return [(st,) + tuple(box)
+                for st, box in zip(children, boxes.tolist())]
+
+    for frame in traversal.postorder(root, children_frames):
+        node = frame[0]
+        if node in results:
+            continue
+        if node.num_children() == 0:
+            results[node] = (np.zeros(1, dtype=np.int64),
+                             np.array([frame[1:]]))
+        elif not cached(node):
+            results[node] = layout_subtree(node, *frame[1:], index)
+        else:
+            results[node] = merge_children(node, laid_out.pop(node),
+                                           index, results)
+        # The tree itself is stored by lookup, with its labels
+        if node is not t and cached(node) and node.num_children() > 0:
+            cache.put(layout_key(digests[node], *frame[1:]),
+                      CachedLayout(*results[node]))
+    return results[t]
+
+
+def layout_subtree(node, x, y, width, height, index):
+    '''
+    Lays out a subtree that is not cached.
+
+    Returns: a pair (indices, boxes) of arrays, with the pre-order index
+        in the subtree of each visible leaf and one row
+        (x, y, width, height) per leaf, in layout order.
+    '''
+
+    index_of = {st: i for i, st in enumerate(traversal.preorder(node))}
+    indices = []
+    all_boxes = [np.empty((0, 4))]
+    for nodes, boxes in layout.layout_tree(node, x, y, width, height,
+                                           index=index):
+        indices.extend(index_of[st] for st in nodes)
+        all_boxes.append(boxes)
+    return np.array(indices, dtype=np.int64), np.concatenate(all_boxes)
+
+
+def merge_children(node, children, index, results):
+    '''
+    Puts together the layout of a node from the layouts of the children
+    that were laid out, in layout order, which are removed from results.
+
+    Returns: a pair (indices, boxes) of arrays, as layout_subtree.
+    '''
+
+    # The pre-order index of a child in the subtree of its parent comes
+    # after the nodes of the subtrees of the children before it
+    offsets = {}
+    offset = 1
+    for st in node.children:
+        offsets[st] = offset
+        offset += index.size(st)
+
+    all_indices = [np.empty(0, dtype=np.int64)]
+    all_boxes = [np.empty((0, 4))]
+    for st in children:
+        indices, boxes = results.pop(st)
+        all_indices.append(indices + offsets[st])
+        all_boxes.append(boxes)
+    return np.concatenate(all_indices), np.concatenate(all_boxes)
+
+
+def compute_rectangles(t, cache, bounding_rec_width=1.0,
+                       bounding_rec_height=1.0):
+    '''
+    Same as treemap.compute_rectangles, using a cache (see compute_layout).
+    When the layout of the whole tree is found in the cache, only the
+    digests of the subtrees are computed.
+
+    Returns: a list of Rectangle objects.
+    '''
+
+    return lookup(t, cache, bounding_rec_width,
+                  bounding_rec_height).rectangles()
@@ -0,0 +1,87 @@
+'''
+CS 121: Treemap Colors
+
+The colors drawing.ColorKey gives to color codes, computed without
+matplotlib, for the renderers that do not use it.
+'''
+
+import colorsys
+
+
+NCOLORS = 512
+
+# The same color wheel of pastel colors as drawing.ColorKey.COLORS
+COLORS = [colorsys.hsv_to_rgb(i / (NCOLORS - 1), 0.4, 1.0)
+          for i in range(NCOLORS)]
+
+# Color for codes that are not in a color map
+DEFAULT_COLOR = (0.5, 0.5, 0.5)
+
+
+def color_map(codes):
+    '''
+    Assigns colors to color codes, the same way drawing.ColorKey does.
+
+    Inputs:
+        codes: (set) the color codes
+
+    Returns: dictionary mapping each code to an (r, g, b) tuple of floats
+        between 0 and 1.
+    '''
+
+    colors = {}
+    if not codes:
+        return colors
+    incr = NCOLORS // len(codes)
+    index = 0
+    for code in sorted(codes):
+        colors[code] = COLORS[index]
+        index = (index + incr) % NCOLORS
+    return colors
+
+
+def intern_codes(codes, table, ids):
+    '''
+    Replaces color codes by small integers, the index of each code in a
+    table of distinct codes.
+
+    Consecutive rectangles often have the very same code object (the
+    path that compute_paths gives all the children of a node), so a
+    code that is the same object as the one before it is not looked up
+    again.
+
+    Inputs:
+        codes: iterable of color codes
+        table: (list) the distinct codes seen so far; new codes are
+            added to it
+        ids: (dict) maps each code in table to its index; new codes are
+            added to it
+
+    Returns: list with the index of each code in table
+    '''
+
+    result = []
+    last_code = None
+    last_id = None
+    for code in codes:
+        if code is not last_code or last_id is None:
+            last_id = ids.get(code)
+            if last_id is None:
+                last_id = ids[code] = len(table)
+                table.append(code)
+            last_code = code
+        result.append(last_id)
+    return result
+
+
+def hex_color(rgb):
+    '''
+    Converts a color to the #rrggbb notation.
+
+    Inputs:
+        rgb: (tuple) r, g and b, floats between 0 and 1
+
+    Returns: (string) the color
+    '''
+
+    return "#{:02x}{:02x}{:02x}".format(*(int(round(c * 255)) for c in rgb))
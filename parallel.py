@@ -0,0 +1,270 @@
+'''
+CS 121: Parallel Treemap Layout
+
+Once the children of a node have their rectangles, each child's subtree
+is laid out on its own, so the subtrees near the top of a tree can be
+laid out in separate processes. The top levels of the tree are laid out
+here until there are enough subtrees to keep the workers busy, and the
+rectangles of those subtrees are merged in the same order as
+compute_rectangles.
+
+Where processes can be forked, the workers inherit the tree and its
+TreeIndex, so a task is only the number of a subtree, and the boxes come
+back in the order of the visible leaves of the subtree. Elsewhere, each
+subtree is sent to a worker as a ColumnarTree (a handful of flat arrays,
+which pickle as raw bytes, rather than a graph of Tree objects).
+'''
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import columnar
+import layout
+import traversal
+import treemap
+
+
+# Number of subtrees to aim for per worker, so that workers that get
+# small subtrees can pick up more work
+TASKS_PER_WORKER = 4
+
+# Subtrees whose box is split among fewer leaves than this are laid out
+# in the parent process
+MIN_TASK_LEAVES = 64
+
+# The frames and the TreeIndex of the tree being laid out, for the forked
+# workers (see layout_frame)
+_shared = None
+
+
+def compute_layout(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                   workers=None):
+    '''
+    Same as layout.compute_layout, laying out the subtrees near the top
+    of the tree in a pool of processes.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        workers: (int) the number of processes to use (None for one per
+            processor)
+
+    Returns: a Layout, the same as the one layout.compute_layout returns.
+    '''
+
+    global _shared
+
+    workers = workers or os.cpu_count()
+    index = layout.index_tree(t)
+
+    frames = split((t, 0.0, 0.0, float(bounding_rec_width),
+                    float(bounding_rec_height)), TASKS_PER_WORKER * workers,
+                   index)
+    is_task = [num_leaves(node) >= MIN_TASK_LEAVES for node, *_ in frames]
+
+    result = layout.Layout()
+    if not any(is_task):
+        # Not worth starting a pool
+        for node, x, y, width, height in frames:
+            for nodes, boxes in layout.layout_tree(node, x, y, width,
+                                                   height, index=index):
+                result.extend(nodes, boxes)
+        return result
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if fork else None
+    # Inherited by the forked workers
+    _shared = (frames, index)
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=context) as executor:
+            futures = []
+            for i, (node, x, y, width, height) in enumerate(frames):
+                if not is_task[i]:
+                    futures.append(None)
+                elif fork:
+                    futures.append(executor.submit(layout_frame, i))
+                else:
+                    futures.append(executor.submit(layout_subtree,
+                        columnar.ColumnarTree.from_tree(node), x, y, width,
+                        height))
+
+            for (node, x, y, width, height), future in zip(frames, futures):
+                if future is None:
+                    for nodes, boxes in layout.layout_tree(node, x, y, width,
+                            height, index=index):
+                        result.extend(nodes, boxes)
+                elif fork:
+                    positions, boxes = future.result()
+                    leaves = visible_leaves(node, index)
+                    if positions is not None:
+                        leaves = [leaves[i] for i in positions.tolist()]
+                    result.extend(leaves, boxes)
+                else:
+                    indices, boxes = future.result()
+                    nodes = list(traversal.preorder(node))
+                    result.extend([nodes[i] for i in indices.tolist()], boxes)
+    finally:
+        _shared = None
+    return result
+
+
+def compute_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                       workers=None):
+    '''
+    Same as treemap.compute_rectangles, laying out the subtrees near the
+    top of the tree in a pool of processes.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+        workers: (int) the number of processes to use (None for one per
+            processor)
+
+    Returns: a list of Rectangle objects.
+    '''
+
+    return compute_layout(t, bounding_rec_width, bounding_rec_height,
+                          workers).rectangles()
+
+
+def split(root, num_tasks, index):
+    '''
+    Lays out the top levels of a tree, one level at a time, until there
+    are at least num_tasks subtrees left to lay out or nothing is left
+    but leaves.
+
+    Inputs:
+        root: (tuple) the frame (node, x, y, width, height) of the root
+        num_tasks: (int) the number of subtrees to aim for
+        index: (TreeIndex) the index of the tree (see layout.index_tree)
+
+    Returns: list of frames (node, x, y, width, height) that cover all
+        the leaves of the tree, in the order compute_rectangles lays them
+        out.
+    '''
+
+    frames = [root]
+    while sum(node.num_children() > 0 for node, *_ in frames) < num_tasks:
+        if all(node.num_children() == 0 for node, *_ in frames):
+            break
+        next_frames = []
+        for frame in frames:
+            if frame[0].num_children() == 0:
+                next_frames.append(frame)
+            else:
+                children, boxes = layout.sorted_boxes(
+                    index.children[frame[0]], *frame[1:])
+                next_frames.extend((st,) + tuple(box) for st, box in
+                                   zip(children, boxes.tolist()))
+        frames = next_frames
+    return frames
+
+
+def num_leaves(t):
+    '''
+    Counts the leaves of a tree, stopping early once there are enough of
+    them to make a task.
+
+    Inputs:
+        t: (Tree) a tree
+
+    Returns: (int) the number of leaves, or MIN_TASK_LEAVES if there are
+        more.
+    '''
+
+    count = 0
+    for node in traversal.preorder(t):
+        if node.num_children() == 0:
+            count += 1
+            if count == MIN_TASK_LEAVES:
+                break
+    return count
+
+
+def visible_leaves(t, index):
+    '''
+    Returns: the leaves of a subtree with positive values, in the order
+        layout.layout_tree lays them out
+    '''
+
+    # Every internal node is in index.children, even if none of its
+    # children is visible
+    children = index.children
+    leaves = []
+    stack = [t]
+    while stack:
+        node = stack.pop()
+        node_children = children.get(node)
+        if node_children is None:
+            leaves.append(node)
+        else:
+            stack.extend(reversed(node_children))
+    return leaves
+
+
+def layout_frame(i):
+    '''
+    Lays out a subtree in a forked worker, which shares the tree and its
+    TreeIndex with the parent process.
+
+    Inputs:
+        i: (int) the number of the frame of the subtree
+
+    Returns: a pair (positions, boxes), where boxes is an array with one
+        row (x, y, width, height) per leaf that was laid out, and
+        positions is None if those leaves are visible_leaves, in the same
+        order (as they always are, unless a box has a zero width or
+        height), or else their positions in visible_leaves.
+    '''
+
+    frames, index = _shared
+    node, x, y, width, height = frames[i]
+
+    nodes = []
+    all_boxes = [np.empty((0, 4))]
+    for batch, boxes in layout.layout_tree(node, x, y, width, height,
+                                           index=index):
+        nodes.extend(batch)
+        all_boxes.append(boxes)
+
+    leaves = visible_leaves(node, index)
+    positions = None
+    if len(nodes) != len(leaves) or \
+            any(a is not b for a, b in zip(nodes, leaves)):
+        position_of = {id(leaf): i for i, leaf in enumerate(leaves)}
+        positions = np.array([position_of[id(leaf)] for leaf in nodes],
+                             dtype=np.int64)
+    return positions, np.concatenate(all_boxes)
+
+
+def layout_subtree(subtree, x, y, width, height):
+    '''
+    Lays out a subtree in a worker process.
+
+    Inputs:
+        subtree: (ColumnarTree) the subtree
+        x, y, width, height: (float) the box the subtree should fill
+
+    Returns: a pair (indices, boxes) of arrays, with the (pre-order)
+        index in the subtree of each visible leaf, and one row
+        (x, y, width, height) per leaf, in layout order.
+    '''
+
+    t = subtree.to_tree()
+    treemap.compute_internal_values(t)
+    index_of = {node: i for i, node in enumerate(traversal.preorder(t))}
+
+    indices = []
+    all_boxes = []
+    for nodes, boxes in layout.layout_tree(t, x, y, width, height):
+        indices.extend(index_of[node] for node in nodes)
+        all_boxes.append(boxes)
+    if not all_boxes:
+        return np.empty(0, dtype=np.int64), np.empty((0, 4))
+    return np.array(indices, dtype=np.int64), np.concatenate(all_boxes)
@@ -0,0 +1,247 @@
+'''
+CS 121: Shared-Prefix Paths
+
+The path of a node (the keys from the root down to, but not including,
+the node) as a linked list that points to the path of its parent, so
+every node only adds one link to the path it shares with its siblings
+and the paths of a whole tree take memory proportional to its number of
+nodes, not to its number of nodes times its depth.
+
+A Path behaves like the tuple of its keys: it compares equal to it, has
+the same hash (so the two can be used interchangeably as dictionary keys
+and color codes), sorts the same way and prints the same way.
+
+The hash of a path is computed from the hash of its parent, the same way
+CPython hashes a tuple one item at a time, so hashing the paths of a
+whole tree takes time proportional to its number of nodes. Where tuples
+are hashed differently, paths are hashed as tuples instead.
+'''
+
+# The constants of CPython's tuple hash (xxHash), on 64 bits
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+XXPRIME_1 = 11400714785074694791
+XXPRIME_2 = 14029467366897019727
+XXPRIME_5 = 2870177450012600261
+
+
+class Path:
+    '''
+    An immutable sequence of keys that shares its prefix with other paths.
+
+    Attributes:
+        parent: (Path) the path without its last key, None for the empty
+            path
+        key: the last key, None for the empty path
+    '''
+
+    __slots__ = ("parent", "key", "__length", "__state", "__hash")
+
+    def __init__(self, parent=None, key=None):
+        '''
+        Constructs a path. Raises ValueError if there is a key but no
+        parent.
+
+        Inputs:
+            parent: (Path) the path to extend, or None for the empty path
+            key: the key to add to parent
+        '''
+
+        if parent is None and key is not None:
+            raise ValueError("The empty path has no key, not " + repr(key))
+        self.parent = parent
+        self.key = key
+        self.__length = 0 if parent is None else parent.__length + 1
+        self.__state = XXPRIME_5 if parent is None else None
+        self.__hash = None
+
+
+    @classmethod
+    def of(cls, keys):
+        '''
+        Converts a sequence of keys to a path.
+
+        Inputs:
+            keys: iterable of keys, or a Path (which is returned as is)
+
+        Returns: a Path
+        '''
+
+        if isinstance(keys, Path):
+            return keys
+        path = EMPTY
+        for key in keys:
+            path = cls(path, key)
+        return path
+
+
+    def child(self, key):
+        '''
+        Returns: the path extended with one more key
+        '''
+        return Path(self, key)
+
+
+    def __len__(self):
+        return self.__length
+
+
+    def __iter__(self):
+        keys = [None] * self.__length
+        path = self
+        for i in range(self.__length - 1, -1, -1):
+            keys[i] = path.key
+            path = path.parent
+        return iter(keys)
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        length = self.__length
+        if not -length <= index < length:
+            raise IndexError("Path index out of range")
+        path = self
+        for _ in range(length - 1 - index % length):
+            path = path.parent
+        return path.key
+
+
+    def __add__(self, other):
+        if not isinstance(other, (tuple, Path)):
+            return NotImplemented
+        path = self
+        for key in other:
+            path = Path(path, key)
+        return path
+
+
+    def __radd__(self, other):
+        if not isinstance(other, tuple):
+            return NotImplemented
+        return Path.of(other) + self
+
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, tuple):
+            return len(other) == self.__length and tuple(self) == other
+        if not isinstance(other, Path):
+            return NotImplemented
+        if self.__length != len(other):
+            return False
+        # Both paths reach the same node at the latest at the root
+        a, b = self, other
+        while a is not b:
+            if a.key != b.key:
+                return False
+            a, b = a.parent, b.parent
+        return True
+
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+
+    def __hash__(self):
+        if self.__hash is None:
+            if INCREMENTAL_HASH:
+                self.__hash = finish_hash(self.__hash_state(), self.__length)
+            else:
+                self.__hash = hash(tuple(self))
+        return self.__hash
+
+
+    def __hash_state(self):
+        '''
+        Returns: (int) the state of the tuple hash after the keys of the
+            path, computed from the closest ancestor whose state is known
+        '''
+
+        pending = []
+        path = self
+        while path.__state is None:
+            pending.append(path)
+            path = path.parent
+        state = path.__state
+        for path in reversed(pending):
+            state = path.__state = hash_step(state, path.key)
+        return state
+
+
+    def __lt__(self, other):
+        if not isinstance(other, (tuple, Path)):
+            return NotImplemented
+        return tuple(self) < tuple(other)
+
+
+    def __le__(self, other):
+        if not isinstance(other, (tuple, Path)):
+            return NotImplemented
+        return tuple(self) <= tuple(other)
+
+
+    def __gt__(self, other):
+        if not isinstance(other, (tuple, Path)):
+            return NotImplemented
+        return tuple(self) > tuple(other)
+
+
+    def __ge__(self, other):
+        if not isinstance(other, (tuple, Path)):
+            return NotImplemented
+        return tuple(self) >= tuple(other)
+
+
+    def __reduce__(self):
+        return (Path.of, (tuple(self),))
+
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+
+def hash_step(state, key):
+    '''
+    Adds a key to the state of a tuple hash, as CPython does for every
+    item of a tuple.
+
+    Returns: (int) the new state
+    '''
+
+    state = (state + (hash(key) & HASH_MASK) * XXPRIME_2) & HASH_MASK
+    state = ((state << 31) | (state >> (HASH_BITS - 31))) & HASH_MASK
+    return (state * XXPRIME_1) & HASH_MASK
+
+
+def finish_hash(state, length):
+    '''
+    Returns: (int) the hash of a tuple of length items, from the state
+        of the hash after all of them
+    '''
+
+    state = (state + (length ^ (XXPRIME_5 ^ 3527539))) & HASH_MASK
+    if state == HASH_MASK:
+        return 1546275796
+    return state - (1 << HASH_BITS) if state >> (HASH_BITS - 1) else state
+
+
+def tuple_hash(keys):
+    '''
+    Returns: (int) the hash of a tuple, computed with hash_step and
+        finish_hash
+    '''
+
+    state = XXPRIME_5
+    for key in keys:
+        state = hash_step(state, key)
+    return finish_hash(state, len(keys))
+
+
+# Whether this Python hashes tuples the way hash_step and finish_hash do
+INCREMENTAL_HASH = all(tuple_hash(keys) == hash(keys) for keys in
+                       [(), ("class Aves",), ("a", -1, 2.5, None, ("b",))])
+
+EMPTY = Path()
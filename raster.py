@@ -0,0 +1,131 @@
+'''
+CS 121: Raster Treemaps
+
+Draws treemaps straight into a NumPy array of pixels and saves them as
+PNG files, without matplotlib, for thumbnails and dashboards. Rectangles
+get the same colors as in drawing.py (see palette.py) and a black border,
+but no labels.
+
+The image is drawn in two steps: every rectangle writes its index into
+an array with one entry per pixel (one slice assignment per rectangle),
+and then the colors and the borders (the pixels where the index changes)
+are filled in for the whole image at once. The PNG file is written with
+zlib and struct.
+'''
+
+import struct
+import zlib
+
+import numpy as np
+
+import palette
+
+
+DEFAULT_SIZE = 800
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+BACKGROUND = (255, 255, 255)
+BORDER = (0, 0, 0)
+
+# zlib level: higher levels make files a little smaller but take twice
+# as long
+COMPRESSION_LEVEL = 3
+
+
+def render(rectangles, width=DEFAULT_SIZE, height=DEFAULT_SIZE):
+    '''
+    Draws rectangles into an image. The unit square is scaled to the
+    whole image.
+
+    Inputs:
+        rectangles: list of Rectangle objects to draw
+        width, height: (int) the size of the image, in pixels
+
+    Returns: (numpy array of uint8) the image, with shape
+        (height, width, 3)
+    '''
+
+    codes = []
+    ids = palette.intern_codes((rect.color_code for rect in rectangles),
+                               codes, {})
+    colors = palette.color_map(codes)
+
+    # Colors are packed into one 32-bit word per pixel (the fourth byte
+    # is unused), so that coloring the image is a single lookup
+    table = np.zeros((len(rectangles) + 1, 4), dtype=np.uint8)
+    if codes:
+        code_colors = np.rint(np.array([colors[code] for code in codes])
+                              * 255).astype(np.uint8)
+        table[:-1, :3] = code_colors[ids]
+    table[-1, :3] = BACKGROUND
+    border = np.zeros(4, dtype=np.uint8)
+    border[:3] = BORDER
+
+    coords = np.array([(rect.x, rect.y, rect.x + rect.width,
+                        rect.y + rect.height)
+                       for rect in rectangles]).reshape(-1, 4)
+    coords = np.rint(coords * (width, height, width, height)).astype(np.int64)
+    np.clip(coords, 0, (width, height, width, height), out=coords)
+
+    index = np.full((height, width), len(rectangles), dtype=np.int32)
+    for i, (x0, y0, x1, y1) in enumerate(coords.tolist()):
+        index[y0:y1, x0:x1] = i
+
+    edges = np.zeros((height, width), dtype=bool)
+    edges[:, 1:] = index[:, 1:] != index[:, :-1]
+    edges[1:, :] |= index[1:, :] != index[:-1, :]
+    covered = index != len(rectangles)
+    for edge in (np.s_[0, :], np.s_[-1, :], np.s_[:, 0], np.s_[:, -1]):
+        edges[edge] |= covered[edge]
+
+    image = table.view(np.uint32)[:, 0][index]
+    image[edges] = border.view(np.uint32)[0]
+    return image[..., np.newaxis].view(np.uint8)[..., :3]
+
+
+def encode_png(image, level=COMPRESSION_LEVEL):
+    '''
+    Encodes an image as a PNG file.
+
+    Inputs:
+        image: (numpy array of uint8) an RGB image, with shape
+            (height, width, 3)
+        level: (int) zlib compression level
+
+    Returns: (bytes) the contents of the PNG file
+    '''
+
+    height, width, _ = image.shape
+    # Every row starts with its filter type, 0 (none)
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, 3 * width)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return PNG_SIGNATURE + __chunk(b"IHDR", header) \
+        + __chunk(b"IDAT", zlib.compress(rows.tobytes(), level)) \
+        + __chunk(b"IEND", b"")
+
+
+def __chunk(chunk_type, data):
+    '''
+    Builds a PNG chunk: its length, type, data and checksum.
+    '''
+
+    return struct.pack(">I", len(data)) + chunk_type + data \
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def draw_rectangles(rectangles, output_filename, width=DEFAULT_SIZE,
+                    height=DEFAULT_SIZE):
+    '''
+    Draws rectangles into a PNG file.
+
+    Inputs:
+        rectangles: list of Rectangle objects to draw
+        output_filename: name of the PNG file
+        width, height: (int) the size of the image, in pixels
+    '''
+
+    with open(output_filename, "wb") as f:
+        f.write(encode_png(render(rectangles, width, height)))
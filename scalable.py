@@ -0,0 +1,259 @@
+'''
+CS 121: Rescalable Treemap Layouts
+
+Lays out a tree once and then gives its layout in bounding rectangles of
+other sizes, for drawing the same treemap as a thumbnail, on a screen
+and in print.
+
+The squarified layout of a node only depends on the sizes of its box
+through the decisions it makes for every row: which children go in the
+row, and whether the row is laid out along the width or the height of
+the part of the box that is left. If none of these decisions change
+when the bounding rectangle is stretched by (sx, sy), neither do the
+boxes of the children, so every rectangle of the treemap is just
+stretched by (sx, sy) too. A ScalableLayout records all the rows when it
+is built, and checks all of them at once for a new size, with NumPy:
+the orientation of a row, and, since the worst aspect ratio of a row
+first goes down and then up as the row grows, that it is still worse
+with one more child and not worse with one fewer.
+
+The nodes whose rows do not pass are laid out again from the first row
+that does not, together with the subtrees of the children in that row
+and the rows after it. Everything else is only stretched.
+'''
+
+import numpy as np
+
+import layout
+import traversal
+
+
+class ScalableLayout:
+    '''
+    The layout of a tree, which can be given for any bounding rectangle.
+
+    The values of the tree must not change after the layout is built.
+
+    Attributes:
+        tree: (Tree) the tree
+        width, height: (float) the size of the bounding rectangle the
+            tree was laid out in
+    '''
+
+    def __init__(self, t, bounding_rec_width=1.0, bounding_rec_height=1.0):
+        '''
+        Lays out a tree, recording the rows of every node.
+
+        Inputs:
+            t: (Tree) a tree
+            bounding_rec_width, bounding_rec_height: (float) the width and
+                height of the bounding rectangle
+        '''
+
+        self.tree = t
+        self.width = float(bounding_rec_width)
+        self.height = float(bounding_rec_height)
+        self.__index = layout.index_tree(t)
+
+        # Every node that is laid out gets the range of the leaves of its
+        # subtree in the list of leaves, which is in pre-order
+        self.__leaves = []
+        self.__ranges = {}
+        self.__exact = True
+        internal = []
+        boxes = []
+
+        # The rows of all the nodes, and the values of their children, back
+        # to back
+        rows = []
+        values = []
+
+        def children_frames(frame):
+            node = frame[0]
+            if node.num_children() == 0:
+                return []
+            node_rows = []
+            children, child_boxes = layout.sorted_boxes(
+                self.__index.children[node], *frame[1:], node_rows)
+            if len(node_rows) == 0 and len(children) > 0:
+                # Laid out by treemap.layout_children, without rows
+                self.__exact = False
+            node_id, offset = len(internal) - 1, len(values)
+            rows.extend((node_id, offset) + row for row in node_rows)
+            values.extend(st.value for st in children)
+            return [(st,) + tuple(box)
+                    for st, box in zip(children, child_boxes.tolist())]
+
+        for frame in traversal.preorder(
+                (t, 0.0, 0.0, self.width, self.height), children_frames):
+            node = frame[0]
+            if node.num_children() == 0:
+                self.__ranges[node] = (len(self.__leaves),
+                                       len(self.__leaves) + 1)
+                self.__leaves.append(node)
+                boxes.append(frame[1:])
+            else:
+                self.__ranges[node] = (len(self.__leaves), None)
+                internal.append(node)
+
+        for node in reversed(internal):
+            children = self.__index.children[node]
+            lo = self.__ranges[node][0]
+            hi = self.__ranges[children[-1]][1] if children else lo
+            self.__ranges[node] = (lo, hi)
+
+        self.__internal = internal
+        self.__boxes = np.array(boxes, dtype=float).reshape(-1, 4)
+        self.__rows = self.__row_table(rows, np.array(values, dtype=float))
+
+
+    @staticmethod
+    def __row_table(rows, values):
+        '''
+        Turns the rows (see layout.squarify) into a dictionary of arrays,
+        with the first and last values of each row and of the rows with
+        one value fewer and one value more.
+        '''
+
+        columns = np.array(rows, dtype=float).reshape(-1, 13).T
+        table = dict(zip(("node", "offset", "start", "end", "wide", "x", "y",
+                          "width", "height", "total", "sum", "prev_sum",
+                          "next_sum"), columns))
+        for name in ("node", "offset", "start", "end"):
+            table[name] = table[name].astype(np.int64)
+        table["wide"] = table["wide"].astype(bool)
+        table["has_prev"] = ~np.isnan(table["prev_sum"])
+        table["has_next"] = ~np.isnan(table["next_sum"])
+
+        start = table["offset"] + table["start"]
+        end = table["offset"] + table["end"]
+        table["first"] = values[start]
+        table["last"] = values[end - 1]
+        table["prev_last"] = values[np.where(table["has_prev"], end - 2,
+                                             start)]
+        table["next_last"] = values[np.where(table["has_next"], end,
+                                             end - 1)]
+        return table
+
+
+    def __failing_rows(self, sx, sy):
+        '''
+        Checks the decisions made for every row in a bounding rectangle
+        stretched by (sx, sy).
+
+        Returns: (numpy array of int) the rows where a different decision
+            would be made
+        '''
+
+        r = self.__rows
+        width = r["width"] * sx
+        height = r["height"] * sy
+        long_side = np.where(r["wide"], width, height)
+        short_side = np.where(r["wide"], height, width)
+
+        # The same arithmetic as layout.find_row
+        def worst(sums, last):
+            row_width = long_side * sums / r["total"]
+            first_height = short_side * r["first"] / sums
+            last_height = short_side * last / sums
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.maximum(
+                    np.maximum(row_width / first_height,
+                               first_height / row_width),
+                    np.maximum(row_width / last_height,
+                               last_height / row_width)), \
+                    (row_width != 0) & (last_height != 0)
+
+        row_worst, ok = worst(r["sum"], r["last"])
+        prev_worst, _ = worst(r["prev_sum"], r["prev_last"])
+        next_worst, next_ok = worst(r["next_sum"], r["next_last"])
+        ok &= (width >= height) == r["wide"]
+        ok &= ~r["has_prev"] | (row_worst <= prev_worst)
+        ok &= ~r["has_next"] | ((next_worst > row_worst) & next_ok)
+        return np.flatnonzero(~ok)
+
+
+    def layout(self, bounding_rec_width=None, bounding_rec_height=None):
+        '''
+        Gives the layout of the tree in a bounding rectangle.
+
+        Inputs:
+            bounding_rec_width, bounding_rec_height: (float) the width and
+                height of the bounding rectangle, by default the ones the
+                tree was laid out in
+
+        Returns: a Layout, the same as layout.compute_layout returns, up to
+            rounding errors
+        '''
+
+        width = self.width if bounding_rec_width is None \
+            else float(bounding_rec_width)
+        height = self.height if bounding_rec_height is None \
+            else float(bounding_rec_height)
+        boxes = self.__rescale(width, height)
+        if boxes is None:
+            return layout.compute_layout(self.tree, width, height)
+
+        result = layout.Layout(len(self.__leaves))
+        result.extend(self.__leaves, boxes)
+        return result
+
+
+    def rectangles(self, bounding_rec_width=None, bounding_rec_height=None):
+        '''
+        Same as layout, returning a list of Rectangle objects, as
+        treemap.compute_rectangles does.
+        '''
+
+        return self.layout(bounding_rec_width,
+                           bounding_rec_height).rectangles()
+
+
+    def __rescale(self, width, height):
+        '''
+        Computes the boxes of the leaves in a bounding rectangle.
+
+        Returns: (numpy array) one row (x, y, width, height) per leaf, or
+            None if the tree has to be laid out from scratch
+        '''
+
+        if not self.__exact or self.width == 0 or self.height == 0 \
+                or width == 0 or height == 0:
+            return None
+        sx, sy = width / self.width, height / self.height
+        boxes = self.__boxes * (sx, sy, sx, sy)
+
+        r = self.__rows
+        redone = np.zeros(len(self.__leaves), dtype=bool)
+        seen = set()
+        for row in self.__failing_rows(sx, sy).tolist():
+            node_id = int(r["node"][row])
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            node = self.__internal[node_id]
+            lo, hi = self.__ranges[node]
+            if lo == hi or redone[lo]:
+                # Part of a subtree that has already been laid out again
+                continue
+
+            start = int(r["start"][row])
+            children = self.__index.children[node][start:]
+            new_children, new_boxes = layout.sorted_boxes(children,
+                r["x"][row] * sx, r["y"][row] * sy,
+                r["width"][row] * sx, r["height"][row] * sy)
+            if new_children != children:
+                return None
+            for st, box in zip(new_children, new_boxes.tolist()):
+                lo, hi = self.__ranges[st]
+                if st.num_children() == 0:
+                    boxes[lo] = box
+                else:
+                    sub = [b for _, b in layout.layout_tree(st, *box,
+                                                           index=self.__index)]
+                    sub = np.concatenate([np.empty((0, 4))] + sub)
+                    if len(sub) != hi - lo:
+                        return None
+                    boxes[lo:hi] = sub
+                redone[lo:hi] = True
+        return boxes
@@ -0,0 +1,101 @@
+'''
+CS 121: SVG Treemaps
+
+Draws treemaps straight to SVG files, without matplotlib. The picture is
+the same as the one drawing.draw_rectangles saves: the same size, the
+same colors (see palette.py), and labels on the same rectangles (those
+with both sides longer than labels.MIN_RECT_SIDE_FOR_TEXT), wrapped and
+cut to fit their rectangle in the same way (see labels.py).
+
+All the rectangles are written in one pass over their coordinates, so
+drawing tens of thousands of them takes a fraction of a second.
+'''
+
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+import labels
+import palette
+
+
+# The same size as drawing.py, which draws an 8 inch by 8 inch figure
+SCALE_FACTOR = 8
+
+# Space drawing.ChiCanvas.draw_text leaves between a rectangle's left
+# edge and its label
+TEXT_OFFSET = 0.01
+
+LINE_SPACING = 1.2
+
+
+def draw_rectangles(rectangles, output_filename):
+    '''
+    Draws rectangles into an SVG file.
+
+    Inputs:
+        rectangles: list of Rectangle objects to draw
+        output_filename: name of the SVG file
+    '''
+
+    with open(output_filename, "w") as f:
+        f.write(render(rectangles))
+
+
+def render(rectangles):
+    '''
+    Draws rectangles as an SVG document.
+
+    Inputs:
+        rectangles: list of Rectangle objects to draw
+
+    Returns: (string) the SVG document
+    '''
+
+    size = SCALE_FACTOR * labels.DPI
+    font_px = labels.FONT_SIZE * labels.DPI / 72
+    colors = {code: palette.hex_color(rgb) for code, rgb in
+              palette.color_map({rect.color_code for rect in rectangles})
+              .items()}
+
+    coords = np.array([(rect.x, rect.y, rect.width, rect.height)
+                       for rect in rectangles]).reshape(-1, 4)
+    labeled = np.flatnonzero((coords[:, 2] > labels.MIN_RECT_SIDE_FOR_TEXT)
+                             & (coords[:, 3] > labels.MIN_RECT_SIDE_FOR_TEXT))
+    pixels = (coords * size).tolist()
+
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}" '
+             'height="{0}" viewBox="0 0 {0} {0}">\n'.format(size),
+             '<rect width="100%" height="100%" fill="white"/>\n',
+             '<g stroke="black" stroke-width="1">\n']
+    rect_format = '<rect x="{:.2f}" y="{:.2f}" width="{:.2f}" ' \
+        'height="{:.2f}" fill="{}"/>\n'
+    for rect, (x, y, width, height) in zip(rectangles, pixels):
+        parts.append(rect_format.format(x, y, width, height,
+                                        colors[rect.color_code]))
+    parts.append('</g>\n')
+
+    parts.append('<g font-family="sans-serif" font-size="{:.2f}" '
+                 'fill="black">\n'.format(font_px))
+    offset = TEXT_OFFSET * size
+    fitted = labels.fit([rectangles[i].label for i in labeled.tolist()],
+                        coords[labeled, 2] * size - 2 * offset,
+                        coords[labeled, 3] * size, font_px)
+    for i, lines in zip(labeled.tolist(), fitted):
+        if not lines:
+            continue
+        x, y, width, height = pixels[i]
+        parts.append('<clipPath id="c{}"><rect x="{:.2f}" y="{:.2f}" '
+                     'width="{:.2f}" height="{:.2f}"/></clipPath>'.format(
+                         i, x, y, width, height))
+        # Center the block of lines vertically in the rectangle
+        line_height = LINE_SPACING * font_px
+        first = y + height / 2 - line_height * (len(lines) - 1) / 2
+        parts.append('<text clip-path="url(#c{})" '
+                     'dominant-baseline="central">'.format(i))
+        for j, line in enumerate(lines):
+            parts.append('<tspan x="{:.2f}" y="{:.2f}">{}</tspan>'.format(
+                x + offset, first + j * line_height, escape(line)))
+        parts.append('</text>\n')
+    parts.append('</g>\n</svg>\n')
+    return "".join(parts)
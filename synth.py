@@ -0,0 +1,373 @@
+'''
+CS 121: Synthetic Taxonomies
+
+Generates random trees shaped like the taxonomies in data/birds.json, of
+any size, for benchmarks and stress tests. The trees only depend on the
+seed, the parameters of the generator and their names, so the same
+command always writes the same file.
+
+The nodes are generated in pre-order and written as soon as they are
+generated, either as json that treemap.load_trees reads or as a binary
+tree file (see treefile.py), so the memory used only grows with the
+depth of the trees, not with their size.
+
+Fan-out distributions (see fanout_distribution) are given as strings:
+
+    fixed:K             always K children
+    uniform:A:B         between A and B children
+    geometric:MEAN      at least 1, and MEAN on average
+    pareto:ALPHA:MAX    at least 1, with a long tail (the smaller ALPHA,
+                        the longer) up to MAX, like the roots of the trees
+                        in sparrows.json
+
+Usage: python3 synth.py taxonomy.json --depth 5 --fanout uniform:2:20
+       python3 synth.py taxonomy.tree --format tree --max-nodes 10000000
+'''
+
+import json
+import math
+import random
+import string
+import sys
+
+import click
+
+import tree
+import treefile
+
+
+FORMATS = ("json", "tree")
+
+# The keys of the nodes at each depth start with these ranks
+RANKS = ("class", "order", "family", "genus", "species", "subspecies")
+
+DEFAULT_NAME = "synthetic"
+
+# Maps every byte to a lowercase letter
+LETTERS = bytes(string.ascii_lowercase[b % 26].encode()[0] for b in range(256))
+
+# Number of nodes whose json is joined before each write
+WRITE_BATCH_SIZE = 4096
+
+
+def fanout_distribution(spec):
+    '''
+    Parses a fan-out distribution (see the top of this file).
+
+    Inputs:
+        spec: (string) the distribution, for example "uniform:2:10"
+
+    Returns: a function that takes a random.Random and returns a number
+        of children. Raises ValueError if spec is not a distribution.
+    '''
+
+    name, *params = spec.split(":")
+    try:
+        params = [float(p) for p in params]
+    except ValueError:
+        raise ValueError("Bad parameters in fan-out distribution " +
+                         repr(spec)) from None
+
+    if name == "fixed" and len(params) == 1 and params[0] >= 0:
+        k = int(params[0])
+        return lambda rng: k
+    if name == "uniform" and len(params) == 2 and 0 <= params[0] <= params[1]:
+        a, b = int(params[0]), int(params[1])
+        return lambda rng: rng.randint(a, b)
+    if name == "geometric" and len(params) == 1 and params[0] >= 1:
+        mean = params[0]
+        if mean == 1:
+            return lambda rng: 1
+        log_q = math.log(1 - 1 / mean)
+        return lambda rng: 1 + int(math.log(1.0 - rng.random()) / log_q)
+    if name == "pareto" and len(params) == 2 and params[0] > 0 \
+            and params[1] >= 1:
+        alpha, most = params[0], int(params[1])
+        return lambda rng: min(most, int(rng.paretovariate(alpha)))
+    raise ValueError("Unknown fan-out distribution " + repr(spec))
+
+
+class TaxonomyGenerator:
+    '''
+    Generates random taxonomies.
+
+    Attributes:
+        seed: the seed of the random number generators
+        depth: (int) depth of the deepest leaves (the root is at depth 0)
+        fanouts: (list of strings) the fan-out distribution of the nodes
+            at each depth. The last one is also used for the depths after.
+        leaf_probability: (float) probability that a node above the
+            deepest level is a leaf anyway
+        value_skew: (float) the shape of the Pareto distribution of the
+            values of the leaves: the smaller, the more skewed
+        max_value: (int) largest value of a leaf
+        key_length: (pair of ints) the smallest and largest number of
+            letters in a key, after its rank
+        max_nodes: (int) most nodes in a tree, or None for no limit. The
+            nodes that come first in pre-order get their children first.
+    '''
+
+    def __init__(self, seed=0, depth=5, fanouts=("uniform:2:10",),
+                 leaf_probability=0.0, value_skew=1.2, max_value=10**6,
+                 key_length=(6, 12), max_nodes=None):
+        '''
+        Constructs a generator, checking its parameters.
+        '''
+
+        assert depth >= 0, "depth must be >= 0"
+        assert len(fanouts) > 0, "at least one fan-out is needed"
+        assert 0.0 <= leaf_probability <= 1.0, \
+            "leaf_probability must be between 0 and 1"
+        assert value_skew > 0 and max_value >= 1, \
+            "value_skew must be > 0 and max_value >= 1"
+        assert 1 <= key_length[0] <= key_length[1], \
+            "key lengths must be >= 1, smallest first"
+        assert max_nodes is None or max_nodes >= 1, "max_nodes must be >= 1"
+
+        self.seed = seed
+        self.depth = depth
+        self.fanouts = list(fanouts)
+        self.leaf_probability = leaf_probability
+        self.value_skew = value_skew
+        self.max_value = max_value
+        self.key_length = tuple(key_length)
+        self.max_nodes = max_nodes
+        self.__distributions = [fanout_distribution(spec)
+                                for spec in self.fanouts]
+
+
+    def nodes(self, name=DEFAULT_NAME):
+        '''
+        Generates the nodes of a tree in pre-order.
+
+        Inputs:
+            name: (string) the name of the tree. Trees with different names
+                are different.
+
+        Returns: a generator of (key, value, number of children) triples,
+            one per node. value is None for internal nodes.
+        '''
+
+        rng = random.Random("{} {}".format(self.seed, name))
+        # Number of nodes that have been given a place in the tree
+        reserved = 1
+        # (depth, number of nodes still to generate) of the open levels
+        pending = [(0, 1)]
+        while pending:
+            depth, remaining = pending[-1]
+            if remaining == 0:
+                pending.pop()
+                continue
+            pending[-1] = (depth, remaining - 1)
+
+            key = self.__key(rng, depth)
+            num_children = self.__num_children(rng, depth)
+            if self.max_nodes is not None:
+                num_children = min(num_children, self.max_nodes - reserved)
+            reserved += num_children
+
+            if num_children > 0:
+                pending.append((depth + 1, num_children))
+                yield key, None, num_children
+            else:
+                value = min(self.max_value,
+                            int(rng.paretovariate(self.value_skew)))
+                yield key, value, 0
+
+
+    def __key(self, rng, depth):
+        rank = RANKS[depth] if depth < len(RANKS) else "rank " + str(depth)
+        lo, hi = self.key_length
+        length = lo + int(rng.random() * (hi - lo + 1))
+        # One random byte per letter, mapped to a letter
+        letters = rng.getrandbits(8 * length).to_bytes(length, "little")
+        return rank + " " + letters.translate(LETTERS).decode().capitalize()
+
+
+    def __num_children(self, rng, depth):
+        if depth >= self.depth:
+            return 0
+        if depth > 0 and self.leaf_probability > 0 \
+                and rng.random() < self.leaf_probability:
+            return 0
+        distribution = self.__distributions[min(depth,
+                                                len(self.__distributions) - 1)]
+        return distribution(rng)
+
+
+    def tree(self, name=DEFAULT_NAME):
+        '''
+        Generates a tree in memory.
+
+        Inputs:
+            name: (string) the name of the tree
+
+        Returns: a Tree instance, the same as loading the tree from a file
+            written by write_json.
+        '''
+
+        root = None
+        # [node, number of children still to generate] of the open nodes
+        open_nodes = []
+        for key, value, num_children in self.nodes(name):
+            t = tree.Tree(key, value)
+            if open_nodes:
+                open_nodes[-1][0].add_child(t)
+                open_nodes[-1][1] -= 1
+            else:
+                root = t
+            if num_children > 0:
+                open_nodes.append([t, num_children])
+            else:
+                while open_nodes and open_nodes[-1][1] == 0:
+                    open_nodes.pop()
+        return root
+
+
+    def tree_list(self, name=DEFAULT_NAME):
+        '''
+        Generates a tree in the list format of the json files (see
+        treemap.list_to_tree), without nesting calls, so that deep trees
+        can be generated.
+
+        Inputs:
+            name: (string) the name of the tree
+
+        Returns: the list representing the tree, the same as the one in
+            the file written by write_json.
+        '''
+
+        root = None
+        # [list, number of children still to generate] of the open nodes
+        open_lists = []
+        for key, value, num_children in self.nodes(name):
+            lst = [{"key": key} if value is None
+                   else {"key": key, "value": value}]
+            if open_lists:
+                open_lists[-1][0].append(lst)
+                open_lists[-1][1] -= 1
+            else:
+                root = lst
+            if num_children > 0:
+                open_lists.append([lst, num_children])
+            else:
+                while open_lists and open_lists[-1][1] == 0:
+                    open_lists.pop()
+        return root
+
+
+def write_json(f, trees):
+    '''
+    Writes trees given as streams of nodes to a file, in the json format
+    treemap.load_trees reads, as they are generated.
+
+    Inputs:
+        f: a text file
+        trees: iterable of (name, nodes) pairs, where nodes is an iterable
+            of (key, value, number of children) triples in pre-order, as
+            TaxonomyGenerator.nodes returns
+
+    Returns: (int) the number of trees written.
+    '''
+
+    ntrees = 0
+    f.write("{")
+    for name, nodes in trees:
+        if ntrees > 0:
+            f.write(",")
+        f.write("\n" + json.dumps(name) + ": ")
+        ntrees += 1
+
+        # Number of children still to write of every open node
+        open_nodes = []
+        parts = []
+        for key, value, num_children in nodes:
+            if open_nodes:
+                open_nodes[-1] -= 1
+                parts.append(", ")
+            if value is None:
+                parts.append('[{"key": ' + json.dumps(key) + '}')
+            else:
+                parts.append('[{"key": ' + json.dumps(key) + ', "value": ' +
+                             json.dumps(value) + '}')
+            if num_children > 0:
+                open_nodes.append(num_children)
+            else:
+                parts.append("]")
+                while open_nodes and open_nodes[-1] == 0:
+                    open_nodes.pop()
+                    parts.append("]")
+            if len(parts) >= WRITE_BATCH_SIZE:
+                f.write("".join(parts))
+                parts = []
+        f.write("".join(parts))
+    f.write("\n}\n")
+    return ntrees
+
+
+def write_trees(filename, generator, names=(DEFAULT_NAME,), fmt="json"):
+    '''
+    Generates trees and writes them to a file.
+
+    Inputs:
+        filename: (string) name of the file to write, or "-" to write json
+            to the standard output
+        generator: (TaxonomyGenerator) the generator
+        names: (list of strings) the names of the trees
+        fmt: (string) one of FORMATS
+
+    Returns: (int) the number of trees written.
+    '''
+
+    trees = ((name, generator.nodes(name)) for name in names)
+    if fmt == "tree":
+        return treefile.write_node_streams(filename, trees)
+    if filename == "-":
+        return write_json(sys.stdout, trees)
+    with open(filename, "w") as f:
+        return write_json(f, trees)
+
+
+def __check_fanout(ctx, param, value):
+    '''
+    Checks the --fanout options as soon as they are parsed.
+    '''
+
+    for spec in value:
+        try:
+            fanout_distribution(spec)
+        except ValueError as e:
+            raise click.BadParameter(str(e), ctx, param)
+    return value
+
+
+@click.command(name="synth")
+@click.argument('output', type=click.Path())
+@click.option('--format', 'fmt', type=click.Choice(FORMATS),
+              default=FORMATS[0])
+@click.option('--name', 'names', type=str, multiple=True,
+              help="Names of the trees (default: {}).".format(DEFAULT_NAME))
+@click.option('--seed', type=int, default=0)
+@click.option('--depth', type=int, default=5)
+@click.option('--fanout', 'fanouts', type=str, multiple=True,
+              default=("uniform:2:10",), callback=__check_fanout,
+              help="Fan-out distribution, once per depth.")
+@click.option('--leaf-probability', type=float, default=0.0)
+@click.option('--value-skew', type=float, default=1.2)
+@click.option('--max-value', type=int, default=10**6)
+@click.option('--key-length', type=int, nargs=2, default=(6, 12),
+              metavar="MIN MAX")
+@click.option('--max-nodes', type=int, default=None)
+def cmd(output, fmt, names, seed, depth, fanouts, leaf_probability,
+        value_skew, max_value, key_length, max_nodes):
+    if fmt == "tree" and output == "-":
+        raise click.UsageError("tree files cannot be written to stdout")
+    generator = TaxonomyGenerator(seed, depth, fanouts, leaf_probability,
+                                  value_skew, max_value, key_length,
+                                  max_nodes)
+    ntrees = write_trees(output, generator, names or (DEFAULT_NAME,), fmt)
+    if output != "-":
+        print("wrote {} trees to {}".format(ntrees, output))
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
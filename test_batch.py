@@ -0,0 +1,80 @@
+'''
+Tests for batch treemaps
+'''
+
+import json
+import pickle
+import pytest
+from click.testing import CliRunner
+import batch
+import columnar
+import treefile
+import treemap
+from test_layout import random_tree
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name, redefined-outer-name
+
+
+def tree_to_list(t):
+    attrs = {"key": t.key}
+    if t.num_children() == 0:
+        attrs["value"] = t.value
+    return [attrs] + [tree_to_list(st) for st in t.children]
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    trees = {name: tree_to_list(random_tree(seed, 3, 10))
+             for seed, name in enumerate(["s1", "s2", "Jan", "Feb", "Year"])}
+    filename = str(tmp_path / "trees.json")
+    with open(filename, "w") as f:
+        json.dump(trees, f)
+    return filename
+
+
+def expected_output(filename, name):
+    recs = treemap.compute_rectangles(treemap.load_tree(filename, name))
+    return "".join(str(rec) + "\n" for rec in recs)
+
+
+def test_load_matching_trees(json_file, tmp_path):
+    tree_filename = str(tmp_path / "trees.tree")
+    treefile.convert(json_file, tree_filename)
+
+    for filename in [json_file, tree_filename]:
+        assert list(batch.load_matching_trees(filename, ["s*", "Year"])) == \
+            ["s1", "s2", "Year"]
+        assert len(batch.load_matching_trees(filename)) == 5
+
+
+def test_pickle_columnar_tree(json_file, tmp_path):
+    tree_filename = str(tmp_path / "trees.tree")
+    treefile.convert(json_file, tree_filename)
+    ct = treefile.load_tree(tree_filename, "Jan")
+    copy = pickle.loads(pickle.dumps(ct))
+
+    assert isinstance(copy, columnar.ColumnarTree)
+    assert tree_to_list(copy.to_tree()) == tree_to_list(ct.to_tree())
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_cmd(json_file, tmp_path, workers):
+    output = str(tmp_path / "out" / "{key}.txt")
+    args = [json_file, "*a*", "s2", "-o", output]
+    if workers:
+        args += ["-j", str(workers)]
+    result = CliRunner().invoke(batch.cmd, args)
+
+    assert result.exit_code == 0
+    assert result.output.count("wrote") == 3
+    for name in ["s2", "Jan", "Year"]:
+        with open(output.format(key=name)) as f:
+            assert f.read() == expected_output(json_file, name)
+
+
+def test_cmd_needs_key(json_file, tmp_path):
+    result = CliRunner().invoke(batch.cmd,
+                                [json_file, "-o", str(tmp_path / "x.txt")])
+
+    assert result.exit_code != 0
@@ -0,0 +1,87 @@
+'''
+Tests for columnar trees
+'''
+
+import sys
+import treemap
+import columnar
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+SMALL_TREE = [{"key": "class Aves"},
+              [{"key": "order Anseriformes"},
+               [{"key": "Mallard", "value": 12}],
+               [{"key": "Wood Duck", "value": 3}]],
+              [{"key": "order Passeriformes"},
+               [{"key": "family Passerellidae"},
+                [{"key": "Song Sparrow", "value": 7}],
+                [{"key": "Swamp Sparrow", "value": 7}],
+                [{"key": "Fox Sparrow", "value": 1}]],
+               [{"key": "Northern Cardinal", "value": 20}]],
+              [{"key": "Mallard", "value": 2}]]
+
+
+def tree_items(t, attributes=("key", "value", "path")):
+    items = [tuple(getattr(t, attr, None) for attr in attributes)]
+    for st in t.children:
+        items.extend(tree_items(st, attributes))
+    return items
+
+
+def test_from_tree_round_trip():
+    t = treemap.list_to_tree(SMALL_TREE)
+    ct = columnar.ColumnarTree.from_tree(t)
+
+    assert len(ct) == 11
+    assert tree_items(ct.to_tree()) == tree_items(t)
+    assert tree_items(ct.root, ("key", "value")) == \
+        tree_items(t, ("key", "value"))
+
+
+def test_from_list_matches_from_tree():
+    from_list = columnar.ColumnarTree.from_list(SMALL_TREE)
+    from_tree = columnar.ColumnarTree.from_tree(
+        treemap.list_to_tree(SMALL_TREE))
+
+    assert tree_items(from_list.root) == tree_items(from_tree.root)
+    assert len(from_list.keys) == 10
+
+
+def test_compute_on_view():
+    t = treemap.list_to_tree(SMALL_TREE)
+    view = columnar.ColumnarTree.from_list(SMALL_TREE).root
+
+    assert treemap.compute_internal_values(view) == \
+        treemap.compute_internal_values(t) == 52
+    assert treemap.compute_paths(view) is None
+    treemap.compute_paths(t)
+    assert tree_items(view) == tree_items(t)
+
+    recs = treemap.compute_rectangles(view, 2.0, 1.0)
+    expected = treemap.compute_rectangles(t, 2.0, 1.0)
+    assert [str(r) for r in recs] == [str(r) for r in expected]
+    assert [r.color_code for r in recs] == [r.color_code for r in expected]
+
+
+def test_root_path_prefix():
+    view = columnar.ColumnarTree.from_list(SMALL_TREE).root
+    treemap.compute_paths(view, ("life",))
+
+    assert view.path == ("life",)
+    assert view.children[1].children[0].path == \
+        ("life", "class Aves", "order Passeriformes")
+
+
+def test_memory_per_node():
+    lst = [{"key": "root"}] + \
+        [[{"key": "species {}".format(i % 100), "value": i}]
+         for i in range(1000)]
+    t = treemap.list_to_tree(lst)
+    ct = columnar.ColumnarTree.from_list(lst)
+
+    tree_bytes = sum(sys.getsizeof(st) + sys.getsizeof(st.__dict__)
+                     + sys.getsizeof(st.children) + sys.getsizeof(st.value)
+                     for st in t.children)
+    assert ct.nbytes() * 8 <= tree_bytes
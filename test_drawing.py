@@ -0,0 +1,169 @@
+'''
+Tests for drawing treemaps with matplotlib
+'''
+
+import io
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from click.testing import CliRunner
+import matplotlib.pyplot as plt
+import matplotlib.image as mpimg
+import treemap
+import layout
+import drawing
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rectangles(n):
+    lst = [{"key": "root"}] + \
+        [[{"key": "leaf {}".format(i), "value": i + 1}] for i in range(n)]
+    return treemap.compute_rectangles(treemap.list_to_tree(lst))
+
+
+def test_no_pyplot_figures(tmp_path):
+    filename = str(tmp_path / "treemap.png")
+    drawing.draw_rectangles(rectangles(20), filename)
+
+    assert plt.get_fignums() == []
+    image = mpimg.imread(filename)
+    assert image.shape[:2] == (drawing.Y_SCALE_FACTOR * 100,
+                               drawing.X_SCALE_FACTOR * 100)
+
+
+def test_draw_layout(tmp_path):
+    lst = [{"key": "root"}] + \
+        [[{"key": "leaf {}".format(i), "value": i + 1}] for i in range(20)]
+    l = layout.compute_layout(treemap.list_to_tree(lst))
+    filenames = [str(tmp_path / name) for name in ["layout.png", "rects.png"]]
+
+    drawing.draw_layout(l, filenames[0])
+    drawing.draw_rectangles(l.rectangles(), filenames[1])
+
+    assert (mpimg.imread(filenames[0]) == mpimg.imread(filenames[1])).all()
+
+
+def test_concurrent_canvases(tmp_path):
+    filenames = [str(tmp_path / "treemap{}.png".format(i)) for i in range(4)]
+
+    def draw(filename):
+        drawing.draw_rectangles(rectangles(30), filename)
+        with open(filename, "rb") as f:
+            return f.read()
+
+    with ThreadPoolExecutor(4) as executor:
+        images = list(executor.map(draw, filenames))
+    assert len(set(images)) == 1
+
+
+def test_labels_fit():
+    c = drawing.ChiCanvas(8, 8)
+    c.draw_text(0.5, 0.5, 0.06, 0.2, "a very long label for a narrow box")
+    c.savefig(io.BytesIO())
+
+    text = c._ax.texts[0].get_text() # pylint: disable=protected-access
+    assert text
+    assert all(len(line) < 10 for line in text.split("\n"))
+
+
+def test_draw_labels_same_as_draw_text():
+    recs = [rec for rec in rectangles(60)
+            if rec.width > drawing.MIN_RECT_SIDE_FOR_TEXT
+            and rec.height > drawing.MIN_RECT_SIDE_FOR_TEXT]
+    txts = ["{} of the birds seen this month".format(rec.label)
+            for rec in recs]
+
+    one_by_one = drawing.ChiCanvas(8, 8)
+    for rec, txt in zip(recs, txts):
+        one_by_one.draw_text(rec.x + rec.width / 2, rec.y + rec.height / 2,
+                             rec.width, rec.height, txt)
+    one_by_one.savefig(io.BytesIO())
+    batched = drawing.ChiCanvas(8, 8)
+    batched.draw_labels([rec.x for rec in recs], [rec.y for rec in recs],
+                        [rec.width for rec in recs],
+                        [rec.height for rec in recs], txts)
+
+    # pylint: disable=protected-access
+    expected = [text.get_text() for text in one_by_one._ax.texts]
+    assert [text.get_text() for text in batched._ax.texts] == \
+        [text for text in expected if text]
+    assert len(batched._ax.texts) > 10
+
+
+def test_get_colors():
+    codes = [("b",), ("a",), ("a", "c")]
+    ck = drawing.ColorKey(set(codes))
+    ids = [2, 0, 0, 1]
+    colors = ck.get_colors(codes + [("missing",)], ids + [3])
+
+    for color, i in zip(colors, ids):
+        assert (color == ck.get_color(codes[i])).all()
+    assert tuple(colors[-1]) == drawing.mpl.colors.to_rgb("gray")
+
+
+def test_color_key_collection():
+    c = drawing.ChiCanvas(8, 8)
+    ck = drawing.ColorKey({("a",), ("b",), ("c",)})
+    ck.draw_color_key(c, 0.0, 0.0, 0.3, 0.3)
+
+    # pylint: disable=protected-access
+    assert len(c._ax.collections) == 1
+    assert len(c._ax.collections[0].get_paths()) == 3
+
+
+def test_treemap_does_not_import_matplotlib():
+    out = subprocess.run([sys.executable, "-c",
+        "import sys, treemap, layout, tree; "
+        "print('matplotlib' in sys.modules)"],
+        check=True, capture_output=True, text=True, cwd=HERE).stdout
+
+    assert out.strip() == "False"
+
+
+def test_text_output_does_not_import_numpy(tmp_path):
+    filename = str(tmp_path / "tiny.json")
+    with open(filename, "w") as f:
+        json.dump({"tiny": [{"key": "root"}, [{"key": "a", "value": 3}],
+                            [{"key": "b", "value": 1}]]}, f)
+
+    out = subprocess.run([sys.executable, "-c",
+        "import sys, treemap\n"
+        "try:\n"
+        "    treemap.cmd([sys.argv[1], 'tiny', '-o', '-'])\n"
+        "except SystemExit:\n"
+        "    print([m for m in ('numpy', 'layout', 'treefile') "
+        "if m in sys.modules])", filename],
+        check=True, capture_output=True, text=True, cwd=HERE).stdout
+
+    assert out.splitlines()[-1] == "[]"
+    assert len(out.splitlines()) == 3
+
+
+def test_cmd_draws_layout(tmp_path, monkeypatch):
+    lst = [{"key": "root"}] + \
+        [[{"key": "leaf {}".format(i), "value": i + 1}] for i in range(20)]
+    filename = str(tmp_path / "tree.json")
+    with open(filename, "w") as f:
+        json.dump({"t": lst}, f)
+    expected = str(tmp_path / "expected.png")
+    drawing.draw_rectangles(rectangles(20), expected)
+
+    def fail(*args):
+        raise AssertionError("the layout was turned into rectangles")
+
+    monkeypatch.setattr(drawing, "draw_rectangles", fail)
+    runner = CliRunner()
+    for i, options in enumerate([[], ["--max-depth", "5"],
+                                 ["--cache-dir", str(tmp_path / "cache")]]):
+        output = str(tmp_path / "treemap{}.png".format(i))
+        result = runner.invoke(treemap.cmd,
+                               [filename, "t", "-o", output] + options)
+
+        assert result.exit_code == 0, result.output
+        assert (mpimg.imread(output) == mpimg.imread(expected)).all()
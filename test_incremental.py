@@ -0,0 +1,93 @@
+'''
+Tests for incremental treemaps
+'''
+
+import random
+import pytest
+import treemap
+import traversal
+import layout
+import incremental
+from test_layout import random_tree, assert_same_rectangles
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def leaf_paths(t):
+    treemap.compute_paths(t)
+    paths = [tuple(node.path) + (node.key,) for node in traversal.preorder(t)
+             if node.num_children() == 0]
+    return [p for p in paths if paths.count(p) == 1]
+
+
+def rectangle_dict(recs):
+    return {(rec.color_code, rec.label): (rec.x, rec.y, rec.width, rec.height)
+            for rec in recs}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_updates_match_full_layout(seed):
+    rng = random.Random(seed)
+    t = random_tree(seed, 3, 30)
+    paths = leaf_paths(t)
+    it = incremental.IncrementalTreemap(t, 1.0, 1.5)
+    assert_same_rectangles(it.rectangles(),
+                           layout.compute_rectangles(t, 1.0, 1.5))
+
+    for _ in range(5):
+        before = rectangle_dict(it.rectangles())
+        updates = [(rng.choice(paths), rng.choice([0, rng.randint(1, 500)]))
+                   for _ in range(rng.randint(1, 4))]
+        diff = it.update(updates)
+
+        expected = layout.compute_rectangles(t, 1.0, 1.5)
+        assert_same_rectangles(it.rectangles(), expected)
+
+        for rec in diff.removed:
+            del before[(rec.color_code, rec.label)]
+        for rec in diff.added + diff.changed:
+            before[(rec.color_code, rec.label)] = \
+                (rec.x, rec.y, rec.width, rec.height)
+        assert before == rectangle_dict(expected)
+
+
+def test_unchanged_subtrees_not_visited():
+    lst = [{"key": "root"},
+           [{"key": "a"}] + [[{"key": "a{}".format(i), "value": 10}]
+                             for i in range(20)],
+           [{"key": "b"}] + [[{"key": "b{}".format(i), "value": i + 1}]
+                             for i in range(20)]]
+    t = treemap.list_to_tree(lst)
+    it = incremental.IncrementalTreemap(t)
+
+    # Swapping two values in "b" keeps every box above the leaves the same
+    diff = it.update([(("root", "b", "b3"), 5), (("root", "b", "b4"), 4)])
+    assert len(diff) == 2
+    assert {rec.label for rec in diff.changed} == {"b3", "b4"}
+    assert it.update([(("root", "a", "a0"), 10)]).changed == []
+
+
+def test_unknown_leaf():
+    t = random_tree(0, 2, 5)
+    it = incremental.IncrementalTreemap(t)
+
+    with pytest.raises(KeyError):
+        it.update([(("no", "such", "leaf"), 1)])
+
+
+def test_failed_update_changes_nothing():
+    t = random_tree(1, 3, 6)
+    it = incremental.IncrementalTreemap(t)
+    before = [(node.key, node.value) for node in traversal.preorder(t)]
+    recs = it.rectangles()
+    path = leaf_paths(t)[0]
+
+    with pytest.raises(KeyError):
+        it.update([(path, 1000), (("no", "such", "leaf"), 1)])
+
+    assert [(node.key, node.value) for node in traversal.preorder(t)] \
+        == before
+    assert it.rectangles() == recs
+    it.update([(path, 1000)])
+    assert_same_rectangles(it.rectangles(), treemap.compute_rectangles(t))
@@ -0,0 +1,136 @@
+'''
+Tests for the streaming json loader
+'''
+
+import io
+import json
+import pytest
+import treemap
+import jsonstream
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name, redefined-outer-name
+
+
+TREES = {
+    "s1": [{"key": "class Aves", "path": ["a", "b"]},
+           [{"key": "order [Anseriformes]"},
+            [{"key": "Mallard \"duck\"", "value": 12}],
+            [{"key": "Wood Duck {}", "value": 3, "weight": 0.5e-3}]],
+           [{"key": "Northern Cardinal", "value": 20}]],
+    "s2": [{"key": "only", "value": -7, "flag": True, "note": None}],
+    "s3 \\u00e9": [{"key": "Café éè", "value": 1.25}],
+}
+
+
+def tree_items(t):
+    items = [(k, v) for k, v in sorted(vars(t).items()) if k != "children"]
+    result = [items]
+    for st in t.children:
+        result.extend(tree_items(st))
+    return result
+
+
+@pytest.fixture
+def trees_file(tmp_path):
+    filename = tmp_path / "trees.json"
+    with open(filename, "w") as f:
+        json.dump(TREES, f, indent=1)
+    return str(filename)
+
+
+def test_load_trees_matches_json(trees_file):
+    trees = treemap.load_trees(trees_file)
+
+    assert list(trees) == list(TREES)
+    for name, lst in TREES.items():
+        assert tree_items(trees[name]) == \
+            tree_items(treemap.list_to_tree(lst))
+
+
+def test_load_selected(trees_file):
+    trees = treemap.load_trees(trees_file, names={"s2"})
+
+    assert list(trees) == ["s2"]
+    assert treemap.load_tree(trees_file, "s1").children[0].key == \
+        "order [Anseriformes]"
+    with pytest.raises(KeyError):
+        treemap.load_tree(trees_file, "missing")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_small_chunks(chunk_size):
+    text = json.dumps(TREES)
+    stream = jsonstream.JSONStream(io.StringIO(text), chunk_size)
+
+    names = []
+    for name in stream.iter_object():
+        names.append(name)
+        if name == "s1":
+            stream.skip_value()
+        else:
+            t = treemap.read_tree(stream)
+            assert tree_items(t) == \
+                tree_items(treemap.list_to_tree(TREES[name]))
+    assert names == list(TREES)
+    assert stream.peek() == ""
+
+
+def test_skip_scalars():
+    text = '{"a": 123, "b": [1, {"c": "]}"}], "d": "x", "e": [{"key": "e"}]}'
+    stream = jsonstream.JSONStream(io.StringIO(text), 4)
+
+    for name in stream.iter_object():
+        if name == "e":
+            assert treemap.read_tree(stream).key == "e"
+        else:
+            stream.skip_value()
+
+
+def test_deep_tree():
+    depth = 5000
+    text = '[{"key": "n"}, ' * depth + '[{"key": "leaf", "value": 1}]' + \
+        ']' * depth
+    stream = jsonstream.JSONStream(io.StringIO(text))
+
+    t = treemap.read_tree(stream)
+    assert treemap.compute_internal_values(t) == 1
+
+
+def test_truncated():
+    stream = jsonstream.JSONStream(io.StringIO('{"a": [{"key": "a"}, '), 4)
+
+    with pytest.raises(ValueError):
+        for _ in stream.iter_object():
+            treemap.read_tree(stream)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 300, 1 << 16])
+def test_skip_strings_across_blocks(chunk_size):
+    keys = ['a' * 1000 + '"]}', '\\\\', '[{' * 400 + '\\"' + '\\\\"', '\\']
+    skipped = [[{"key": key}, [{"key": "x", "value": 1}]] for key in keys]
+    skipped.append([{"key": "}" * 3000}] + [[{"key": "y"}]] * 500)
+    text = json.dumps({"skipped": skipped, "kept": [{"key": "k"}]})
+    stream = jsonstream.JSONStream(io.StringIO(text), chunk_size)
+
+    names = []
+    for name in stream.iter_object():
+        names.append(name)
+        if name == "skipped":
+            stream.skip_value()
+        else:
+            assert treemap.read_tree(stream).key == "k"
+    assert names == ["skipped", "kept"]
+
+
+def test_syntax_error_is_raised_early():
+    text = '{"a": [{"key": "a"}, [{"key": "b", "value": 1x}]], ' + \
+        '"b": [{"key": "b"}], ' * 100000 + '"c": 0}'
+    f = io.StringIO(text)
+    stream = jsonstream.JSONStream(f, 64)
+
+    with pytest.raises(ValueError) as e:
+        for _ in stream.iter_object():
+            treemap.read_tree(stream)
+    assert "at character {}".format(text.index("x")) in str(e.value)
+    assert f.tell() < 1000
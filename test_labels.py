@@ -0,0 +1,32 @@
+'''
+Tests for fitting labels
+'''
+
+import labels
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def test_fit():
+    font_px = 10 * 100 / 72
+
+    assert labels.fit(["Song Sparrow"] * 3, [200, 60, 60], [100, 100, 20],
+                      font_px) == [("Song Sparrow",), ("Song", "Sparrow"), ()]
+
+
+def test_budgets():
+    clip_chars, max_lines = labels.budgets([100.0, -5.0], [50.0, 3.0], 10.0)
+
+    assert clip_chars.tolist() == [18, 0]
+    assert max_lines.tolist() == [4, 0]
+
+
+def test_wrap_is_cached():
+    labels.wrap.cache_clear()
+    for _ in range(3):
+        labels.wrap("Northern Cardinal", 8, 2)
+
+    assert labels.wrap.cache_info().hits == 2
+    assert labels.wrap("Northern Cardinal", 8, 2) == ("Northern", "Cardinal")
+    assert labels.wrap("Northern Cardinal", 8, 1) == ("Northern",)
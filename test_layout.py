@@ -0,0 +1,276 @@
+'''
+Tests for the vectorized treemap layout
+'''
+
+import io
+import random
+import types
+import pytest
+from click.testing import CliRunner
+import synth
+import traversal
+import treemap
+import layout
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def random_tree(seed, depth, max_children, max_value=1000):
+    rng = random.Random(seed)
+
+    def gen(level):
+        if level == depth or rng.random() < 0.2:
+            return [{"key": "leaf {}".format(rng.randrange(10**6)),
+                     "value": rng.choice([0, rng.randint(1, max_value)])}]
+        return [{"key": "node {}".format(rng.randrange(10**6))}] + \
+            [gen(level + 1) for _ in range(rng.randint(1, max_children))]
+
+    return treemap.list_to_tree(gen(0))
+
+
+def assert_same_rectangles(recs, expected):
+    assert len(recs) == len(expected)
+    for rec, expected_rec in zip(recs, expected):
+        assert (rec.x, rec.y, rec.width, rec.height) == \
+            (expected_rec.x, expected_rec.y, expected_rec.width,
+             expected_rec.height)
+        assert rec.label == expected_rec.label
+        assert rec.color_code == expected_rec.color_code
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("size", [(1.0, 1.0), (3.0, 1.0), (0.25, 2.0)])
+def test_same_as_compute_rectangles(seed, size):
+    t = random_tree(seed, 3, 40)
+
+    assert_same_rectangles(layout.compute_rectangles(t, *size),
+                           treemap.compute_rectangles(t, *size))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_vectorize_all_nodes(seed, monkeypatch):
+    monkeypatch.setattr(layout, "VECTORIZE_MIN_CHILDREN", 1)
+    t = random_tree(seed, 4, 6, max_value=5)
+
+    assert_same_rectangles(layout.compute_rectangles(t, 1.5, 1.0),
+                           treemap.compute_rectangles(t, 1.5, 1.0))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scalar_all_nodes(seed, monkeypatch):
+    monkeypatch.setattr(layout, "VECTORIZE_MIN_CHILDREN", 10**9)
+    t = random_tree(seed, 2, 300)
+
+    assert_same_rectangles(layout.compute_rectangles(t, 1.0, 2.0),
+                           treemap.compute_rectangles(t, 1.0, 2.0))
+
+
+def test_wide_fan_out():
+    t = random_tree(7, 1, 3000)
+    l = layout.compute_layout(t)
+
+    assert len(l) == len(treemap.compute_rectangles(t))
+    assert abs((l.width * l.height).sum() - 1.0) < 1e-9
+    assert_same_rectangles(l.rectangles(), treemap.compute_rectangles(t))
+
+
+def test_row_aspect_ratio():
+    t = random_tree(8, 1, 200)
+    treemap.compute_internal_values(t)
+    children = [st for st in treemap.sorted_trees(t.children) if st.value > 0]
+    total = sum(st.value for st in children)
+
+    for rec in [treemap.Rectangle((0.0, 0.0), (1.0, 1.0)),
+                treemap.Rectangle((0.5, 0.0), (0.2, 3.0))]:
+        for end in range(1, len(children) + 1):
+            row = children[:end]
+            row_layout, _ = treemap.compute_row(rec, row, total)
+            assert treemap.row_aspect_ratio(
+                rec, row[0], row[-1], sum(st.value for st in row), total) \
+                == treemap.worst_aspect_ratio(row_layout)
+
+
+def test_iter_layout_batches():
+    t = random_tree(4, 3, 40)
+    expected = treemap.compute_rectangles(t, 2.0, 1.0)
+    batches = list(layout.iter_layout(t, 2.0, 1.0, batch_size=3))
+
+    assert all(len(nodes) == len(boxes) for nodes, boxes in batches)
+    assert sum(len(nodes) for nodes, _ in batches) == len(expected)
+    assert isinstance(layout.iter_rectangles(t), types.GeneratorType)
+    assert isinstance(treemap.iter_rectangles(t), types.GeneratorType)
+    assert_same_rectangles(list(layout.iter_rectangles(t, 2.0, 1.0)),
+                           expected)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 4096])
+def test_write_rectangles(batch_size):
+    t = random_tree(5, 3, 20)
+    f = io.StringIO()
+    treemap.write_rectangles(layout.iter_rectangles(t), f, batch_size)
+
+    assert f.getvalue() == "".join(
+        str(rec) + "\n" for rec in treemap.compute_rectangles(t))
+
+
+def test_text_output_on_wide_fan_out(tmp_path):
+    filename = str(tmp_path / "wide.json")
+    synth.write_trees(filename, synth.TaxonomyGenerator(
+        seed=3, depth=2, fanouts=("fixed:2", "fixed:20000")))
+    expected = io.StringIO()
+    treemap.write_rectangles(layout.iter_rectangles(
+        treemap.load_tree(filename, synth.DEFAULT_NAME)), expected)
+
+    result = CliRunner().invoke(treemap.cmd, [filename, synth.DEFAULT_NAME,
+                                              "--output", "-"])
+
+    assert result.exit_code == 0
+    assert result.output == expected.getvalue()
+    assert len(result.output.splitlines()) >= 40000
+
+
+def test_degenerate_box():
+    t = random_tree(3, 2, 30)
+
+    assert layout.compute_rectangles(t, 1.0, 0.0) == []
+
+
+def test_visible_layout_without_cutoffs():
+    t = random_tree(1, 3, 40)
+    expected = layout.compute_rectangles(t, 2.0, 1.0)
+
+    assert_same_rectangles(
+        layout.compute_visible_layout(t, 2.0, 1.0).rectangles(), expected)
+
+
+def test_visible_layout_max_depth():
+    t = random_tree(2, 3, 40)
+    l = layout.compute_visible_layout(t, max_depth=1)
+
+    bounding_rec = treemap.Rectangle((0.0, 0.0), (1.0, 1.0))
+    assert l.nodes == [st for _, st in
+                       treemap.layout_children(t, bounding_rec)]
+    assert abs((l.width * l.height).sum() - 1.0) < 1e-9
+
+
+def test_visible_layout_min_area():
+    lst = [{"key": "root"}, [{"key": "big", "value": 1000}]] + \
+        [[{"key": "tiny {}".format(i), "value": 1}] for i in range(1000)]
+    t = treemap.list_to_tree(lst)
+    l = layout.compute_visible_layout(t, min_area=0.01)
+
+    assert [node.key for node in l.nodes] == ["big", layout.OTHER_KEY]
+    assert l.nodes[1].count == 1000
+    assert l.color_codes[l.color_ids[1]] == ("root",)
+    assert abs(l.width[1] * l.height[1] - 0.5) < 1e-9
+
+
+def test_visible_layout_viewport():
+    lst = [{"key": "root"},
+           [{"key": "left"}] + [[{"key": "l{}".format(i), "value": 1}]
+                                for i in range(100)],
+           [{"key": "right"}] + [[{"key": "r{}".format(i), "value": 1}]
+                                 for i in range(100)]]
+    t = treemap.list_to_tree(lst)
+    l = layout.compute_visible_layout(t, 2.0, 1.0,
+                                      viewport=(0.0, 0.0, 1.0, 1.0))
+
+    assert l.color_codes == [("root", "left")]
+    assert len(l) == 100
+    assert abs((l.width * l.height).sum() - 2.0) < 1e-9
+
+
+def test_visible_layout_unaligned_viewport():
+    t = random_tree(6, 3, 20)
+    vx, vy, vw, vh = 0.3, 0.2, 0.5, 0.45
+    expected = []
+    for rec in layout.compute_rectangles(t):
+        x0, y0 = max(rec.x, vx), max(rec.y, vy)
+        x1 = min(rec.x + rec.width, vx + vw)
+        y1 = min(rec.y + rec.height, vy + vh)
+        if x0 < x1 and y0 < y1:
+            expected.append(((x0 - vx) / vw, (y0 - vy) / vh,
+                             (x1 - x0) / vw, (y1 - y0) / vh))
+
+    l = layout.compute_visible_layout(t, viewport=(vx, vy, vw, vh))
+
+    assert len(l) == len(expected)
+    for got, want in zip(zip(l.x, l.y, l.width, l.height), expected):
+        assert got == pytest.approx(want)
+    assert l.x.min() >= 0 and l.y.min() >= 0
+    assert (l.x + l.width).max() <= 1 + 1e-9
+    assert (l.y + l.height).max() <= 1 + 1e-9
+    assert abs((l.width * l.height).sum() - 1.0) < 1e-9
+    for viewport in [(0.0, 0.0, 0.0, 1.0), (0.0, 0.0, 1.0, -1.0)]:
+        with pytest.raises(ValueError):
+            layout.compute_visible_layout(t, viewport=viewport)
+
+
+def test_visible_layout_leaves_paths():
+    t = random_tree(7, 3, 10)
+    treemap.compute_internal_values(t)
+    treemap.compute_paths(t, ("life",))
+    subtree = max(t.children, key=lambda st: st.value)
+    before = [(node, node.path) for node in traversal.preorder(t)]
+
+    l = layout.compute_visible_layout(subtree, min_area=0.01,
+                                      compute_values=False)
+
+    assert all(node.path == path for node, path in before)
+    assert all(len(code) == 0 or code[0] == subtree.key
+               for code in l.color_codes)
+
+
+def test_trusted_rectangles():
+    rec = treemap.Rectangle.from_trusted(0.5, 0.25, 0.5, 0.75, "a",
+                                         ("b",))
+
+    assert str(rec) == str(treemap.Rectangle((0.5, 0.25), (0.5, 0.75), "a"))
+    assert rec.color_code == ("b",)
+    assert not hasattr(rec, "__dict__")
+    with pytest.raises(AssertionError):
+        treemap.Rectangle((0, 0), (1.0, 1.0))
+
+
+def test_color_ids():
+    t = random_tree(6, 3, 30)
+    l = layout.compute_layout(t)
+
+    assert len(l.color_codes) == len(set(l.color_codes))
+    assert [l.color_codes[i] for i in l.color_ids] == \
+        [node.path for node in l.nodes]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_index_tree(seed):
+    t = random_tree(seed, 4, 8)
+    expected = random_tree(seed, 4, 8)
+    treemap.compute_internal_values(expected)
+    treemap.compute_paths(expected, ("life",))
+
+    index = layout.index_tree(t, ("life",))
+
+    for node, expected_node in zip(traversal.preorder(t),
+                                   traversal.preorder(expected)):
+        assert node.value == expected_node.value
+        assert node.path == expected_node.path
+        assert index.depth(node) == len(expected_node.path) - 1
+        assert index.size(node) == sum(1 for _ in traversal.preorder(node))
+        if node.num_children() > 0:
+            assert index.children[node] == \
+                [st for st in treemap.sorted_trees(node.children)
+                 if st.value > 0]
+
+
+def test_layout_tree_with_index():
+    t = random_tree(4, 3, 40)
+    index = layout.index_tree(t)
+
+    with_index = layout.Layout()
+    for nodes, boxes in layout.layout_tree(t, 0.0, 0.0, 1.0, 1.0,
+                                           index=index):
+        with_index.extend(nodes, boxes)
+
+    assert_same_rectangles(with_index.rectangles(),
+                           treemap.compute_rectangles(t))
@@ -0,0 +1,138 @@
+'''
+Tests for the layout cache
+'''
+
+import os
+import pytest
+import layout
+import layoutcache
+import traversal
+import treemap
+from test_layout import random_tree, assert_same_rectangles
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+@pytest.fixture(autouse=True)
+def small_subtrees(monkeypatch):
+    monkeypatch.setattr(layoutcache, "MIN_CACHED_NODES", 8)
+
+
+@pytest.mark.parametrize("seed", [0, 2, 3])
+def test_same_as_compute_rectangles(seed):
+    t = random_tree(seed, 4, 8)
+    expected = treemap.compute_rectangles(t, 2.0, 1.0)
+    cache = layoutcache.LayoutCache()
+
+    assert_same_rectangles(
+        layoutcache.compute_rectangles(t, cache, 2.0, 1.0), expected)
+    assert cache.hits == 0
+    assert_same_rectangles(
+        layoutcache.compute_rectangles(t, cache, 2.0, 1.0), expected)
+    assert cache.hits == 1
+
+
+def test_digests():
+    t = random_tree(3, 3, 6)
+    digests = layoutcache.subtree_digests(t)
+    same = layoutcache.subtree_digests(random_tree(3, 3, 6))
+
+    assert list(digests.values()) == list(same.values())
+
+    leaf = t.children[0]
+    while leaf.num_children() > 0:
+        leaf = leaf.children[0]
+    leaf.value += 1
+    changed = layoutcache.subtree_digests(t)
+
+    assert changed[t] != digests[t]
+    assert changed[t.children[-1]] == digests[t.children[-1]]
+
+
+def test_partial_change():
+    t = random_tree(0, 4, 8)
+    cache = layoutcache.LayoutCache()
+    layoutcache.compute_layout(t, cache)
+
+    # Renaming a leaf does not move any rectangle, so only the subtrees
+    # above it have to be laid out again
+    leaf = [node for node in traversal.preorder(t)
+            if node.num_children() == 0 and node.value > 0][-1]
+    leaf.key = "renamed"
+    cache.hits = cache.misses = 0
+    recs = layoutcache.compute_rectangles(t, cache)
+
+    assert_same_rectangles(recs, layout.compute_rectangles(t))
+    assert cache.hits > 0 and cache.misses > 0
+    assert "renamed" in [rec.label for rec in recs]
+
+
+def test_disk_cache(tmp_path):
+    t = random_tree(5, 4, 8)
+    layoutcache.compute_layout(t, layoutcache.LayoutCache(str(tmp_path)))
+
+    cache = layoutcache.LayoutCache(str(tmp_path))
+    recs = layoutcache.compute_rectangles(t, cache)
+
+    assert cache.hits == 1 and cache.misses == 0
+    assert_same_rectangles(recs, treemap.compute_rectangles(t))
+
+
+def test_disk_capacity(tmp_path):
+    cache = layoutcache.LayoutCache(str(tmp_path), capacity=1,
+                                    disk_capacity=3)
+    for seed in range(5):
+        layoutcache.compute_layout(random_tree(seed, 1, 3), cache)
+
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_degenerate_box():
+    t = random_tree(3, 2, 30)
+
+    assert layoutcache.compute_rectangles(t, layoutcache.LayoutCache(), 1.0,
+                                          0.0) == []
+
+
+def test_full_hit_does_not_walk_the_tree(tmp_path, monkeypatch):
+    t = random_tree(4, 4, 8)
+    expected = layout.compute_rectangles(t)
+    layoutcache.compute_layout(t, layoutcache.LayoutCache(str(tmp_path)))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the tree was walked")
+    monkeypatch.setattr(traversal, "preorder", fail)
+    monkeypatch.setattr(treemap, "compute_internal_values", fail)
+    monkeypatch.setattr(treemap, "compute_paths", fail)
+
+    for cache in [layoutcache.LayoutCache(str(tmp_path))] * 2:
+        assert_same_rectangles(layoutcache.compute_rectangles(t, cache),
+                               expected)
+    assert cache.hits == 2
+
+
+def test_digests_of_keys_and_values():
+    def digest(lst):
+        t = treemap.list_to_tree(lst)
+        return layoutcache.subtree_digests(t)[t]
+
+    assert digest([{"key": 1}, [{"key": "a", "value": 1}]]) != \
+        digest([{"key": "1"}, [{"key": "a", "value": 1}]])
+    assert digest([{"key": "r"}, [{"key": "a", "value": None}]]) != \
+        digest([{"key": "r"}, [{"key": "a", "value": 0}]])
+
+
+def test_hit_without_labels():
+    t = random_tree(7, 4, 8)
+    cache = layoutcache.LayoutCache()
+    layoutcache.compute_layout(t, cache)
+    key = layoutcache.layout_key(layoutcache.subtree_digests(t)[t],
+                                 0.0, 0.0, 1.0, 1.0)
+    # As if the tree had only been laid out as a subtree of another one
+    value = cache.get(key)
+    cache.put(key, layoutcache.CachedLayout(value.indices, value.boxes))
+
+    assert_same_rectangles(layoutcache.compute_rectangles(t, cache),
+                           layout.compute_rectangles(t))
+    assert cache.get(key).labels is not None
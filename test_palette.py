@@ -0,0 +1,37 @@
+'''
+Tests for the colors shared by the renderers
+'''
+
+import numpy as np
+import drawing
+import palette
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def test_same_colors_as_drawing():
+    codes = {("a",), ("a", "b"), ("c",)}
+    expected = drawing.ColorKey(codes).color_map
+    colors = palette.color_map(codes)
+
+    assert np.allclose(palette.COLORS, drawing.ColorKey.COLORS)
+    assert colors.keys() == expected.keys()
+    for code, rgb in colors.items():
+        assert np.allclose(rgb, expected[code])
+
+
+def test_intern_codes():
+    shared = ("a",)
+    table = []
+    ids = {}
+
+    assert palette.intern_codes([shared, shared, ("b",), ("a",)], table,
+                                ids) == [0, 0, 1, 0]
+    assert palette.intern_codes([("b",), ("c",)], table, ids) == [1, 2]
+    assert table == [("a",), ("b",), ("c",)]
+
+
+def test_hex_color():
+    assert palette.hex_color((1.0, 0.5, 0.0)) == "#ff8000"
+    assert palette.hex_color((0.0, 0.0, 0.0)) == "#000000"
@@ -0,0 +1,61 @@
+'''
+Tests for the parallel treemap layout
+'''
+
+import pytest
+import treemap
+import layout
+import parallel
+from test_layout import random_tree, assert_same_rectangles
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_as_compute_rectangles(seed):
+    t = random_tree(seed, 4, 12)
+    expected = treemap.compute_rectangles(t, 2.0, 1.0)
+
+    assert_same_rectangles(
+        layout.compute_rectangles(t, 2.0, 1.0, workers=2), expected)
+    assert_same_rectangles(
+        treemap.compute_rectangles(t, 2.0, 1.0, workers=3), expected)
+
+
+def test_split_covers_all_leaves():
+    t = random_tree(3, 4, 12)
+    index = layout.index_tree(t)
+    frames = parallel.split((t, 0.0, 0.0, 1.0, 1.0), 16, index)
+
+    assert sum(node.num_children() > 0 for node, *_ in frames) >= 16
+    assert abs(sum(w * h for _, _, _, w, h in frames) - 1.0) < 1e-9
+
+
+def test_small_tree():
+    lst = [{"key": "root"}, [{"key": "a", "value": 2}],
+           [{"key": "b", "value": 1}]]
+    t = treemap.list_to_tree(lst)
+
+    assert_same_rectangles(layout.compute_rectangles(t, workers=4),
+                           treemap.compute_rectangles(t))
+
+
+def test_no_pool_for_small_tasks(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no pool should be started")
+
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", no_pool)
+    t = random_tree(2, 3, 5)
+
+    assert_same_rectangles(layout.compute_rectangles(t, workers=2),
+                           treemap.compute_rectangles(t))
+
+
+def test_without_fork(monkeypatch):
+    monkeypatch.setattr(parallel.multiprocessing, "get_all_start_methods",
+                        lambda: ["spawn"])
+    t = random_tree(0, 4, 12)
+
+    assert_same_rectangles(layout.compute_rectangles(t, 1.0, 2.0, workers=2),
+                           treemap.compute_rectangles(t, 1.0, 2.0))
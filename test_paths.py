@@ -0,0 +1,114 @@
+'''
+Tests for shared-prefix paths
+'''
+
+import pickle
+
+import pytest
+import paths
+import traversal
+import tree
+import treemap
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def test_behaves_like_tuple():
+    p = paths.Path.of(("class Aves", "order Passeriformes"))
+
+    assert p == ("class Aves", "order Passeriformes")
+    assert ("class Aves", "order Passeriformes") == p
+    assert p != ("class Aves",)
+    assert hash(p) == hash(("class Aves", "order Passeriformes"))
+    assert {("class Aves", "order Passeriformes"): 1}[p] == 1
+    assert len(p) == 2 and p[-1] == "order Passeriformes"
+    assert list(p) == ["class Aves", "order Passeriformes"]
+    assert str(p) == str(("class Aves", "order Passeriformes"))
+    assert p + ("family",) == ("class Aves", "order Passeriformes", "family")
+    assert paths.EMPTY == () and not paths.EMPTY
+
+
+def test_ordering():
+    codes = [paths.Path.of(k) for k in [("b",), ("a", "z"), ("a",), ()]]
+
+    assert sorted(codes) == [(), ("a",), ("a", "z"), ("b",)]
+    assert paths.Path.of(("a",)) < ("b",)
+    assert ("a", "z") > paths.Path.of(("a",))
+
+
+def test_equal_paths_that_share_nothing():
+    a = paths.Path.of(("x", "y"))
+    b = paths.Path.of(["x", "y"])
+
+    assert a is not b
+    assert a == b and hash(a) == hash(b)
+    assert a != paths.Path.of(("x", "z"))
+
+
+def test_pickle():
+    p = paths.EMPTY.child("a").child("b")
+    deep = paths.Path.of(range(10000))
+
+    assert pickle.loads(pickle.dumps(p)) == ("a", "b")
+    assert pickle.loads(pickle.dumps(deep)) == tuple(range(10000))
+
+
+def test_incremental_hash():
+    keys = ["class Aves", 3, None, 2.5, ("x", 1), -1]
+    p = paths.EMPTY
+    for i, key in enumerate(keys):
+        p = p.child(key)
+        assert hash(p) == hash(tuple(keys[:i + 1]))
+    assert hash(paths.EMPTY) == hash(())
+    assert paths.tuple_hash(tuple(keys)) == hash(tuple(keys))
+
+
+def test_getitem():
+    p = paths.Path.of(("a", "b", "c"))
+
+    assert [p[0], p[1], p[2], p[-1], p[-3]] == ["a", "b", "c", "c", "a"]
+    assert p[1:] == ("b", "c")
+    for index in [3, -4]:
+        with pytest.raises(IndexError):
+            p[index] # pylint: disable=pointless-statement
+
+
+def test_key_without_parent():
+    with pytest.raises(ValueError):
+        paths.Path(None, "a")
+
+
+def test_compute_paths_shares_prefixes():
+    t = tree.Tree("root", 0)
+    a = tree.Tree("a", 0)
+    a.add_child(tree.Tree("a1", 1))
+    a.add_child(tree.Tree("a2", 2))
+    t.add_child(a)
+    t.add_child(tree.Tree("b", 3))
+
+    treemap.compute_paths(t)
+
+    assert t.path == ()
+    assert a.path == ("root",)
+    assert a.children[0].path == ("root", "a")
+    assert a.children[0].path is a.children[1].path
+    assert a.children[0].path.parent is a.path
+
+
+def test_deep_tree():
+    depth = 5000
+    t = tree.Tree("n0", 1)
+    node = t
+    for i in range(1, depth):
+        child = tree.Tree("n" + str(i), 1)
+        node.add_child(child)
+        node = child
+
+    treemap.compute_paths(t, ("prefix",))
+
+    leaf = [n for n in traversal.preorder(t) if n.num_children() == 0][0]
+    assert len(leaf.path) == depth
+    assert leaf.path[:2] == ("prefix", "n0")
+    assert leaf.path == ("prefix",) + tuple("n" + str(i)
+                                            for i in range(depth - 1))
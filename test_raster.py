@@ -0,0 +1,88 @@
+'''
+Tests for raster treemaps
+'''
+
+import struct
+import zlib
+import numpy as np
+from click.testing import CliRunner
+import treemap
+import palette
+import raster
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def decode_png(data):
+    assert data[:8] == raster.PNG_SIGNATURE
+    pos = 8
+    chunks = {}
+    while pos < len(data):
+        length, = struct.unpack(">I", data[pos:pos + 4])
+        chunk_type = data[pos + 4:pos + 8]
+        chunk = data[pos + 8:pos + 8 + length]
+        crc, = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(chunk_type + chunk)
+        chunks[chunk_type] = chunks.get(chunk_type, b"") + chunk
+        pos += 12 + length
+
+    width, height, depth, color_type = struct.unpack(">IIBB",
+                                                     chunks[b"IHDR"][:10])
+    assert (depth, color_type) == (8, 2)
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    rows = rows.reshape(height, 1 + 3 * width)
+    assert (rows[:, 0] == 0).all()
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def small_tree():
+    lst = [{"key": "root"},
+           [{"key": "a"}, [{"key": "a1", "value": 2}],
+            [{"key": "a2", "value": 1}]],
+           [{"key": "b", "value": 1}]]
+    return treemap.list_to_tree(lst)
+
+
+def test_render():
+    recs = treemap.compute_rectangles(small_tree())
+    image = raster.render(recs, 100, 50)
+    colors = palette.color_map({rec.color_code for rec in recs})
+
+    assert image.shape == (50, 100, 3)
+    for rec in recs:
+        x = int((rec.x + rec.width / 2) * 100)
+        y = int((rec.y + rec.height / 2) * 50)
+        expected = np.rint(np.array(colors[rec.color_code]) * 255)
+        assert (image[y, x] == expected).all()
+    assert (image[0, :] == raster.BORDER).all()
+    assert (image[:, -1] == raster.BORDER).all()
+    # "b" takes the right quarter of the picture
+    assert (image[25, 75] == raster.BORDER).all()
+
+
+def test_png_round_trip():
+    image = raster.render(treemap.compute_rectangles(small_tree()), 31, 17)
+
+    assert (decode_png(raster.encode_png(image)) == image).all()
+
+
+def test_empty():
+    image = raster.render([], 4, 3)
+
+    assert (image == raster.BACKGROUND).all()
+
+
+def test_cmd(tmp_path):
+    filename = str(tmp_path / "trees.json")
+    with open(filename, "w") as f:
+        f.write('{"t": [{"key": "root"}, [{"key": "a", "value": 3}], '
+                '[{"key": "b", "value": 1}]]}')
+    output = str(tmp_path / "t.png")
+    result = CliRunner().invoke(treemap.cmd, [filename, "t", "-o", output,
+                                              "--renderer", "png"])
+
+    assert result.exit_code == 0
+    with open(output, "rb") as f:
+        image = decode_png(f.read())
+    assert image.shape == (raster.DEFAULT_SIZE, raster.DEFAULT_SIZE, 3)
@@ -0,0 +1,65 @@
+'''
+Tests for rescalable treemap layouts
+'''
+
+import numpy as np
+import pytest
+import layout
+import scalable
+import treemap
+from test_layout import random_tree
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+SIZES = [(1.0, 1.0), (0.1, 0.1), (3.0, 3.0), (2.0, 1.0), (1.0, 2.0),
+         (1.05, 1.0), (16.0, 9.0)]
+
+
+def assert_close_layouts(got, expected):
+    assert got.nodes == expected.nodes
+    for attr in ("x", "y", "width", "height"):
+        assert np.allclose(getattr(got, attr), getattr(expected, attr),
+                           rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("size", SIZES)
+def test_same_as_compute_layout(seed, size):
+    t = random_tree(seed, 3, 30)
+    s = scalable.ScalableLayout(t)
+
+    assert_close_layouts(s.layout(*size), layout.compute_layout(t, *size))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vectorized_rows(size, monkeypatch):
+    monkeypatch.setattr(layout, "VECTORIZE_MIN_CHILDREN", 1)
+    t = random_tree(2, 2, 60)
+    s = scalable.ScalableLayout(t, 1.5, 1.0)
+
+    assert_close_layouts(s.layout(*size), layout.compute_layout(t, *size))
+
+
+def test_uniform_scaling_is_not_laid_out_again(monkeypatch):
+    t = random_tree(3, 3, 30)
+    s = scalable.ScalableLayout(t, 2.0, 1.0)
+    expected = layout.compute_layout(t, 4.0, 2.0)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("laid out again")
+    monkeypatch.setattr(layout, "sorted_boxes", fail)
+    monkeypatch.setattr(layout, "compute_layout", fail)
+
+    assert_close_layouts(s.layout(4.0, 2.0), expected)
+    assert [rec.label for rec in s.rectangles()] == \
+        [rec.label for rec in treemap.compute_rectangles(t, 2.0, 1.0)]
+
+
+def test_leaf():
+    t = treemap.list_to_tree([{"key": "only", "value": 3}])
+    s = scalable.ScalableLayout(t)
+
+    assert [(r.x, r.y, r.width, r.height) for r in s.rectangles(2.0, 0.5)] \
+        == [(0.0, 0.0, 2.0, 0.5)]
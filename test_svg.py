@@ -0,0 +1,45 @@
+'''
+Tests for SVG treemaps
+'''
+
+import xml.etree.ElementTree as ET
+from click.testing import CliRunner
+import treemap
+import labels
+import svg
+from test_layout import random_tree
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_render():
+    t = random_tree(2, 3, 20)
+    recs = treemap.compute_rectangles(t)
+    root = ET.fromstring(svg.render(recs))
+    rects, texts = root.findall(NS + "g")
+
+    assert len(rects) == len(recs)
+    labeled = [rec for rec in recs
+               if rec.width > labels.MIN_RECT_SIDE_FOR_TEXT
+               and rec.height > labels.MIN_RECT_SIDE_FOR_TEXT]
+    assert 0 < len(texts.findall(NS + "text")) <= len(labeled)
+
+
+def test_cmd(tmp_path):
+    lst = [{"key": "root"}, [{"key": "Ducks & <Geese>", "value": 3}],
+           [{"key": "Sparrows", "value": 1}]]
+    filename = str(tmp_path / "trees.json")
+    with open(filename, "w") as f:
+        f.write('{"t": ' + str(lst).replace("'", '"') + '}')
+    output = str(tmp_path / "t.svg")
+    result = CliRunner().invoke(treemap.cmd, [filename, "t", "-o", output,
+                                              "--renderer", "svg"])
+
+    assert result.exit_code == 0
+    with open(output) as f:
+        root = ET.fromstring(f.read())
+    texts = ["".join(text.itertext()) for text in root.iter(NS + "text")]
+    assert texts == ["Ducks & <Geese>", "Sparrows"]
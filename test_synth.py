@@ -0,0 +1,118 @@
+'''
+Tests for the synthetic taxonomy generator
+'''
+
+import json
+import pytest
+from click.testing import CliRunner
+import synth
+import traversal
+import treefile
+import treemap
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def tree_items(t):
+    return [(node.key, node.value, node.num_children())
+            for node in traversal.preorder(t)]
+
+
+@pytest.mark.parametrize("fanouts", [("uniform:0:6",),
+                                     ("fixed:3", "pareto:1.1:40"),
+                                     ("geometric:3",)])
+def test_json_and_tree_files(tmp_path, fanouts):
+    generator = synth.TaxonomyGenerator(seed=7, depth=4, fanouts=fanouts,
+                                        leaf_probability=0.1)
+    json_filename = str(tmp_path / "synth.json")
+    tree_filename = str(tmp_path / "synth.tree")
+
+    assert synth.write_trees(json_filename, generator, ["a", "b"]) == 2
+    assert synth.write_trees(tree_filename, generator, ["a", "b"],
+                             "tree") == 2
+
+    from_json = treemap.load_trees(json_filename)
+    from_tree = treefile.load_trees(tree_filename)
+    assert list(from_json) == list(from_tree) == ["a", "b"]
+    for name in ["a", "b"]:
+        expected = tree_items(generator.tree(name))
+        assert tree_items(from_json[name]) == expected
+        assert tree_items(from_tree[name].root) == expected
+    assert tree_items(from_json["a"]) != tree_items(from_json["b"])
+
+
+def test_deterministic(tmp_path):
+    files = []
+    for seed in [1, 1, 2]:
+        filename = str(tmp_path / "{}.json".format(len(files)))
+        synth.write_trees(filename, synth.TaxonomyGenerator(seed=seed))
+        with open(filename) as f:
+            files.append(f.read())
+
+    assert files[0] == files[1]
+    assert files[0] != files[2]
+
+
+def test_parameters():
+    generator = synth.TaxonomyGenerator(depth=3, fanouts=("fixed:4",),
+                                        value_skew=0.5, max_value=100,
+                                        key_length=(3, 5))
+    t = generator.tree()
+    nodes = list(traversal.preorder(t))
+    leaves = [node for node in nodes if node.num_children() == 0]
+
+    assert len(nodes) == 1 + 4 + 16 + 64
+    assert all(1 <= leaf.value <= 100 for leaf in leaves)
+    assert t.key.startswith("class ")
+    assert all(leaf.key.startswith("genus ") for leaf in leaves)
+    assert all(3 <= len(node.key.split(" ")[1]) <= 5 for node in nodes)
+
+
+def test_max_nodes():
+    generator = synth.TaxonomyGenerator(depth=10, fanouts=("fixed:10",),
+                                        max_nodes=1000)
+
+    assert len(list(generator.nodes())) == 1000
+    assert len(list(traversal.preorder(generator.tree()))) == 1000
+
+
+def test_deep_tree(tmp_path):
+    generator = synth.TaxonomyGenerator(depth=5000, fanouts=("fixed:1",))
+    filename = str(tmp_path / "deep.json")
+    synth.write_trees(filename, generator)
+
+    t = treemap.load_tree(filename, synth.DEFAULT_NAME)
+    assert len(list(traversal.preorder(t))) == 5001
+    assert len(treemap.compute_rectangles(t)) == 1
+
+
+def test_cmd(tmp_path):
+    filename = str(tmp_path / "synth.tree")
+    runner = CliRunner()
+
+    result = runner.invoke(synth.cmd, [filename, "--format", "tree",
+                                       "--depth", "2", "--fanout", "fixed:5"])
+    bad = runner.invoke(synth.cmd, ["-", "--fanout", "normal:5"])
+    stdout = runner.invoke(synth.cmd, ["-", "--depth", "1", "--fanout",
+                                       "fixed:2", "--name", "x"])
+
+    assert result.exit_code == 0
+    assert len(treefile.load_tree(filename, synth.DEFAULT_NAME)) == 31
+    assert bad.exit_code != 0 and "normal:5" in bad.output
+    assert stdout.exit_code == 0
+    assert list(json.loads(stdout.output)) == ["x"]
+
+
+def test_tree_list(tmp_path):
+    generator = synth.TaxonomyGenerator(seed=4, depth=3,
+                                        fanouts=("uniform:0:5",))
+    filename = str(tmp_path / "synth.json")
+    synth.write_trees(filename, generator)
+    with open(filename) as f:
+        expected = json.load(f)[synth.DEFAULT_NAME]
+    deep = synth.TaxonomyGenerator(depth=5000, fanouts=("fixed:1",))
+
+    assert generator.tree_list() == expected
+    assert tree_items(treemap.list_to_tree(deep.tree_list())) == \
+        tree_items(deep.tree())
@@ -0,0 +1,70 @@
+'''
+Tests for the iterative tree traversals
+'''
+
+import sys
+import treemap
+import traversal
+import tree
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def small_tree():
+    t = tree.Tree("A", 1)
+    b = tree.Tree("B", 2)
+    c = tree.Tree("C", 3)
+    t.add_child(b)
+    t.add_child(c)
+    b.add_child(tree.Tree("D", 4))
+    b.add_child(tree.Tree("E", 5))
+    c.add_child(tree.Tree("F", 6))
+    return t
+
+
+def chain_list(depth):
+    lst = [{"key": "leaf", "value": 1}]
+    for i in range(depth):
+        lst = [{"key": "node {}".format(i)}, lst]
+    return lst
+
+
+def test_orders():
+    t = small_tree()
+
+    assert [n.key for n in traversal.preorder(t)] == list("ABDECF")
+    assert [n.key for n in traversal.postorder(t)] == list("DEBFCA")
+    assert [n.key for n in traversal.level_order(t)] == list("ABCDEF")
+
+
+def test_get_children():
+    lst = [{"key": "A"}, [{"key": "B"}, [{"key": "C"}]], [{"key": "D"}]]
+
+    keys = [l[0]["key"] for l in traversal.preorder(lst, lambda l: l[1:])]
+    assert keys == list("ABCD")
+
+
+def test_deep_chain():
+    depth = 3 * sys.getrecursionlimit()
+    t = treemap.list_to_tree(chain_list(depth))
+
+    assert treemap.compute_internal_values(t) == 1
+    treemap.compute_paths(t)
+    leaf = list(traversal.postorder(t))[0]
+    assert leaf.key == "leaf"
+    assert len(leaf.path) == depth
+
+    recs = treemap.compute_rectangles(t)
+    assert len(recs) == 1
+    assert (recs[0].width, recs[0].height) == (1.0, 1.0)
+
+
+def test_deep_print(capsys):
+    depth = 3 * sys.getrecursionlimit()
+    t = treemap.list_to_tree(chain_list(depth))
+
+    t.print(maxdepth=depth // 2)
+    out = capsys.readouterr().out
+    assert "node {}: None".format(depth - 1) in out
+    assert out.count("\n") >= depth
@@ -0,0 +1,142 @@
+'''
+Tests for binary tree files
+'''
+
+import json
+import pytest
+from click.testing import CliRunner
+import treemap
+import treefile
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name, redefined-outer-name
+
+
+TREES = {
+    "s1": [{"key": "class Aves"},
+           [{"key": "order Anseriformes"},
+            [{"key": "Mallard", "value": 12}],
+            [{"key": "Wood Duck", "value": 3}]],
+           [{"key": "order Passeriformes"},
+            [{"key": "Song Sparrow", "value": 7}],
+            [{"key": "Swamp Sparrow", "value": 7}],
+            [{"key": "Fox Sparrow", "value": 1}]],
+           [{"key": "Northern Cardinal", "value": 20}]],
+    "s2": [{"key": "Pájaro", "value": 5}],
+}
+
+
+def tree_items(t):
+    items = [(t.key, t.value)]
+    for st in t.children:
+        items.extend(tree_items(st))
+    return items
+
+
+@pytest.fixture
+def files(tmp_path):
+    json_filename = str(tmp_path / "trees.json")
+    tree_filename = str(tmp_path / "trees.tree")
+    with open(json_filename, "w") as f:
+        json.dump(TREES, f)
+    assert treefile.convert(json_filename, tree_filename) == len(TREES)
+    return json_filename, tree_filename
+
+
+def test_round_trip(files):
+    json_filename, tree_filename = files
+    from_json = treemap.load_trees(json_filename)
+    from_tree = treefile.load_trees(tree_filename)
+
+    assert treefile.is_tree_file(tree_filename)
+    assert not treefile.is_tree_file(json_filename)
+    assert list(from_tree) == list(from_json)
+    for name, t in from_json.items():
+        assert tree_items(from_tree[name].root) == tree_items(t)
+
+
+def test_compute_on_loaded_tree(files):
+    json_filename, tree_filename = files
+    with open(tree_filename, "rb") as f:
+        contents = f.read()
+
+    t = treemap.load_tree(json_filename, "s1")
+    view = treefile.load_tree(tree_filename, "s1").root
+    recs = treemap.compute_rectangles(view)
+    expected = treemap.compute_rectangles(t)
+
+    assert [str(r) for r in recs] == [str(r) for r in expected]
+    assert [r.color_code for r in recs] == [r.color_code for r in expected]
+    assert view.value == t.value == 50
+    with open(tree_filename, "rb") as f:
+        assert f.read() == contents
+
+
+def test_load_missing(files):
+    _, tree_filename = files
+
+    assert list(treefile.load_trees(tree_filename, {"s2"})) == ["s2"]
+    with pytest.raises(KeyError):
+        treefile.load_tree(tree_filename, "missing")
+
+
+def test_cmd(files):
+    json_filename, tree_filename = files
+    runner = CliRunner()
+
+    from_json = runner.invoke(treemap.cmd, [json_filename, "s1", "-o", "-"])
+    from_tree = runner.invoke(treemap.cmd, [tree_filename, "s1", "-o", "-"])
+
+    assert from_json.exit_code == from_tree.exit_code == 0
+    assert from_tree.output == from_json.output
+    assert from_json.output.count("RECTANGLE") == 6
+
+
+def list_nodes(lst):
+    stack = [lst]
+    while stack:
+        node = stack.pop()
+        yield node[0]["key"], node[0].get("value"), len(node) - 1
+        stack.extend(reversed(node[1:]))
+
+
+@pytest.mark.parametrize("chunk", [2, treefile.COLUMN_CHUNK])
+def test_write_node_streams(files, tmp_path, monkeypatch, chunk):
+    json_filename, _ = files
+    monkeypatch.setattr(treefile, "COLUMN_CHUNK", chunk)
+    tree_filename = str(tmp_path / "streamed.tree")
+
+    ntrees = treefile.write_node_streams(
+        tree_filename, ((name, list_nodes(lst)) for name, lst in TREES.items()))
+
+    from_json = treemap.load_trees(json_filename)
+    from_tree = treefile.load_trees(tree_filename)
+    assert ntrees == len(TREES)
+    assert list(from_tree) == list(from_json)
+    for name, t in from_json.items():
+        assert tree_items(from_tree[name].root) == tree_items(t)
+
+    with pytest.raises(ValueError):
+        treefile.write_node_streams(tree_filename,
+                                    [("bad", [("a", None, 2), ("b", 1, 0)])])
+
+
+def test_is_json_file(files, tmp_path):
+    json_filename, tree_filename = files
+    padded_filename = str(tmp_path / "padded.json")
+    with open(json_filename) as f:
+        text = f.read()
+    with open(padded_filename, "w") as f:
+        f.write(" \n\t\r" * 100 + text)
+    blank_filename = str(tmp_path / "blank.json")
+    with open(blank_filename, "w") as f:
+        f.write(" " * 1000)
+
+    assert treemap.is_json_file(json_filename)
+    assert treemap.is_json_file(padded_filename)
+    assert not treemap.is_json_file(tree_filename)
+    assert not treemap.is_json_file(blank_filename)
+    result = CliRunner().invoke(treemap.cmd,
+                                [padded_filename, "s2", "-o", "-"])
+    assert result.exit_code == 0, result.output
+    assert "Pájaro" in result.output
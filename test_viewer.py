@@ -0,0 +1,75 @@
+'''
+Tests for the interactive treemap viewer
+'''
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import treemap
+import viewer
+
+# DO NOT REMOVE THESE LINES OF CODE
+# pylint: disable-msg= missing-docstring, invalid-name
+
+
+def deep_tree():
+    # root > a > a0..a9 > a0x..a9x, and root > b
+    lst = [{"key": "root"},
+           [{"key": "a"}] + [[{"key": "a{}".format(i)}] +
+                             [[{"key": "a{}{}".format(i, j), "value": 1}]
+                              for j in range(10)]
+                             for i in range(10)],
+           [{"key": "b", "value": 100}]]
+    return treemap.list_to_tree(lst)
+
+
+def test_zoom():
+    v = viewer.TreemapViewer(deep_tree(), depth=2)
+
+    assert {node.key for node in v.layout().nodes} == \
+        {"b"} | {"a{}".format(i) for i in range(10)}
+    assert v.zoom_in(0.1, 0.1)
+    assert v.current.key == "a0"
+    assert len(v.layout()) == 10
+    assert v.title() == "root > a0"
+    assert v.zoom_out()
+    assert not v.zoom_out()
+
+
+def test_zoom_into_leaf():
+    v = viewer.TreemapViewer(deep_tree(), depth=1)
+
+    # "b" is a leaf, so there is nothing to zoom into
+    assert v.node_at(0.5, 0.75).key == "b"
+    assert not v.zoom_in(0.5, 0.75)
+    assert v.zoom_in(0.5, 0.25)
+    assert v.current.key == "a"
+
+
+def test_layouts_are_cached():
+    v = viewer.TreemapViewer(deep_tree(), depth=2, cache_size=2)
+    first = v.layout()
+
+    v.zoom_in(0.1, 0.1)
+    v.zoom_out()
+    assert v.layout() is first
+
+    for x in [0.3, 0.5]:
+        v.zoom_in(x, 0.1)
+        v.layout()
+        v.zoom_out()
+    # The root was used again to find the second subtree
+    assert [node.key for node in v.layouts] == ["root", "a4"]
+    assert v.layout() is first
+
+
+def test_draw():
+    v = viewer.TreemapViewer(deep_tree(), depth=2)
+    fig = Figure(figsize=(8, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    v.draw(ax)
+    fig.canvas.draw()
+
+    assert len(ax.collections) == 1
+    assert len(ax.collections[0].get_paths()) == len(v.layout())
+    assert [text.get_text() for text in ax.texts][-1] == "b"
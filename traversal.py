@@ -0,0 +1,87 @@
+'''
+CS 121: Tree Traversals
+
+Iterative pre-order, post-order and level-order traversals. They keep
+their own explicit stack (or queue) instead of recursing, so they work
+on trees of any depth without running into Python's recursion limit.
+
+All the traversals take an optional get_children function that, given a
+node, returns the list of its children. By default it returns the
+children attribute, which works for Tree and ColumnarNode objects, but
+any other function can be used to walk other structures (such as the
+lists used in the json files) or to carry extra per-node state down the
+tree. get_children is only called on a node after it has been yielded.
+'''
+
+from collections import deque
+
+
+def children_of(t):
+    '''
+    Default get_children function: returns the children of a tree.
+    '''
+    return t.children
+
+
+def preorder(root, get_children=children_of):
+    '''
+    Visit every node of a tree, each node before its children. Children
+    are visited in order.
+
+    Inputs:
+        root: the root of the tree
+        get_children: function that returns the children of a node
+
+    Returns: a generator that yields the nodes.
+    '''
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = get_children(node)
+        for i in range(len(children) - 1, -1, -1):
+            stack.append(children[i])
+
+
+def postorder(root, get_children=children_of):
+    '''
+    Visit every node of a tree, each node after all of its children.
+    Children are visited in order.
+
+    Inputs:
+        root: the root of the tree
+        get_children: function that returns the children of a node
+
+    Returns: a generator that yields the nodes.
+    '''
+
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+        else:
+            stack.append((node, True))
+            children = get_children(node)
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], False))
+
+
+def level_order(root, get_children=children_of):
+    '''
+    Visit every node of a tree, level by level, starting at the root.
+    The nodes in each level are visited from left to right.
+
+    Inputs:
+        root: the root of the tree
+        get_children: function that returns the children of a node
+
+    Returns: a generator that yields the nodes.
+    '''
+
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(get_children(node))
@@ -4,24 +4,49 @@
 import textwrap
 import sys
 
+import traversal
 
-# This will try to import the necessary libraries
-# to plot trees. These can be complicated to install
-# so, if they are not available, we simply prevent
-# the plotting function from working.
-try:
-    import matplotlib
-    import matplotlib.pylab as plt
-    import networkx as nx
-    import pygraphviz
-    import matplotlib
-    import warnings
-    warnings.simplefilter(action = "ignore", category = FutureWarning)
-    warnings.simplefilter(action = "ignore", 
-        category = matplotlib.MatplotlibDeprecationWarning)
-    CAN_PLOT=True
-except ImportError as ie:
-    CAN_PLOT=False    
+
+# Plotting trees needs matplotlib, networkx and pygraphviz. These can
+# be complicated to install so, if they are not available, we simply
+# prevent the plotting function from working. They are also slow to
+# import, so they are only imported the first time a tree is plotted
+# (or CAN_PLOT is looked at), not by every program that uses trees.
+_plot_modules = None
+
+
+def _import_plot_modules():
+    """
+    Imports the plotting libraries, once.
+
+    Returns: a pair (plt, nx) of modules, or None if the libraries are
+        not available.
+    """
+    global _plot_modules
+    if _plot_modules is None:
+        try:
+            import matplotlib
+            import matplotlib.pylab as plt
+            import networkx as nx
+            import pygraphviz # pylint: disable=unused-import
+            import warnings
+            warnings.simplefilter(action = "ignore", category = FutureWarning)
+            warnings.simplefilter(action = "ignore", 
+                category = matplotlib.MatplotlibDeprecationWarning)
+            _plot_modules = (plt, nx)
+        except ImportError:
+            _plot_modules = ()
+    return _plot_modules or None
+
+
+def __getattr__(name):
+    """
+    Computes CAN_PLOT the first time it is used.
+    """
+    if name == "CAN_PLOT":
+        return _import_plot_modules() is not None
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
 
 
 class Tree(object):
@@ -67,18 +92,12 @@ class Tree(object):
         return len(self.children)
 
 
-    def __print_r(self, prefix, last, kformat, vformat, maxdepth, paths):
+    def __print_node(self, prefix, last, kformat, vformat, paths):
         """
-        Recursive method to print out the tree. Should not be
+        Prints out a single node of the tree. Should not be
         called directly. See print() method for more details.
         """
 
-        if maxdepth is not None:
-            if maxdepth == 0:
-                return
-            else:
-                maxdepth -= 1    
-
         if len(prefix) > 0:
             if last:
                 lprefix1 = prefix[:-3] + u"  └──"
@@ -113,15 +132,30 @@ class Tree(object):
         print(lprefix2)
         print(u"\n".join(ltextlines))
 
-        for i, st in enumerate(self.children):
-            if i == self.num_children() - 1:
+
+    @staticmethod
+    def __print_children(frame, maxdepth):
+        """
+        Returns the (tree, prefix, last, depth) frames of the children 
+        of the node in the given frame, or no frames if the children
+        are deeper than maxdepth.
+        """
+        t, prefix, _, depth = frame
+
+        if depth + 1 == maxdepth:
+            return []
+
+        frames = []
+        for i, st in enumerate(t.children):
+            if i == t.num_children() - 1:
                 newprefix = prefix + u"   "
                 newlast = True
             else:
                 newprefix = prefix + u"  │"
                 newlast = False
 
-            st.__print_r(newprefix, newlast, kformat, vformat, maxdepth, paths)
+            frames.append((st, newprefix, newlast, depth + 1))
+        return frames
     
     
     def print(self, kformat="{}", vformat="{}", maxdepth=None, paths=False):
@@ -133,32 +167,45 @@ class Tree(object):
         - maxdepth: Maximum depth to print.
         """
         
-        self.__print_r(u"", False, kformat, vformat, maxdepth, paths)
-
+        if maxdepth == 0:
+            return
 
-    def __plot_r(self, g, labels, parent_id):
-        tree_id = id(self)
+        frames = traversal.preorder((self, u"", False, 0),
+            lambda frame: Tree.__print_children(frame, maxdepth))
+        for t, prefix, last, _ in frames:
+            t.__print_node(prefix, last, kformat, vformat, paths)
 
-        g.add_node(tree_id)
-        labels[tree_id] = self.key
 
-        if parent_id is not None:
-            g.add_edge(parent_id, tree_id)
-        
-        for st in self.children:
-            st.__plot_r(g, labels, tree_id)    
+    @staticmethod
+    def __plot_children(frame):
+        """
+        Returns the (tree, parent_id) frames of the children of the
+        node in the given frame.
+        """
+        t, _ = frame
+        return [(st, id(t)) for st in t.children]
     
 
     def plot(self):
-        if not CAN_PLOT:
+        modules = _import_plot_modules()
+        if modules is None:
             print("Error: Cannot plot the tree. " \
                 "networkx and/or pypgraphviz are not installed")
             return
+        plt, nx = modules
 
         G = nx.DiGraph()
         labels = {}
 
-        self.__plot_r(G, labels, None)
+        for t, parent_id in traversal.preorder((self, None),
+                                               Tree.__plot_children):
+            tree_id = id(t)
+
+            G.add_node(tree_id)
+            labels[tree_id] = t.key
+
+            if parent_id is not None:
+                G.add_edge(parent_id, tree_id)
 
         node_pos = nx.nx_pydot.pydot_layout(G, prog='dot')
 
@@ -0,0 +1,469 @@
+'''
+CS 121: Binary Tree Files
+
+A compact binary format for the trees in a json tree file (see
+treemap.load_trees), and a memory-mapped reader for it. Opening a tree
+only reads the file's directory; the node arrays are used in place from
+the memory map and are only paged in when they are actually accessed.
+
+File layout (all offsets are from the start of the file, and every
+array starts at a multiple of 8 bytes):
+
+    header:     magic, version, byte order, number of trees,
+                offset of the directory
+    sections:   one per tree:
+                    number of nodes, number of keys, size of key table
+                    parent, first_child, next_sibling, key_ids (int32)
+                    values (float64)
+                    key offsets (int64, number of keys + 1)
+                    key table (the utf-8 encoded keys, back to back)
+    directory:  for each tree: offset of its section, length of its
+                name, and the utf-8 encoded name
+
+The arrays use the byte order of the machine that wrote the file.
+
+Usage: python3 treefile.py birds.json birds.tree
+'''
+
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+import click
+
+import columnar
+import jsonstream
+import treemap
+
+
+MAGIC = b"PA6TREE\0"
+VERSION = 1
+BYTE_ORDERS = {"little": 1, "big": 2}
+
+HEADER = struct.Struct("<8sIIQQ")
+SECTION = struct.Struct("<QQQ")
+DIRECTORY_ENTRY = struct.Struct("<QQ")
+
+ALIGNMENT = 8
+
+# Number of entries write_node_streams keeps in memory for each array
+COLUMN_CHUNK = 1 << 16
+
+
+class StringTable:
+    '''
+    A read-only table of strings, stored as utf-8 encoded bytes back to
+    back. Strings are decoded the first time they are accessed.
+    '''
+
+    def __init__(self, offsets, data):
+        '''
+        Constructs a new StringTable.
+
+        Inputs:
+            offsets: (array of int) offsets[i] and offsets[i+1] are the
+                start and end of string i in data
+            data: (bytes-like) the encoded strings
+        '''
+
+        self.offsets = offsets
+        self.data = data
+        self.decoded = {}
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, i):
+        s = self.decoded.get(i)
+        if s is None:
+            if not 0 <= i < len(self):
+                raise IndexError("string table index out of range")
+            s = sys.intern(str(self.data[self.offsets[i]:self.offsets[i + 1]],
+                               "utf-8"))
+            self.decoded[i] = s
+        return s
+
+
+def write_trees(filename, trees):
+    '''
+    Writes trees to a binary tree file.
+
+    Inputs:
+        filename: (string) name of the file to write
+        trees: iterable of (name, ColumnarTree) pairs
+
+    Returns: (int) the number of trees written.
+    '''
+
+    return __write_file(filename,
+                        ((name, lambda f, ct=ct: __write_section(f, ct))
+                         for name, ct in trees))
+
+
+def write_node_streams(filename, trees, temp_dir=None):
+    '''
+    Writes trees given as streams of nodes to a binary tree file, in
+    memory proportional to the depth of the trees, so that trees much
+    larger than memory can be written. Each array of a tree is written
+    to a temporary file first, and then copied to the tree file.
+
+    Every node gets its own entry in the key table: keys are not
+    deduplicated, as they are by write_trees.
+
+    Inputs:
+        filename: (string) name of the file to write
+        trees: iterable of (name, nodes) pairs, where nodes is an
+            iterable of the (key, value, number of children) triples of
+            the nodes of a tree, in pre-order. value is None for no value.
+        temp_dir: (string) directory for the temporary files, by default
+            the directory of filename
+
+    Returns: (int) the number of trees written.
+    '''
+
+    if temp_dir is None:
+        temp_dir = os.path.dirname(os.path.abspath(filename))
+    return __write_file(filename,
+                        ((name, lambda f, nodes=nodes:
+                          __write_node_section(f, nodes, temp_dir))
+                         for name, nodes in trees))
+
+
+def __write_file(filename, sections):
+    '''
+    Writes the header, the sections and the directory of a tree file.
+
+    Inputs:
+        filename: (string) name of the file to write
+        sections: iterable of (name, write) pairs, where write is a
+            function that writes the section of a tree to a file
+
+    Returns: (int) the number of trees written.
+    '''
+
+    directory = []
+    with open(filename, "wb") as f:
+        f.write(bytes(HEADER.size))
+        __pad(f)
+        for name, write in sections:
+            directory.append((f.tell(), name))
+            write(f)
+
+        directory_offset = f.tell()
+        for offset, name in directory:
+            encoded = name.encode("utf-8")
+            f.write(DIRECTORY_ENTRY.pack(offset, len(encoded)))
+            f.write(encoded)
+            __pad(f)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder],
+                            len(directory), directory_offset))
+    return len(directory)
+
+
+def __write_section(f, ct):
+    '''
+    Writes the section for one tree.
+
+    Inputs:
+        f: file open for writing, at a multiple of 8 bytes
+        ct: (ColumnarTree) the tree
+    '''
+
+    encoded = []
+    for key in ct.keys:
+        if not isinstance(key, str):
+            raise ValueError(
+                "Keys must be strings to be written to a tree file")
+        encoded.append(key.encode("utf-8"))
+    key_offsets = array("q", [0])
+    for key in encoded:
+        key_offsets.append(key_offsets[-1] + len(key))
+
+    f.write(SECTION.pack(len(ct), len(encoded), key_offsets[-1]))
+    for a, typecode in ((ct.parent, columnar.INDEX_TYPECODE),
+                        (ct.first_child, columnar.INDEX_TYPECODE),
+                        (ct.next_sibling, columnar.INDEX_TYPECODE),
+                        (ct.key_ids, columnar.INDEX_TYPECODE),
+                        (ct.values, columnar.VALUE_TYPECODE),
+                        (key_offsets, "q")):
+        f.write(array(typecode, a).tobytes())
+        __pad(f)
+    for key in encoded:
+        f.write(key)
+    __pad(f)
+
+
+def __write_node_section(f, nodes, temp_dir):
+    '''
+    Writes the section for one tree given as a stream of nodes (see
+    write_node_streams).
+
+    Inputs:
+        f: file open for writing, at a multiple of 8 bytes
+        nodes: iterable of (key, value, number of children) triples
+        temp_dir: (string) directory for the temporary files
+    '''
+
+    columns = [_ColumnFile(typecode, temp_dir)
+               for typecode in (columnar.INDEX_TYPECODE,) * 4 +
+               (columnar.VALUE_TYPECODE, "q")]
+    parent, first_child, next_sibling, key_ids, values, key_offsets = columns
+    key_table = _ColumnFile("B", temp_dir)
+    try:
+        key_offsets.append(0)
+        # [index, number of children still to come, last child so far] of
+        # every node whose children have not all been written yet
+        open_nodes = []
+        index = 0
+        for key, value, num_children in nodes:
+            if not isinstance(key, str):
+                raise ValueError(
+                    "Keys must be strings to be written to a tree file")
+            if open_nodes:
+                top = open_nodes[-1]
+                parent.append(top[0])
+                if top[2] != columnar.NO_NODE:
+                    next_sibling[top[2]] = index
+                top[1] -= 1
+                top[2] = index
+            elif index > 0:
+                raise ValueError("Nodes after the end of the tree")
+            else:
+                parent.append(columnar.NO_NODE)
+
+            first_child.append(index + 1 if num_children > 0
+                               else columnar.NO_NODE)
+            next_sibling.append(columnar.NO_NODE)
+            key_ids.append(index)
+            values.append(math.nan if value is None else value)
+            key_table.extend(key.encode("utf-8"))
+            key_offsets.append(len(key_table))
+
+            if num_children > 0:
+                open_nodes.append([index, num_children, columnar.NO_NODE])
+            else:
+                while open_nodes and open_nodes[-1][1] == 0:
+                    open_nodes.pop()
+            index += 1
+        if open_nodes or index == 0:
+            raise ValueError("The tree ended before all its nodes")
+
+        f.write(SECTION.pack(index, index, len(key_table)))
+        for column in columns + [key_table]:
+            column.copy_to(f)
+            __pad(f)
+    finally:
+        for column in columns + [key_table]:
+            column.close()
+
+
+class _ColumnFile:
+    '''
+    An array that is written to a temporary file COLUMN_CHUNK entries at
+    a time. Entries that were already written can still be changed.
+    '''
+
+    def __init__(self, typecode, temp_dir):
+        self.typecode = typecode
+        self.file = tempfile.TemporaryFile(dir=temp_dir)
+        self.chunk = array(typecode)
+        self.flushed = 0
+
+
+    def __len__(self):
+        return self.flushed + len(self.chunk)
+
+
+    def append(self, value):
+        self.chunk.append(value)
+        if len(self.chunk) >= COLUMN_CHUNK:
+            self.flush()
+
+
+    def extend(self, values):
+        self.chunk.extend(values)
+        if len(self.chunk) >= COLUMN_CHUNK:
+            self.flush()
+
+
+    def __setitem__(self, i, value):
+        if i >= self.flushed:
+            self.chunk[i - self.flushed] = value
+        else:
+            self.file.seek(i * self.chunk.itemsize)
+            self.file.write(array(self.typecode, [value]).tobytes())
+            self.file.seek(0, 2)
+
+
+    def flush(self):
+        self.file.write(self.chunk.tobytes())
+        self.flushed += len(self.chunk)
+        del self.chunk[:]
+
+
+    def copy_to(self, f):
+        '''
+        Copies the whole array to the current position of a file.
+        '''
+
+        self.flush()
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, f)
+
+
+    def close(self):
+        self.file.close()
+
+
+def __pad(f):
+    '''
+    Writes zeros until the file position is a multiple of ALIGNMENT.
+    '''
+
+    f.write(bytes(-f.tell() % ALIGNMENT))
+
+
+def is_tree_file(filename):
+    '''
+    Checks whether a file is a binary tree file.
+
+    Inputs:
+        filename: (string) name of the file
+
+    Returns: (bool)
+    '''
+
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_trees(filename, names=None):
+    '''
+    Opens the trees in a binary tree file. The file is memory-mapped
+    copy-on-write: the trees can be modified (for example by
+    compute_internal_values) without changing the file.
+
+    Inputs:
+        filename: (string) name of the file
+        names: (optional) collection of the names of the trees to open.
+            If None, all the trees are opened.
+
+    Returns: dictionary mapping tree names (strings) to ColumnarTrees.
+    '''
+
+    with open(filename, "rb") as f:
+        buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    magic, version, byte_order, ntrees, offset = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError("{} is not a tree file".format(filename))
+    if version != VERSION:
+        raise ValueError("{} has unsupported version {}".format(
+            filename, version))
+    if byte_order != BYTE_ORDERS[sys.byteorder]:
+        raise ValueError("{} was written with a different byte order".format(
+            filename))
+
+    trees = {}
+    for _ in range(ntrees):
+        section_offset, name_length = DIRECTORY_ENTRY.unpack_from(buf, offset)
+        offset += DIRECTORY_ENTRY.size
+        name = str(buf[offset:offset + name_length], "utf-8")
+        offset = __align(offset + name_length)
+        if names is None or name in names:
+            trees[name] = __read_section(buf, section_offset)
+    return trees
+
+
+def load_tree(filename, name):
+    '''
+    Opens a single tree in a binary tree file.
+
+    Inputs:
+        filename: (string) name of the file
+        name: (string) name of the tree
+
+    Returns: a ColumnarTree. Raises KeyError if the file does not have a
+        tree with the given name.
+    '''
+
+    return load_trees(filename, (name,))[name]
+
+
+def __read_section(buf, offset):
+    '''
+    Builds a ColumnarTree on top of the section for one tree.
+
+    Inputs:
+        buf: (memoryview) the whole file
+        offset: (int) offset of the section
+
+    Returns: a ColumnarTree
+    '''
+
+    nnodes, nkeys, key_bytes = SECTION.unpack_from(buf, offset)
+    offset += SECTION.size
+
+    arrays = []
+    for typecode, length in ((columnar.INDEX_TYPECODE, nnodes),
+                             (columnar.INDEX_TYPECODE, nnodes),
+                             (columnar.INDEX_TYPECODE, nnodes),
+                             (columnar.INDEX_TYPECODE, nnodes),
+                             (columnar.VALUE_TYPECODE, nnodes),
+                             ("q", nkeys + 1)):
+        end = offset + struct.calcsize(typecode) * length
+        arrays.append(buf[offset:end].cast(typecode))
+        offset = __align(end)
+
+    parent, first_child, next_sibling, key_ids, values, key_offsets = arrays
+    keys = StringTable(key_offsets, buf[offset:offset + key_bytes])
+    return columnar.ColumnarTree(parent, first_child, next_sibling, key_ids,
+                                 values, keys)
+
+
+def __align(offset):
+    '''
+    Returns: (int) offset rounded up to a multiple of ALIGNMENT
+    '''
+
+    return offset + (-offset % ALIGNMENT)
+
+
+def convert(json_filename, tree_filename):
+    '''
+    Converts a json tree file to a binary tree file. The json file is
+    read one tree at a time.
+
+    Inputs:
+        json_filename: (string) name of the json file to read
+        tree_filename: (string) name of the binary tree file to write
+
+    Returns: (int) the number of trees converted.
+    '''
+
+    with open(json_filename) as f:
+        stream = jsonstream.JSONStream(f)
+        trees = ((name, columnar.ColumnarTree.from_tree(
+                     treemap.read_tree(stream)))
+                 for name in stream.iter_object())
+        return write_trees(tree_filename, trees)
+
+
+@click.command(name="treefile")
+@click.argument('json_file', type=click.Path(exists=True))
+@click.argument('tree_file', type=click.Path())
+def cmd(json_file, tree_file):
+    ntrees = convert(json_file, tree_file)
+    print("wrote {} trees to {}".format(ntrees, tree_file))
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter
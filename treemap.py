@@ -6,9 +6,19 @@ YOUR NAME HERE
 Code for constructing a treemap.
 '''
 
-import json
+import sys
 import click
 import tree
+import traversal
+import jsonstream
+import paths
+
+
+# Number of rectangles cmd formats before each write to the output
+WRITE_BATCH_SIZE = 4096
+
+# Ways cmd can draw a treemap (see draw_rectangles)
+RENDERERS = ("matplotlib", "svg", "png")
 
 
 ###############
@@ -27,9 +37,11 @@ class Rectangle:
         width, height: (float) the rectangle's width and height
         label: (str) text label for the rectangle
         color_code: (tuple) tuple for determining what color the 
-            rectangle should be
+            rectangle should be, or a paths.Path
     '''
 
+    __slots__ = ("x", "y", "width", "height", "label", "color_code")
+
     def __init__(self, origin, size, label="", color_code=("",)):
         '''
         Constructs a new Rectangle.
@@ -46,14 +58,40 @@ class Rectangle:
         assert label is not None, "Rectangle label can't be None"
         assert isinstance(label, str), "Rectangle label must be a string"
         assert color_code is not None, "Rectangle color_code can't be None"
-        assert isinstance(color_code, tuple), \
-            "Rectangle color_code must be a tuple"
+        assert isinstance(color_code, (tuple, paths.Path)), \
+            "Rectangle color_code must be a tuple or a Path"
 
         self.x, self.y = origin
         self.width, self.height = size
         self.label = label
         self.color_code = color_code
 
+    @classmethod
+    def from_trusted(cls, x, y, width, height, label="",
+                     color_code=("",)):
+        '''
+        Constructs a new Rectangle WITHOUT validating its parameters, for
+        code that only ever builds valid rectangles, such as the layout
+        code: non-negative floats for the coordinates, a string label and
+        a tuple or Path color code. Anything else should use the
+        validating constructor.
+
+        Inputs:
+            x, y: (float) coordinates of the rectangle's origin
+            width, height: (float) the width and height of the rectangle
+            label: (str) text label for the rectangle
+            color_code: (tuple) tuple for determining its color
+        '''
+
+        rec = object.__new__(cls)
+        rec.x = x
+        rec.y = y
+        rec.width = width
+        rec.height = height
+        rec.label = label
+        rec.color_code = color_code
+        return rec
+
     def __str__(self):
         format_string = "RECTANGLE {:.4f} {:.4f} {:.4f} {:.4f} {}"
         return format_string.format(self.x, self.y,
@@ -63,7 +101,8 @@ class Rectangle:
         return str(self)
 
 
-def compute_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0):
+def compute_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0,
+                       workers=None):
     '''
     Computes the rectangles for drawing a treemap of the provided tree.
 
@@ -71,12 +110,167 @@ def compute_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0):
         t: (Tree) a tree
         bounding_rec_width, bounding_rec_height: (float) the width and height
             of the bounding rectangle.
+        workers: (int) if more than one, lay out the subtrees near the top
+            of the tree in this many processes (see parallel.py)
 
     Returns: a list of Rectangle objects.
     '''
 
-    # REPLACE pass WITH YOUR CODE
-    pass
+    if workers is not None and workers > 1:
+        import parallel
+        return parallel.compute_rectangles(t, bounding_rec_width,
+                                           bounding_rec_height, workers)
+    return list(iter_rectangles(t, bounding_rec_width, bounding_rec_height))
+
+
+def iter_rectangles(t, bounding_rec_width=1.0, bounding_rec_height=1.0):
+    '''
+    Generator version of compute_rectangles: yields the rectangles one at
+    a time, as they are laid out, instead of building a list.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec_width, bounding_rec_height: (float) the width and height
+            of the bounding rectangle.
+
+    Returns: a generator of Rectangle objects, in the same order as
+        compute_rectangles.
+    '''
+
+    compute_internal_values(t)
+    compute_paths(t)
+
+    bounding_rec = Rectangle((0.0, 0.0),
+        (float(bounding_rec_width), float(bounding_rec_height)))
+    yield from layout_tree(t, bounding_rec)
+
+
+def layout_tree(t, bounding_rec):
+    '''
+    Lay out a tree whose values and paths have already been computed.
+
+    Inputs:
+        t: (Tree) a tree
+        bounding_rec: (Rectangle) the rectangle the tree should fill
+
+    Returns: a generator that yields a Rectangle for each visible leaf.
+    '''
+
+    # A pre-order walk, where only the internal nodes are laid out
+    stack = [(bounding_rec, t)]
+    while stack:
+        rec, node = stack.pop()
+        if node.children:
+            stack.extend(reversed(layout_children(node, rec)))
+        else:
+            yield Rectangle.from_trusted(rec.x, rec.y, rec.width,
+                rec.height, node.key, node.path)
+
+
+def layout_children(t, bounding_rec):
+    '''
+    Lay out the children of an internal node in rows, growing each row
+    for as long as doing so does not make its worst aspect ratio worse.
+    Each candidate row is checked in constant time (see
+    row_aspect_ratio), and each row is laid out once.
+
+    Inputs:
+        t: (Tree) an internal node with its values computed
+        bounding_rec: (Rectangle) the rectangle the children should fill
+
+    Returns: list of pairs (rec, child) in layout order.
+    '''
+
+    children = [st for st in sorted_trees(t.children) if st.value > 0]
+    remaining = suffix_sums([st.value for st in children])
+
+    layout = []
+    start = 0
+    while start < len(children):
+        first = children[start]
+        row_sum = first.value
+        worst = row_aspect_ratio(bounding_rec, first, first, row_sum,
+                                 remaining[start])
+        end = start + 1
+        while end < len(children):
+            next_sum = row_sum + children[end].value
+            next_worst = row_aspect_ratio(bounding_rec, first,
+                                          children[end], next_sum,
+                                          remaining[start])
+            if next_worst > worst:
+                break
+            row_sum, worst = next_sum, next_worst
+            end += 1
+        row_layout, bounding_rec = compute_row(bounding_rec,
+            children[start:end], remaining[start])
+        layout.extend(row_layout)
+        start = end
+    return layout
+
+
+def row_aspect_ratio(bounding_rec, largest, smallest, row_sum, total_sum):
+    '''
+    Compute the worst aspect ratio of a row without laying it out: the
+    rectangles of a row all have the same width, so the worst one is
+    the one for its largest or its smallest value. Gives the same result
+    as worst_aspect_ratio on the layout compute_row returns.
+
+    Inputs:
+        bounding_rec: (Rectangle) the bounding rectangle
+        largest, smallest: (Tree) the first and the last trees of the row
+        row_sum: (number) the total value of the trees in the row
+        total_sum: (number) the total value of all the rectangles that
+            will eventually fill the bounding rectangle
+
+    Returns: (float) the worst aspect ratio, or 0.0 if the row has no
+        visible rectangles.
+    '''
+
+    if bounding_rec.width >= bounding_rec.height:
+        long_side, short_side = bounding_rec.width, bounding_rec.height
+    else:
+        long_side, short_side = bounding_rec.height, bounding_rec.width
+    row_width = long_side * row_sum / total_sum
+    worst = 0.0
+    for t in (largest, smallest):
+        height = short_side * t.value / row_sum
+        if row_width > 0 and height > 0:
+            worst = max(worst, row_width / height, height / row_width)
+    return worst
+
+
+def suffix_sums(values):
+    '''
+    Compute the running totals of a list of values taken from its end, so
+    that entry i is the sum of values[i:].
+
+    Inputs:
+        values: (list of numbers)
+
+    Returns: list of numbers with the same length as values.
+    '''
+
+    sums = [0] * len(values)
+    total = 0
+    for i in range(len(values) - 1, -1, -1):
+        total = values[i] + total
+        sums[i] = total
+    return sums
+
+
+def worst_aspect_ratio(row_layout):
+    '''
+    Compute the worst (largest) aspect ratio of the rectangles in a row.
+
+    Inputs:
+        row_layout: list of pairs (rec, t) as returned by compute_row
+
+    Returns: (float) the largest of max(width/height, height/width) over
+        the rectangles in the row, or 0.0 if the row is empty.
+    '''
+
+    return max((max(rec.width / rec.height, rec.height / rec.width)
+        for rec, _ in row_layout), default=0.0)
 
 
 def compute_internal_values(t):
@@ -93,8 +287,10 @@ def compute_internal_values(t):
         value is the value of the root of t (that is, t.value).
     '''
 
-    # REPLACE pass WITH YOUR CODE
-    pass
+    for node in traversal.postorder(t):
+        if node.num_children() > 0:
+            node.value = sum(st.value for st in node.children)
+    return t.value
 
 
 def compute_paths(t, prefix=()):
@@ -109,6 +305,11 @@ def compute_paths(t, prefix=()):
     being assigned to the node with key "family Passerellidae".
     For the root node, the path attribute should be an empty tuple.
 
+    The paths are paths.Path objects, which compare, hash and print like
+    those tuples, but the path of a node only adds its parent's key to
+    the path of its parent, so the paths of the whole tree take memory
+    proportional to its number of nodes.
+
     Inputs:
         t (Tree): a tree
         prefix (tuple of strings): Prefix to add to path
@@ -117,8 +318,12 @@ def compute_paths(t, prefix=()):
         attribute for all nodes.
     '''
 
-    # REPLACE pass WITH YOUR CODE
-    pass
+    t.path = paths.Path.of(prefix)
+    for node in traversal.preorder(t):
+        if node.children:
+            child_prefix = node.path + (node.key,)
+            for st in node.children:
+                st.path = child_prefix
 
 
 #############################
@@ -142,22 +347,79 @@ def validate_tuple_param(p, name):
         "(both values must be >= 0)"
 
 
-def load_trees(filename):
+def load_trees(filename, names=None):
     '''
     Loads trees from a json file. The json file
     should consist of a dictionary mapping tree
     names to trees represented as lists.
 
+    The file is parsed incrementally and the trees are
+    built as they are read, so the whole json document
+    is never held in memory. Trees that are not selected
+    are skipped without being built.
+
     Input:
         filename: (string) name of the json file.
+        names: (optional) collection of the names of the
+            trees to load. If None, all the trees are loaded.
 
     Returns: dictionary mapping tree names (strings)
         to Tree instances.
     '''
 
+    trees = {}
     with open(filename) as f:
-        trees_json = json.load(f)
-    return {name: list_to_tree(lst) for name, lst in trees_json.items()}
+        stream = jsonstream.JSONStream(f)
+        for name in stream.iter_object():
+            if names is None or name in names:
+                trees[name] = read_tree(stream)
+            else:
+                stream.skip_value()
+    return trees
+
+
+def load_tree(filename, name):
+    '''
+    Loads a single tree from a json file in the format
+    used by load_trees, without building the others.
+
+    Input:
+        filename: (string) name of the json file.
+        name: (string) name of the tree.
+
+    Returns: a Tree instance. Raises KeyError if the file
+        does not have a tree with the given name.
+    '''
+
+    return load_trees(filename, (name,))[name]
+
+
+def read_tree(stream):
+    '''
+    Reads a tree represented as a list (see list_to_tree)
+    from a JSON stream, building each node as soon as its
+    dictionary of attributes has been read.
+
+    Input:
+        stream: (JSONStream) stream positioned at the
+            start of the list.
+
+    Returns: a Tree instance.
+    '''
+
+    stream.expect("[")
+    t = __node_to_tree(stream.read_value())
+    open_trees = [t]
+    while open_trees:
+        if stream.accept("]"):
+            open_trees.pop()
+        else:
+            stream.expect(",")
+            stream.expect("[")
+            st = __node_to_tree(stream.read_value())
+            open_trees[-1].add_child(st)
+            open_trees.append(st)
+    return t
 
 
 def list_to_tree(lst):
@@ -174,18 +436,52 @@ def list_to_tree(lst):
     Returns: a Tree instance.
     '''
 
-    root = lst[0]
-    children = lst[1:]
+    t = __node_to_tree(lst[0])
+    for _ in traversal.preorder((lst, t), __attach_children):
+        pass
+    return t
+
+
+def __node_to_tree(root):
+    '''
+    Converts the dictionary at the head of a tree list to a Tree
+    with no children.
+
+    Input:
+        root: dictionary mapping attributes to values.
+
+    Returns: a Tree instance.
+    '''
+
     t = tree.Tree(fancy_get(root, 'key'), fancy_get(root, 'value'))
     for attrname in root:
         attrvalue = fancy_get(root, attrname)
         if attrname not in ['key', 'value']:
             setattr(t, attrname, attrvalue)
-    for child_list in children:
-        t.add_child(list_to_tree(child_list))
     return t
 
 
+def __attach_children(frame):
+    '''
+    Helper function for list_to_tree. Converts the child subtrees of a
+    list to Trees and adds them as children of the matching Tree.
+
+    Input:
+        frame: pair (lst, t) of a list representing a tree and the Tree
+            built from its first element.
+
+    Returns: list of (lst, t) pairs, one for each child subtree.
+    '''
+
+    lst, t = frame
+    frames = []
+    for child_list in lst[1:]:
+        st = __node_to_tree(child_list[0])
+        t.add_child(st)
+        frames.append((child_list, st))
+    return frames
+
+
 def fancy_get(d, key, default=None):
     '''
     Gets a value from a dictionary, but converts a list to a tuple.
@@ -257,7 +553,7 @@ def __transpose_rectangle(rec):
     Returns: (Rectangle) transpose of rec.
     '''
 
-    return Rectangle((rec.y, rec.x), (rec.height, rec.width),
+    return Rectangle.from_trusted(rec.y, rec.x, rec.height, rec.width,
         rec.label, rec.color_code)
 
 
@@ -279,13 +575,14 @@ def __compute_row_wide(bounding_rec, row_data, total_sum):
     y = bounding_rec.y
     for t in row_data:
         height = bounding_rec.height * t.value / row_sum
-        rec = Rectangle((bounding_rec.x, y),
-                        (row_width, height))
-        if rec.width > 0 and rec.height > 0:
-            row_layout.append((rec, t))
+        if row_width > 0 and height > 0:
+            row_layout.append((Rectangle.from_trusted(bounding_rec.x, y,
+                                                      row_width, height), t))
         y += height
-    leftover = Rectangle((bounding_rec.x + row_width, bounding_rec.y),
-                         (bounding_rec.width - row_width, bounding_rec.height))
+    leftover = Rectangle.from_trusted(bounding_rec.x + row_width,
+                                      bounding_rec.y,
+                                      bounding_rec.width - row_width,
+                                      bounding_rec.height)
 
     return row_layout, leftover
 
@@ -294,24 +591,157 @@ def __compute_row_wide(bounding_rec, row_data, total_sum):
 @click.argument('tree_file', type=click.Path(exists=True))
 @click.argument('key', type=str)
 @click.option('--output', '-o', type=str)
-def cmd(tree_file, key, output):
-    import drawing
+@click.option('--max-depth', type=int,
+              help="Do not lay out nodes deeper than this.")
+@click.option('--min-side', type=float, default=0.0,
+              help="Do not subdivide rectangles narrower than this.")
+@click.option('--min-area', type=float, default=0.0,
+              help="Do not subdivide rectangles smaller than this.")
+@click.option('--viewport', type=float, nargs=4, default=None,
+              metavar="X Y WIDTH HEIGHT", help="Zoom into this box.")
+@click.option('--workers', '-j', type=int, default=None,
+              help="Lay out the tree with this many processes.")
+@click.option('--renderer', type=click.Choice(RENDERERS),
+              default=RENDERERS[0], help="How to draw the treemap.")
+@click.option('--cache-dir', type=str, default=None,
+              help="Reuse the layouts kept in this directory.")
+def cmd(tree_file, key, output, max_depth, min_side, min_area, viewport,
+        workers, renderer, cache_dir):
+    # layout (which needs numpy) and treefile are only imported when they
+    # are used, so that a text-only run of a small tree starts quickly
+    if is_json_file(tree_file):
+        data_tree = load_tree(tree_file, key)
+    else:
+        import treefile
+        data_tree = treefile.load_tree(tree_file, key).root
+
+    # Images are drawn from a layout.Layout, l; text output may be written
+    # from plain rectangles instead
+    l = None
+    if max_depth is not None or min_side > 0 or min_area > 0 or viewport:
+        import layout
+        try:
+            l = layout.compute_visible_layout(data_tree,
+                max_depth=max_depth, min_side=min_side, min_area=min_area,
+                viewport=viewport or None)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--viewport")
+    elif cache_dir is not None:
+        import layoutcache
+        cache = layoutcache.LayoutCache(cache_dir)
+        if output == "-":
+            rectangles = layoutcache.compute_rectangles(data_tree, cache)
+        else:
+            l = layoutcache.compute_layout(data_tree, cache)
+    elif workers is not None and workers > 1:
+        import layout
+        l = layout.compute_layout(data_tree, workers=workers)
+    elif output == "-":
+        # Laid out in linear time without numpy (see layout_children)
+        rectangles = iter_rectangles(data_tree)
+    else:
+        import layout
+        l = layout.compute_layout(data_tree)
 
-    data = load_trees(tree_file)
+    if output == "-":
+        write_rectangles(rectangles if l is None else l.rectangles(),
+                         sys.stdout)
+    else:
+        draw_layout(l, output, renderer)
 
-    data_tree = data[key]
 
-    compute_internal_values(data_tree)
+def is_json_file(filename):
+    '''
+    Checks whether a file holds json trees (see load_trees) rather than
+    binary trees (see treefile.py), from its first character that is not
+    whitespace, however far into the file it is.
 
-    compute_paths(data_tree)
+    Inputs:
+        filename: (string) name of the file
 
-    rectangles = compute_rectangles(data_tree)
+    Returns: (bool)
+    '''
 
-    if output == "-":
-        for rect in rectangles:
-            print(rect)
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(64)
+            if not chunk:
+                return False
+            chunk = chunk.lstrip(b" \t\n\r")
+            if chunk:
+                return chunk[:1] == b"{"
+
+
+def draw_rectangles(rectangles, output_filename=None, renderer="matplotlib"):
+    '''
+    Draws rectangles with one of the RENDERERS.
+
+    Inputs:
+        rectangles: list of Rectangle objects to draw
+        output_filename: name of the file in which to save the image. If
+            None, the matplotlib renderer displays the image instead.
+        renderer: (string) "matplotlib" (see drawing.py), "svg" (see
+            svg.py) or "png" (see raster.py)
+    '''
+
+    if renderer != "matplotlib" and output_filename is None:
+        raise click.UsageError(
+            "the {} renderer needs an output file".format(renderer))
+    if renderer == "svg":
+        import svg
+        svg.draw_rectangles(rectangles, output_filename)
+    elif renderer == "png":
+        import raster
+        raster.draw_rectangles(rectangles, output_filename)
     else:
-        drawing.draw_rectangles(rectangles, output)
+        import drawing
+        drawing.draw_rectangles(rectangles, output_filename)
+
+
+def draw_layout(l, output_filename=None, renderer="matplotlib"):
+    '''
+    Draws a layout with one of the RENDERERS. The matplotlib renderer
+    draws the arrays of the layout as they are (see drawing.draw_layout);
+    the others draw its rectangles (see draw_rectangles).
+
+    Inputs:
+        l: (layout.Layout) the layout to draw
+        output_filename: name of the file in which to save the image. If
+            None, the matplotlib renderer displays the image instead.
+        renderer: (string) one of the RENDERERS
+    '''
+
+    if renderer == "matplotlib":
+        import drawing
+        drawing.draw_layout(l, output_filename)
+    else:
+        draw_rectangles(l.rectangles(), output_filename, renderer)
+
+
+def write_rectangles(rectangles, f, batch_size=WRITE_BATCH_SIZE):
+    '''
+    Writes rectangles to a file, one per line, as they are produced.
+
+    The lines are written batch_size at a time, so that a long stream of
+    rectangles is neither held in memory nor written one line at a time.
+
+    Inputs:
+        rectangles: iterable of Rectangle objects
+        f: a text file
+        batch_size: (int) number of rectangles per write
+    '''
+
+    lines = []
+    for rect in rectangles:
+        lines.append(str(rect))
+        if len(lines) == batch_size:
+            lines.append("")
+            f.write("\n".join(lines))
+            lines = []
+    if lines:
+        lines.append("")
+        f.write("\n".join(lines))
+    f.flush()
 
 if __name__ == "__main__":
     cmd() # pylint: disable=no-value-for-parameter
@@ -0,0 +1,246 @@
+'''
+CS 121: Interactive Treemap Viewer
+
+Shows a treemap a few levels at a time: only the nodes at most depth
+levels below the node being viewed are laid out (see
+layout.compute_visible_layout), so even trees with millions of nodes
+can be explored. Clicking a rectangle zooms into its subtree, and
+right-clicking (or pressing backspace) zooms back out. The layouts of
+the last few subtrees viewed are kept, so going back is instant.
+
+Usage: python3 viewer.py data/birds.json Year --depth 3
+'''
+
+import collections
+
+import click
+import numpy as np
+
+import labels
+import layout
+import palette
+import treefile
+import treemap
+
+
+DEFAULT_DEPTH = 2
+
+# Children that would get less than this fraction of the view are
+# drawn as a single rectangle (see layout.compute_visible_layout)
+MIN_AREA = 1e-5
+
+# Number of laid out subtrees to keep
+CACHE_SIZE = 64
+
+
+class TreemapViewer:
+    '''
+    The state of the viewer: the subtree being viewed, the subtrees that
+    were zoomed into to reach it, and the layouts of recently viewed
+    subtrees.
+    '''
+
+    def __init__(self, t, depth=DEFAULT_DEPTH, min_area=MIN_AREA,
+                 cache_size=CACHE_SIZE):
+        '''
+        Constructs a viewer, which shows the whole tree at first.
+
+        Inputs:
+            t: (Tree) a tree
+            depth: (int) number of levels to show below the node viewed
+            min_area: (float) see MIN_AREA
+            cache_size: (int) number of layouts to keep
+        '''
+
+        treemap.compute_internal_values(t)
+        self.depth = depth
+        self.min_area = min_area
+        self.cache_size = cache_size
+        self.zoomed = [t]
+        self.layouts = collections.OrderedDict()
+
+
+    @property
+    def current(self):
+        '''The node being viewed'''
+        return self.zoomed[-1]
+
+
+    def layout(self):
+        '''
+        Returns: the Layout of the node being viewed, in the unit square
+        '''
+
+        node = self.current
+        node_layout = self.layouts.pop(node, None)
+        if node_layout is None:
+            node_layout = layout.compute_visible_layout(node,
+                max_depth=self.depth, min_area=self.min_area,
+                compute_values=False)
+        self.layouts[node] = node_layout
+        if len(self.layouts) > self.cache_size:
+            self.layouts.popitem(last=False)
+        return node_layout
+
+
+    def node_at(self, x, y):
+        '''
+        Finds the rectangle at a point.
+
+        Inputs:
+            x, y: (float) coordinates of the point in the unit square
+
+        Returns: the node drawn at the point, or None
+        '''
+
+        l = self.layout()
+        hits = np.flatnonzero((l.x <= x) & (x < l.x + l.width)
+                              & (l.y <= y) & (y < l.y + l.height))
+        if len(hits) == 0:
+            return None
+        return l.nodes[hits[0]]
+
+
+    def zoom_in(self, x, y):
+        '''
+        Zooms into the subtree of the rectangle at a point: the node
+        drawn there if it has children, otherwise the child of the node
+        being viewed that contains the point.
+
+        Inputs:
+            x, y: (float) coordinates of the point in the unit square
+
+        Returns: (bool) whether the view changed
+        '''
+
+        node = self.node_at(x, y)
+        if node is None:
+            return False
+        if node.num_children() == 0:
+            children, boxes = layout.child_boxes(self.current, 0.0, 0.0,
+                                                 1.0, 1.0)
+            node = None
+            for st, (bx, by, bw, bh) in zip(children, boxes.tolist()):
+                if bx <= x < bx + bw and by <= y < by + bh:
+                    node = st
+            if node is None or node.num_children() == 0:
+                return False
+        self.zoomed.append(node)
+        return True
+
+
+    def zoom_out(self):
+        '''
+        Goes back to the node viewed before the last zoom.
+
+        Returns: (bool) whether the view changed
+        '''
+
+        if len(self.zoomed) == 1:
+            return False
+        self.zoomed.pop()
+        return True
+
+
+    def title(self):
+        '''
+        Returns: (string) the keys of the nodes zoomed into
+        '''
+
+        return " > ".join(str(node.key) for node in self.zoomed)
+
+
+    def draw(self, ax):
+        '''
+        Draws the view into matplotlib axes, replacing what they showed.
+
+        Inputs:
+            ax: matplotlib Axes
+        '''
+
+        from matplotlib.collections import PolyCollection
+
+        l = self.layout()
+        ax.clear()
+        ax.set_axis_off()
+        ax.set_xlim((0, 1))
+        ax.set_ylim((1, 0))
+        ax.set_title(self.title(), fontsize=labels.FONT_SIZE)
+
+        colors = palette.color_map(set(l.color_codes))
+        code_colors = [colors[code] for code in l.color_codes]
+        x0, y0 = l.x, l.y
+        x1, y1 = x0 + l.width, y0 + l.height
+        corners = np.stack([np.stack([x0, y0], axis=1),
+                            np.stack([x1, y0], axis=1),
+                            np.stack([x1, y1], axis=1),
+                            np.stack([x0, y1], axis=1)], axis=1)
+        ax.add_collection(PolyCollection(corners,
+            facecolors=[code_colors[i] for i in l.color_ids.tolist()],
+            edgecolors="black", linewidths=1))
+
+        labeled = np.flatnonzero((l.width > labels.MIN_RECT_SIDE_FOR_TEXT)
+                                 & (l.height > labels.MIN_RECT_SIDE_FOR_TEXT))
+        (px0, py0), (px1, py1) = ax.transData.transform([(0, 0), (1, 1)])
+        font_px = labels.FONT_SIZE * ax.figure.dpi / 72
+        fitted = labels.fit([str(l.nodes[i].key) for i in labeled.tolist()],
+                            (l.width[labeled] - 0.02) * abs(px1 - px0),
+                            l.height[labeled] * abs(py1 - py0), font_px)
+        for i, lines in zip(labeled.tolist(), fitted):
+            if lines:
+                ax.text(x0[i] + 0.01, y0[i] + l.height[i] / 2,
+                        "\n".join(lines), fontsize=labels.FONT_SIZE,
+                        ha="left", va="center", clip_on=True)
+
+
+def show(t, depth=DEFAULT_DEPTH):
+    '''
+    Opens a window with an interactive treemap of a tree.
+
+    Inputs:
+        t: (Tree) a tree
+        depth: (int) number of levels to show at a time
+    '''
+
+    import matplotlib.pyplot as plt
+
+    viewer = TreemapViewer(t, depth)
+    fig, ax = plt.subplots(figsize=(8, 8))
+    fig.subplots_adjust(left=0.0, right=1.0, top=0.95, bottom=0.0)
+
+    def on_click(event):
+        if event.inaxes is not ax:
+            return
+        if event.button == 1:
+            changed = viewer.zoom_in(event.xdata, event.ydata)
+        else:
+            changed = viewer.zoom_out()
+        if changed:
+            viewer.draw(ax)
+            fig.canvas.draw_idle()
+
+    def on_key(event):
+        if event.key == "backspace" and viewer.zoom_out():
+            viewer.draw(ax)
+            fig.canvas.draw_idle()
+
+    fig.canvas.mpl_connect("button_press_event", on_click)
+    fig.canvas.mpl_connect("key_press_event", on_key)
+    viewer.draw(ax)
+    plt.show()
+
+
+@click.command(name="viewer")
+@click.argument('tree_file', type=click.Path(exists=True))
+@click.argument('key', type=str)
+@click.option('--depth', type=int, default=DEFAULT_DEPTH,
+              help="Number of levels to show at a time.")
+def cmd(tree_file, key, depth):
+    if treefile.is_tree_file(tree_file):
+        data_tree = treefile.load_tree(tree_file, key).root
+    else:
+        data_tree = treemap.load_tree(tree_file, key)
+    show(data_tree, depth)
+
+if __name__ == "__main__":
+    cmd() # pylint: disable=no-value-for-parameter